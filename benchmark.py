@@ -0,0 +1,496 @@
+"""Benchmark dos caminhos críticos do sistema, com dados sintéticos e planilha em memória.
+
+Gera abas operacoes/veiculos/atendimentos com as colunas reais em vários
+tamanhos e cronometra: carga + conversão de tipos, agregados do Dashboard,
+filtros do Histórico, busca por placa, exportação e cada caminho de gravação,
+nos backends Google Sheets (substituto em memória, sem rede) e SQLite.
+
+Os resultados vão para um JSON; com --base, compara com uma execução anterior
+e termina com código 1 se alguma etapa ficou mais lenta que a tolerância.
+
+    python benchmark.py                          # 1k, 10k e 100k linhas
+    python benchmark.py --tamanhos 1k,1M --saida atual.json --base anterior.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import streamlit.logger
+from streamlit import config
+
+# Fora do `streamlit run` os caches avisam que não há sessão; nada disso importa aqui.
+# A opção vale também para o streamlit.testing, que reaplica a configuração a cada execução
+config.set_option("logger.level", "error")
+streamlit.logger.set_log_level("error")
+
+import dados as app
+from paginas import PAGINAS
+from planilha_memoria import ClienteMemoria
+
+ID_PLANILHA = "benchmark"
+TAMANHOS = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1M": 1_000_000}
+LIMITE_LINHAS_XLSX = 20_000  # Acima disso o openpyxl leva minutos; o formato fica de fora
+LINHAS_LOTE_GRAVACAO = 100  # Linhas por envio no cenário de anexar em lote
+LINHAS_ALTERADAS = 10  # Linhas atualizadas/excluídas por repetição
+
+MARCAS = ["VOLVO", "SCANIA", "MERCEDES-BENZ", "DAF", "IVECO", "VOLKSWAGEN"]
+MODELOS = ["FH 540", "R 450", "ACTROS 2651", "XF 530", "S-WAY 540", "CONSTELLATION 24.280", "METEOR 28.460"]
+TIPOS_VEICULO = ["URBANO", "LONGO CURSO", "TOCO", "TRUCK"]
+PROPRIETARIOS = ["TRANSMARONI", "AGREGADO", "TERCEIRO"]
+STATUS = ["REVISÃO EM DIA", "PENDENTE"]
+STATUS_TACOGRAFO = ["TACÓGRAFO EM DIA", "PENDENTE"]
+OBSERVACOES = ["MOTORISTA ORIENTADO", "RETORNAR EM 7 DIAS", "CONSUMO ACIMA DA META", "SEM OBSERVAÇÕES"]
+LETRAS = np.array(list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"))
+
+# -------------------- DADOS SINTÉTICOS --------------------
+def interpretar_tamanho(texto):
+    """'10k' → 10000; também aceita números puros"""
+    return TAMANHOS.get(texto) or int(float(texto.lower().replace("k", "e3").replace("m", "e6")))
+
+def gerar_placas(rng, quantidade):
+    """Placas únicas no padrão Mercosul; ~30% escritas no padrão antigo (ABC-1234)"""
+    placas = pd.Index([])
+    while len(placas) < quantidade:
+        faltam = (quantidade - len(placas)) * 2
+        letras = LETRAS[rng.integers(0, 26, (faltam, 4))]
+        digitos = rng.integers(0, 10, (faltam, 3)).astype(str)
+        novas = pd.Series(letras[:, 0]) + letras[:, 1] + letras[:, 2] + digitos[:, 0] + letras[:, 3] + digitos[:, 1] + digitos[:, 2]
+        placas = placas.append(pd.Index(novas)).unique()
+    placas = pd.Series(placas[:quantidade])
+
+    antigas = rng.random(quantidade) < 0.3
+    digito = placas.str[4].map({letra: str(i) for i, letra in enumerate(LETRAS[:10])})
+    antigas &= digito.notna().to_numpy()
+    antigas_texto = placas.str[:3] + "-" + placas.str[3] + digito + placas.str[5:]
+    return placas.where(~antigas, antigas_texto).to_numpy()
+
+def formatar_datas(datas, formato):
+    return pd.Series(datas).dt.strftime(formato).to_numpy()
+
+def gerar_dados(linhas, semente=0):
+    """Abas no formato lido da planilha (todos os valores como texto), com `linhas` atendimentos"""
+    rng = np.random.default_rng(semente)
+    n_operacoes = int(np.clip(linhas // 200, 10, 500))
+    n_titulares = max(3, n_operacoes // 5)
+    n_veiculos = int(np.clip(linhas // 10, 50, 50_000))
+    n_colaboradores = int(np.clip(linhas // 5_000, 5, 40))
+    inicio = np.datetime64("2024-01-01T00:00:00")
+
+    metas = np.round(rng.uniform(1.8, 3.5, n_operacoes), 2)
+    nomes_operacoes = np.array([f"OPERAÇÃO {i:03d}" for i in range(n_operacoes)])
+    operacoes = pd.DataFrame({
+        "OPERAÇÃO": nomes_operacoes,
+        "OPERAÇÃO TITULAR": [f"TITULAR {i:02d}" for i in rng.integers(0, n_titulares, n_operacoes)],
+        "MARCA": rng.choice(MARCAS, n_operacoes),
+        "MODELO": rng.choice(MODELOS, n_operacoes),
+        "TIPO": rng.choice(TIPOS_VEICULO, n_operacoes),
+        "META": metas.astype(str),
+        "DATA_CRIACAO": formatar_datas(inicio + rng.integers(0, 86_400 * 30, n_operacoes).astype("timedelta64[s]"), app.FORMATO_DATA_HORA),
+        "CRIADO_POR": "admin@transmaroni.com.br"
+    })
+
+    operacao_veiculo = rng.integers(0, n_operacoes, n_veiculos)
+    veiculos = pd.DataFrame({
+        "PLACA": gerar_placas(rng, n_veiculos),
+        "MARCA": rng.choice(MARCAS, n_veiculos),
+        "MODELO": rng.choice(MODELOS, n_veiculos),
+        "OPERAÇÃO": nomes_operacoes[operacao_veiculo],
+        "PROPRIETÁRIO": rng.choice(PROPRIETARIOS, n_veiculos, p=[0.7, 0.2, 0.1]),
+        "TIPO": rng.choice(TIPOS_VEICULO, n_veiculos),
+        "DATA_CADASTRO": formatar_datas(inicio + rng.integers(0, 365, n_veiculos).astype("timedelta64[D]"), app.FORMATO_DATA)
+    })
+
+    # Cada atendimento é de um veículo da frota; 10% em operação diferente da cadastrada
+    veiculo = rng.integers(0, n_veiculos, linhas)
+    operacao = np.where(rng.random(linhas) < 0.9, operacao_veiculo[veiculo], rng.integers(0, n_operacoes, linhas))
+    abordagem = inicio + rng.integers(0, 730, linhas).astype("timedelta64[D]")
+    lancamento = np.sort(abordagem + rng.integers(0, 3 * 86_400, linhas).astype("timedelta64[s]"))
+    media = np.round(rng.normal(metas[operacao], 0.4), 2).astype(str)
+    media[rng.random(linhas) < 0.05] = ""
+    observacao = np.where(rng.random(linhas) < 0.15, rng.choice(OBSERVACOES, linhas), "")
+    colaborador = np.array([f"COLABORADOR {i:02d}" for i in range(n_colaboradores)])[rng.integers(0, n_colaboradores, linhas)]
+    atendimentos = pd.DataFrame({
+        "MOTORISTA": [f"MOTORISTA {i:05d}" for i in rng.integers(0, n_veiculos * 2, linhas)],
+        "COLABORADOR": colaborador,
+        "DATA_ABORDAGEM": formatar_datas(abordagem, app.FORMATO_DATA),
+        "DATA_LANCAMENTO": formatar_datas(lancamento, app.FORMATO_DATA_HORA),
+        "PLACA": veiculos["PLACA"].to_numpy()[veiculo],
+        "MODELO": veiculos["MODELO"].to_numpy()[veiculo],
+        "REVISAO": rng.choice(STATUS, linhas, p=[0.8, 0.2]),
+        "TACOGRAFO": rng.choice(STATUS_TACOGRAFO, linhas, p=[0.85, 0.15]),
+        "OPERACAO": nomes_operacoes[operacao],
+        "DATA_INICIO": formatar_datas(abordagem - np.timedelta64(7, "D"), app.FORMATO_DATA),
+        "DATA_FIM": formatar_datas(abordagem, app.FORMATO_DATA),
+        "META": metas[operacao].astype(str),
+        "MEDIA_ATENDIMENTO": media,
+        "OBSERVACAO": observacao,
+        "DATA_MODIFICACAO": formatar_datas(lancamento, app.FORMATO_DATA_HORA),
+        "MODIFICADO_POR": colaborador,
+        "ID_REGISTRO": [f"{a:016x}{b:016x}" for a, b in rng.integers(0, 2**63, (linhas, 2))]
+    })
+    return {"operacoes": operacoes, "veiculos": veiculos, "atendimentos": atendimentos}
+
+def novos_atendimentos(modelo, quantidade, rng):
+    """Linhas novas (com ID_REGISTRO próprio) copiadas de atendimentos sorteados"""
+    linhas = modelo.iloc[rng.integers(0, len(modelo), quantidade)].reset_index(drop=True).copy()
+    agora = datetime.now()
+    linhas["DATA_LANCAMENTO"] = agora.strftime(app.FORMATO_DATA_HORA)
+    linhas["DATA_MODIFICACAO"] = agora.strftime(app.FORMATO_DATA_HORA)
+    linhas["COLABORADOR"] = [f"BENCHMARK {i}" for i in rng.integers(0, 2**62, quantidade)]
+    linhas["ID_REGISTRO"] = [f"{a:016x}{b:016x}" for a, b in rng.integers(0, 2**63, (quantidade, 2))]
+    return linhas
+
+# -------------------- BACKENDS --------------------
+def montar_sheets(dados, diretorio):
+    """Backend Google Sheets sobre a planilha em memória, com snapshot em diretório temporário"""
+    app.DIRETORIO_SNAPSHOT = os.path.join(diretorio, "snapshot")
+    app.obter_snapshot.clear()
+    cliente = ClienteMemoria({
+        ID_PLANILHA: {aba_nome: [df.columns.tolist()] + df.to_numpy().tolist() for aba_nome, df in dados.items()}
+    })
+    return app.ArmazenamentoGoogleSheets(cliente, ID_PLANILHA)
+
+def montar_sqlite(dados, diretorio):
+    armazenamento = app.ArmazenamentoSQLite(os.path.join(diretorio, "benchmark.db"))
+    for aba_nome, df in dados.items():
+        armazenamento.substituir_tabela(aba_nome, df)
+    return armazenamento
+
+BACKENDS = {"sheets": montar_sheets, "sqlite": montar_sqlite}
+
+def chamadas_api(armazenamento):
+    """Total de chamadas registradas pela planilha em memória (None no SQLite)"""
+    if not isinstance(armazenamento, app.ArmazenamentoGoogleSheets):
+        return None
+    planilha = armazenamento.conectar()
+    return len(planilha.chamadas) + sum(len(aba.chamadas) for aba in planilha.abas.values())
+
+# -------------------- CRONOMETRAGEM --------------------
+def cronometrar(executar, repeticoes, preparar=None, armazenamento=None):
+    """Tempo de cada repetição de executar(preparado); preparar() fica fora da medição"""
+    tempos, chamadas = [], []
+    for _ in range(repeticoes):
+        argumento = preparar() if preparar else None
+        antes = chamadas_api(armazenamento) if armazenamento else None
+        inicio = time.perf_counter()
+        executar(argumento)
+        tempos.append(time.perf_counter() - inicio)
+        if antes is not None:
+            chamadas.append(chamadas_api(armazenamento) - antes)
+    return resumir(tempos, chamadas)
+
+def resumir(tempos, chamadas=()):
+    resultado = {
+        "mediana_s": statistics.median(tempos),
+        "min_s": min(tempos),
+        "max_s": max(tempos),
+        "repeticoes": len(tempos)
+    }
+    if chamadas:
+        resultado["chamadas_api"] = statistics.median(chamadas)
+    return resultado
+
+class Execucao:
+    """Roda os cenários de um tamanho e acumula os resultados"""
+
+    def __init__(self, linhas, repeticoes, cenarios):
+        self.linhas = linhas
+        self.repeticoes = repeticoes
+        self.cenarios = cenarios
+        self.resultados = []
+
+    def selecionado(self, cenario):
+        return not self.cenarios or any(cenario.startswith(prefixo) for prefixo in self.cenarios)
+
+    def medir(self, cenario, backend, executar, preparar=None, armazenamento=None, repeticoes=None):
+        if self.selecionado(cenario):
+            self.registrar(cenario, backend, cronometrar(executar, repeticoes or self.repeticoes, preparar, armazenamento))
+
+    def registrar(self, cenario, backend, resultado):
+        self.resultados.append({"cenario": cenario, "backend": backend, "linhas": self.linhas, **resultado})
+        chamadas = f"  ({resultado['chamadas_api']:g} chamadas)" if "chamadas_api" in resultado else ""
+        print(f"  {cenario:<34} {backend:<7} {resultado['mediana_s'] * 1000:>10.1f} ms{chamadas}", flush=True)
+
+# -------------------- CENÁRIOS --------------------
+def cenarios_leitura(execucao, backend, armazenamento):
+    """Carga completa e, no Sheets, carga com o snapshot local já em dia"""
+    if backend == "sheets":
+        snapshot = app.obter_snapshot(ID_PLANILHA)
+
+        def descartar_snapshot():
+            for aba_nome in app.ABAS_SISTEMA:
+                snapshot.descartar(aba_nome)
+
+        execucao.medir("carga.completa", backend, lambda _: armazenamento.carregar_tabelas(app.ABAS_SISTEMA),
+                       preparar=descartar_snapshot, armazenamento=armazenamento)
+        armazenamento.carregar_tabelas(app.ABAS_SISTEMA)
+        execucao.medir("carga.snapshot", backend, lambda _: armazenamento.carregar_tabelas(app.ABAS_SISTEMA),
+                       armazenamento=armazenamento)
+    else:
+        execucao.medir("carga.completa", backend, lambda _: armazenamento.carregar_tabelas(app.ABAS_SISTEMA))
+
+def cenarios_consulta(execucao, dados, tabelas, rng):
+    """Conversão de tipos, Dashboard, Histórico, placas e exportação (independem do backend)"""
+    atendimentos, operacoes, veiculos = tabelas["atendimentos"], tabelas["operacoes"], tabelas["veiculos"]
+
+    execucao.medir("converter_tipos", "-", lambda df: app.aplicar_esquema("atendimentos", df),
+                   preparar=lambda: dados["atendimentos"].copy())
+
+    def dashboard(_):
+        agregados = app.construir_agregados(atendimentos, operacoes)
+        for dimensao in app.DIMENSOES_AGREGADOS:
+            agregados.contagem(dimensao)
+        agregados.media("titular")
+        agregados.media_geral()
+
+    execucao.medir("dashboard.agregados", "-", dashboard)
+
+    agregados = app.construir_agregados(atendimentos, operacoes)
+    novas = app.aplicar_esquema("atendimentos", novos_atendimentos(atendimentos.astype(object), 1, rng))
+    execucao.medir("dashboard.agregados_incremental", "-",
+                   lambda _: app.estender_agregados(agregados, [("anexar", novas)], operacoes))
+
+    execucao.medir("dashboard.cubo", "-", lambda _: app.construir_cubo(atendimentos, operacoes))
+    cubo = app.construir_cubo(atendimentos, operacoes)
+    execucao.medir("dashboard.cubo_incremental", "-",
+                   lambda _: app.estender_cubo(cubo, [("anexar", novas)], operacoes))
+
+    def consultar_cubo(_):
+        # Tendências do Dashboard: semanal total, mensal por titular e drill-down em um titular
+        cubo.comparar_periodos("semana", atendimentos["DATA_ABORDAGEM"].max())
+        cubo.consultar("semana")
+        cubo.consultar("mes", ("titular",), limite=app.LIMITE_CATEGORIAS_GRAFICO)
+        titular = cubo.valores("titular")[0]
+        cubo.consultar("semana", ("operacao",), {"titular": titular}, limite=app.LIMITE_CATEGORIAS_GRAFICO)
+
+    execucao.medir("dashboard.cubo_consulta", "-", consultar_cubo)
+
+    execucao.medir("historico.indice", "-", lambda _: app.construir_indice_historico(atendimentos, operacoes))
+    indice = app.construir_indice_historico(atendimentos, operacoes)
+    inicio, fim = indice.periodo()
+    titulares = indice.valores("titular")
+
+    def consultar_historico(_):
+        # Últimos 90 dias, dois titulares e só pendências, como na tela do Histórico
+        filtrado = indice.filtrar(fim - pd.Timedelta(days=90), fim, titular=titulares[:2], status=["PENDENTE"])
+        app.paginar(filtrado, 'DATA_ABORDAGEM', False, 0, 25)
+        app.paginar(indice.filtrar(inicio, fim), 'MEDIA_ATENDIMENTO', True, 0, 25)
+
+    execucao.medir("historico.filtro", "-", consultar_historico)
+
+    execucao.medir("placa.indice", "-", lambda _: app.IndicePlacas(veiculos))
+    indice_placas = app.IndicePlacas(veiculos)
+    placas = atendimentos["PLACA"].to_numpy()[rng.integers(0, len(atendimentos), 1000)]
+
+    def buscar_placas(_):
+        for placa in placas:
+            indice_placas.veiculo(placa)
+        for placa in placas[:100]:
+            indice.buscar_placa(placa)
+        indice_placas.pesquisar(placas[0][:3])
+
+    execucao.medir("placa.busca_x1000", "-", buscar_placas)
+
+    enriquecidos = app.enriquecer_atendimentos(atendimentos, operacoes)
+    for formato in app.FORMATOS_EXPORTACAO:
+        if formato == "Excel (XLSX)" and len(enriquecidos) > LIMITE_LINHAS_XLSX:
+            continue
+        execucao.medir(f"exportar.{formato}", "-", lambda _, formato=formato: app.gerar_exportacao(enriquecidos, formato),
+                       repeticoes=min(execucao.repeticoes, 3))
+
+def cenarios_gravacao(execucao, backend, armazenamento, rng):
+    """Cada caminho de gravação do backend, sobre a tabela já carregada"""
+    atendimentos = armazenamento.carregar_tabela("atendimentos")
+    veiculos = armazenamento.carregar_tabela("veiculos")
+    modelo = atendimentos.astype(object)
+    # Linhas distintas para cada repetição de atualizar/excluir (as excluídas não voltam)
+    sorteio = iter(rng.permutation(len(atendimentos)).reshape(-1, LINHAS_ALTERADAS) if len(atendimentos) >= LINHAS_ALTERADAS else [])
+
+    def anexar(df):
+        armazenamento.anexar_linhas("atendimentos", df)
+
+    execucao.medir("gravar.anexar", backend, anexar, armazenamento=armazenamento,
+                   preparar=lambda: novos_atendimentos(modelo, 1, rng))
+    execucao.medir("gravar.anexar_lote", backend, anexar, armazenamento=armazenamento,
+                   preparar=lambda: novos_atendimentos(modelo, LINHAS_LOTE_GRAVACAO, rng))
+
+    def linhas_alteradas():
+        linhas = atendimentos.iloc[next(sorteio)].copy()
+        linhas["MEDIA_ATENDIMENTO"] = np.round(rng.uniform(1.5, 4, len(linhas)), 2)
+        return linhas
+
+    execucao.medir("gravar.atualizar", backend, lambda df: armazenamento.atualizar_linhas("atendimentos", df),
+                   preparar=linhas_alteradas, armazenamento=armazenamento)
+    execucao.medir("gravar.excluir", backend, lambda df: armazenamento.excluir_linhas("atendimentos", df),
+                   preparar=lambda: atendimentos.iloc[next(sorteio)], armazenamento=armazenamento)
+
+    def veiculos_editados():
+        editados = veiculos.copy()
+        posicoes = rng.integers(0, len(editados), 5)
+        editados.loc[editados.index[posicoes], "PROPRIETÁRIO"] = rng.choice(PROPRIETARIOS, len(posicoes))
+        return editados
+
+    execucao.medir("gravar.substituir", backend, lambda df: armazenamento.substituir_tabela("veiculos", df),
+                   preparar=veiculos_editados, armazenamento=armazenamento)
+
+    def veiculos_cadastrados():
+        # Cadastro da página Veículos: só as linhas alteradas e as novas
+        editados = veiculos.iloc[rng.integers(0, len(veiculos), 5)].copy()
+        editados["PROPRIETÁRIO"] = rng.choice(PROPRIETARIOS, len(editados))
+        novos = veiculos.iloc[rng.integers(0, len(veiculos), 2)].assign(PLACA=gerar_placas(rng, 2))
+        return pd.concat([editados, novos], ignore_index=True)
+
+    execucao.medir("gravar.mesclar", backend, lambda df: armazenamento.mesclar_linhas("veiculos", df),
+                   preparar=veiculos_cadastrados, armazenamento=armazenamento)
+
+    # Custo que a sessão sente: enfileirar aplica no cache e volta; a gravação fica com a thread
+    fila = app.FilaGravacao(armazenamento)
+
+    def esperar_fila():
+        while fila.pendentes():
+            time.sleep(0.05)
+        return novos_atendimentos(modelo, 1, rng)
+
+    execucao.medir("gravar.fila_enfileirar", backend, lambda df: fila.enfileirar("atendimentos", df, "anexar"),
+                   preparar=esperar_fila)
+    esperar_fila()
+
+def cenarios_partida(execucao):
+    """Importação de dados.py e de cada página num interpretador novo (streamlit e pandas já carregados, como no servidor)"""
+    diretorio = os.path.dirname(os.path.abspath(__file__))
+    for modulo in ["dados"] + [f"paginas.{pagina}" for pagina in PAGINAS.values()]:
+        cenario = f"partida.importar.{modulo}"
+        if not execucao.selecionado(cenario):
+            continue
+        codigo = (
+            "import time, streamlit, pandas, streamlit.logger; streamlit.logger.set_log_level('error'); "
+            + ("import dados; " if modulo != "dados" else "")
+            + f"inicio = time.perf_counter(); import {modulo}; print(time.perf_counter() - inicio)"
+        )
+        tempos = [
+            float(subprocess.run([sys.executable, "-c", codigo], cwd=diretorio, capture_output=True, text=True, check=True).stdout)
+            for _ in range(execucao.repeticoes)
+        ]
+        execucao.registrar(cenario, "-", resumir(tempos))
+
+def cenarios_interface(execucao, backend, armazenamento):
+    """Tempo de cada nova execução do script (rerun) com uma página aberta, via streamlit.testing"""
+    from streamlit.testing.v1 import AppTest
+    
+    # O script lê o backend do módulo dados na hora de inicializar
+    app.BACKEND_ARMAZENAMENTO, app.CAMINHO_SQLITE = backend, armazenamento.caminho
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "DeepLearning.py")
+    for rotulo, modulo in PAGINAS.items():
+        teste = AppTest.from_file(script, default_timeout=600)
+        teste.session_state["autenticado"] = True
+        teste.session_state["usuario"] = "benchmark"
+        teste.session_state["nome_usuario"] = "Benchmark"
+        teste.session_state["menu_navigation"] = rotulo
+        teste.run()
+        if teste.exception:
+            raise RuntimeError(f"{rotulo}: {teste.exception[0].value}")
+        execucao.medir(f"interface.rerun.{modulo}", backend, lambda _: teste.run())
+
+# -------------------- RELATÓRIO --------------------
+def comparar(resultados, base, tolerancia):
+    """Etapas (cenário, backend, linhas) cuja mediana piorou mais que a tolerância em relação à base"""
+    anteriores = {(r["cenario"], r["backend"], r["linhas"]): r for r in base["resultados"]}
+    regressoes = []
+    for resultado in resultados:
+        anterior = anteriores.get((resultado["cenario"], resultado["backend"], resultado["linhas"]))
+        if anterior and resultado["mediana_s"] > anterior["mediana_s"] * (1 + tolerancia):
+            regressoes.append({**resultado, "base_mediana_s": anterior["mediana_s"],
+                               "variacao": resultado["mediana_s"] / anterior["mediana_s"] - 1})
+        elif anterior and resultado.get("chamadas_api", 0) > anterior.get("chamadas_api", 0):
+            regressoes.append({**resultado, "base_chamadas_api": anterior.get("chamadas_api", 0)})
+    return regressoes
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos caminhos críticos com dados sintéticos")
+    parser.add_argument("--tamanhos", default="1k,10k,100k", help="Atendimentos por execução (1k, 10k, 100k, 1M ou número)")
+    parser.add_argument("--backends", default="sheets,sqlite", help="Backends de armazenamento medidos")
+    parser.add_argument("--cenarios", default="", help="Prefixos dos cenários a rodar (ex.: carga,gravar.anexar)")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--saida", default="resultados_benchmark.json")
+    parser.add_argument("--base", help="JSON de uma execução anterior para comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="Piora relativa aceita antes de acusar regressão")
+    args = parser.parse_args()
+
+    cenarios = [c for c in args.cenarios.split(",") if c]
+    backends = [b for b in args.backends.split(",") if b]
+    # Importações não dependem do volume de dados: medidas uma vez, com linhas = 0
+    print("\n== partida ==", flush=True)
+    partida = Execucao(0, args.repeticoes, cenarios)
+    cenarios_partida(partida)
+    resultados = partida.resultados
+    for tamanho in args.tamanhos.split(","):
+        linhas = interpretar_tamanho(tamanho)
+        print(f"\n== {linhas:,} atendimentos ==", flush=True)
+        inicio = time.perf_counter()
+        dados = gerar_dados(linhas, args.semente)
+        print(f"  (dados gerados em {time.perf_counter() - inicio:.1f} s)", flush=True)
+
+        execucao = Execucao(linhas, args.repeticoes, cenarios)
+        rng = np.random.default_rng(args.semente + 1)
+        tabelas = None
+        for backend in backends:
+            with tempfile.TemporaryDirectory(prefix="benchmark_abordagens_") as diretorio:
+                armazenamento = BACKENDS[backend](dados, diretorio)
+                cenarios_leitura(execucao, backend, armazenamento)
+                if tabelas is None:
+                    tabelas = armazenamento.carregar_tabelas(app.ABAS_SISTEMA)
+                    cenarios_consulta(execucao, dados, tabelas, rng)
+                cenarios_gravacao(execucao, backend, armazenamento, rng)
+                if backend == "sqlite":
+                    # O script só troca de backend pelo módulo dados; a planilha em memória não tem como entrar
+                    cenarios_interface(execucao, backend, armazenamento)
+        resultados.extend(execucao.resultados)
+
+    etapas, contadores = app.obter_metricas().resumo()
+    relatorio = {
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "ambiente": {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "plataforma": platform.platform(),
+            "processador": platform.processor() or platform.machine()
+        },
+        "parametros": vars(args),
+        "resultados": resultados,
+        # Mesmas etapas do painel de desempenho, acumuladas ao longo de toda a execução
+        "etapas_internas": etapas.to_dict(orient="records"),
+        "contadores": contadores
+    }
+
+    codigo_saida = 0
+    if args.base:
+        with open(args.base, encoding="utf-8") as arquivo:
+            regressoes = comparar(resultados, json.load(arquivo), args.tolerancia)
+        relatorio["regressoes"] = regressoes
+        print(f"\n{len(regressoes)} regressão(ões) em relação a {args.base}")
+        for regressao in regressoes:
+            if "variacao" in regressao:
+                detalhe = f"{regressao['base_mediana_s'] * 1000:.1f} → {regressao['mediana_s'] * 1000:.1f} ms ({regressao['variacao']:+.0%})"
+            else:
+                detalhe = f"{regressao['base_chamadas_api']:g} → {regressao['chamadas_api']:g} chamadas"
+            print(f"  {regressao['cenario']} [{regressao['backend']}, {regressao['linhas']:,}]: {detalhe}")
+        codigo_saida = 1 if regressoes else 0
+
+    with open(args.saida, "w", encoding="utf-8") as arquivo:
+        json.dump(relatorio, arquivo, ensure_ascii=False, indent=2, default=str)
+    print(f"\nResultados gravados em {args.saida}")
+    return codigo_saida
+
+if __name__ == "__main__":
+    sys.exit(main())
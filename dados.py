@@ -0,0 +1,2763 @@
+"""Camada de dados do sistema, compartilhada pelo script principal e pelas páginas
+
+Configuração, cache das abas, backends de armazenamento, fila de gravação,
+índices/agregados e exportação. Como é um módulo importado (e não o script
+executado a cada interação), tudo aqui é definido uma única vez por processo.
+gspread e oauth2client só são importados quando o backend Google Sheets é usado.
+"""
+import time
+INICIO_IMPORTACAO = time.perf_counter()
+
+import streamlit as st
+import pandas as pd
+from datetime import datetime
+import numpy as np
+import threading
+import json
+import os
+import sys
+import sqlite3
+from io import BytesIO
+import bisect
+import re
+import gzip
+import uuid
+import random
+import importlib.util
+import logging
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+# Copy-on-write (padrão a partir do pandas 3): as abas em cache são
+# compartilhadas entre sessões, e cada sessão recebe só uma visão delas
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+# -------------------- CONFIGURAÇÃO AVANÇADA --------------------
+SCOPE = ["https://spreadsheets.google.com/feeds",
+         "https://www.googleapis.com/auth/drive",
+         "https://www.googleapis.com/auth/spreadsheets"]
+
+# Configuração de cache otimizada
+CACHE_DURATION = 180  # 3 minutos em segundos
+FRACAO_TTL_ATUALIZACAO = 0.8  # Recarrega em segundo plano ao atingir 80% do TTL
+INTERVALO_MINIMO_ATUALIZACAO = 10  # Segundos entre recargas de fundo seguidas (ex.: planilha fora do ar)
+DIRETORIO_SNAPSHOT = os.environ.get("ABORDAGENS_SNAPSHOT_DIR", ".snapshot")  # Snapshot local das abas
+INTERVALO_SINCRONIZACAO_COMPLETA = 6 * 3600  # Releitura completa a cada 6 horas
+LIMITE_ALTERACOES_CACHE = 200  # Anexos/remoções guardados para atualizar derivados
+LIMITE_EXPORTACOES_CACHE = 8  # Arquivos exportados mantidos em memória (todas as sessões)
+LIMITE_GRAFICOS_CACHE = 16  # Figuras do Dashboard mantidas em memória (todas as sessões)
+LIMITE_CATEGORIAS_GRAFICO = 20  # Acima disso, as menores categorias de um gráfico viram "Outros"
+LINHAS_POR_BLOCO_EXPORTACAO = 20000  # Linhas convertidas por vez ao gerar CSV
+JANELA_LOTE_GRAVACAO = 0.5  # Segundos que a fila espera para juntar envios simultâneos
+MAX_TENTATIVAS_GRAVACAO = 6  # Tentativas por lote antes de desistir
+ESPERA_BASE_GRAVACAO = 2  # Espera (s) da primeira nova tentativa; dobra a cada falha
+ESPERA_MAXIMA_GRAVACAO = 60
+REQUISICOES_POR_MINUTO_API = 60  # Cota de requisições do Google Sheets por usuário (conta de serviço)
+RAJADA_API = 10  # Requisições que podem sair de uma vez antes de o limite entrar em ação
+MAX_TENTATIVAS_API = 4  # Tentativas de cada chamada em erro 429/5xx (escritas: só 429)
+ESPERA_BASE_API = 1  # Espera (s) da primeira nova tentativa; dobra a cada falha
+AMOSTRAS_POR_SPAN = 1000  # Últimas durações guardadas por etapa (p50/p95)
+ARQUIVO_METRICAS = os.environ.get("ABORDAGENS_METRICAS_ARQUIVO")  # Arquivo Prometheus (textfile collector)
+INTERVALO_EXPORTACAO_METRICAS = 15  # Segundos entre regravações do arquivo de métricas
+LOG_JSON = os.environ.get("ABORDAGENS_LOG_JSON") == "1"  # Etapas e eventos como JSON no stderr
+SENHA_ADMIN = "Telemetria@2025"  # Senha para modificar operações e veículos
+
+# Backend de armazenamento: "sheets" (Google Sheets) ou "sqlite" (banco local)
+BACKEND_ARMAZENAMENTO = os.environ.get("ABORDAGENS_BACKEND", "sheets")
+SHEET_ID = os.environ.get("ABORDAGENS_SHEET_ID", "1VQBd0TR0jlmP04hw8N4HTXnfOqeBmTvSQyRZby1iyb0")
+CAMINHO_SQLITE = os.environ.get("ABORDAGENS_SQLITE", "abordagens.db")
+
+# Dados de usuários para autenticação
+USUARIOS = {
+    "lucas.alves@transmaroni.com.br": {
+        "senha": "Maroni@25",
+        "nome": "Lucas Roberto de Sousa Alves"
+    },
+    "amanda.soares@transmaroni.com.br": {
+        "senha": "Maroni@25",
+        "nome": "Amanda Lima Soares"
+    },
+    "james.rosario@transmaroni.com.br": {
+        "senha": "Maroni@25",
+        "nome": "James Marques Do Rosario"
+    },
+    "henrique.araujo@transmaroni.com.br": {
+        "senha": "Maroni@25",
+        "nome": "Henrique Torres Araujo"
+    },
+    "amanda.carvalho@transmaroni.com.br": {
+        "senha": "Maroni@25",
+        "nome": "Amanda Stefane Santos Carvalho"
+    },
+    "giovanna.oliveira@transmaroni.com.br": {
+        "senha": "Maroni@25",
+        "nome": "Giovanna Assunção de Oliveira"
+    }
+}
+
+# -------------------- FUNÇÕES SUPER OTIMIZADAS --------------------
+@st.cache_resource(show_spinner=False, ttl=3600)
+def get_google_sheets_client():
+    """Obtém cliente do Google Sheets com cache prolongado"""
+    try:
+        import gspread
+        from oauth2client.service_account import ServiceAccountCredentials
+        
+        creds_dict = {
+            "type": st.secrets["google_service_account"]["type"],
+            "project_id": st.secrets["google_service_account"]["project_id"],
+            "private_key_id": st.secrets["google_service_account"]["private_key_id"],
+            "private_key": st.secrets["google_service_account"]["private_key"].replace('\\n', '\n'),
+            "client_email": st.secrets["google_service_account"]["client_email"],
+            "client_id": st.secrets["google_service_account"]["client_id"],
+            "auth_uri": st.secrets["google_service_account"]["auth_uri"],
+            "token_uri": st.secrets["google_service_account"]["token_uri"],
+            "auth_provider_x509_cert_url": st.secrets["google_service_account"]["auth_provider_x509_cert_url"],
+            "client_x509_cert_url": st.secrets["google_service_account"]["client_x509_cert_url"]
+        }
+        
+        creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, SCOPE)
+        return gspread.authorize(creds)
+    except Exception as e:
+        st.error(f"Erro na autenticação: {str(e)}")
+        return None
+
+# -------------------- MÉTRICAS --------------------
+logger_metricas = logging.getLogger("abordagens.metricas")
+if LOG_JSON and not logger_metricas.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger_metricas.addHandler(_handler)
+    logger_metricas.setLevel(logging.INFO)
+    logger_metricas.propagate = False
+
+class Metricas:
+    """Durações por etapa (spans) e contadores, agregados no processo
+    
+    Cada span guarda as últimas AMOSTRAS_POR_SPAN durações para p50/p95, além
+    de contagem e soma totais. Contadores só crescem (estilo Prometheus).
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spans = {}
+        self._contadores = {}
+        self._exportado_em = 0.0
+    
+    def registrar_span(self, nome, duracao):
+        with self._lock:
+            span = self._spans.get(nome)
+            if span is None:
+                span = self._spans[nome] = {"amostras": deque(maxlen=AMOSTRAS_POR_SPAN), "quantidade": 0, "soma": 0.0}
+            span["amostras"].append(duracao)
+            span["quantidade"] += 1
+            span["soma"] += duracao
+        if logger_metricas.isEnabledFor(logging.INFO):
+            logger_metricas.info(json.dumps({"ts": time.time(), "tipo": "span", "nome": nome, "duracao_ms": round(duracao * 1000, 3)}))
+        self._talvez_exportar()
+    
+    def contar(self, nome, valor=1):
+        with self._lock:
+            self._contadores[nome] = self._contadores.get(nome, 0) + valor
+    
+    def resumo(self):
+        """DataFrame com quantidade, p50, p95 e total (ms) por etapa, e dict dos contadores"""
+        with self._lock:
+            linhas = [
+                {
+                    "etapa": nome,
+                    "quantidade": span["quantidade"],
+                    "p50_ms": float(np.percentile(span["amostras"], 50)) * 1000,
+                    "p95_ms": float(np.percentile(span["amostras"], 95)) * 1000,
+                    "total_s": span["soma"]
+                }
+                for nome, span in sorted(self._spans.items())
+            ]
+            contadores = dict(sorted(self._contadores.items()))
+        return pd.DataFrame(linhas, columns=["etapa", "quantidade", "p50_ms", "p95_ms", "total_s"]), contadores
+    
+    def prometheus(self):
+        """Métricas no formato de texto do Prometheus"""
+        resumo, contadores = self.resumo()
+        linhas = ["# TYPE abordagens_etapa_segundos summary"]
+        for _, linha in resumo.iterrows():
+            rotulo = linha["etapa"].replace("\\", "\\\\").replace('"', '\\"')
+            linhas += [
+                f'abordagens_etapa_segundos{{etapa="{rotulo}",quantile="0.5"}} {linha["p50_ms"] / 1000:.6f}',
+                f'abordagens_etapa_segundos{{etapa="{rotulo}",quantile="0.95"}} {linha["p95_ms"] / 1000:.6f}',
+                f'abordagens_etapa_segundos_sum{{etapa="{rotulo}"}} {linha["total_s"]:.6f}',
+                f'abordagens_etapa_segundos_count{{etapa="{rotulo}"}} {linha["quantidade"]}'
+            ]
+        linhas.append("# TYPE abordagens_eventos_total counter")
+        for nome, valor in contadores.items():
+            linhas.append(f'abordagens_eventos_total{{nome="{nome}"}} {valor}')
+        return "\n".join(linhas) + "\n"
+    
+    def _talvez_exportar(self):
+        if not ARQUIVO_METRICAS or time.time() - self._exportado_em < INTERVALO_EXPORTACAO_METRICAS:
+            return
+        self._exportado_em = time.time()
+        try:
+            with open(ARQUIVO_METRICAS + ".tmp", "w", encoding="utf-8") as f:
+                f.write(self.prometheus())
+            os.replace(ARQUIVO_METRICAS + ".tmp", ARQUIVO_METRICAS)
+        except OSError:
+            pass
+
+@st.cache_resource(show_spinner=False)
+def obter_metricas():
+    """Métricas do processo, compartilhadas por todas as sessões e threads"""
+    return Metricas()
+
+@contextmanager
+def medir(nome):
+    """Span nomeado: registra a duração do bloco, mesmo que ele termine em exceção"""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        obter_metricas().registrar_span(nome, time.perf_counter() - inicio)
+
+def contar(nome, valor=1):
+    obter_metricas().contar(nome, valor)
+
+# -------------------- CLIENTE COM CONTROLE DE COTA --------------------
+# Códigos HTTP do Google que indicam falha passageira (cota excedida e erros do servidor)
+CODIGOS_ERRO_TEMPORARIO = {429, 500, 502, 503, 504}
+# Métodos de leitura: chamadas idênticas simultâneas compartilham uma só requisição
+METODOS_LEITURA_API = {
+    "open_by_key", "worksheet", "worksheets", "values_batch_get", "get_all_values",
+    "get_values", "batch_get", "get_all_records", "row_values", "col_values"
+}
+
+def erro_temporario(erro):
+    """Se vale tentar de novo: cota/instabilidade do Google, rede ou banco ocupado"""
+    # gspread e requests só entram no processo com o backend Sheets; sem eles, o erro não é deles
+    erros_gspread = sys.modules.get("gspread.exceptions")
+    if erros_gspread and isinstance(erro, erros_gspread.APIError):
+        return erro.code in CODIGOS_ERRO_TEMPORARIO
+    temporarios = (ConnectionError, TimeoutError, sqlite3.OperationalError)
+    erros_requests = sys.modules.get("requests.exceptions")
+    if erros_requests:
+        temporarios += (erros_requests.RequestException,)
+    return isinstance(erro, temporarios)
+
+def erro_cota(erro):
+    """Se o Google recusou a chamada por cota (429), sem aplicá-la"""
+    erros_gspread = sys.modules.get("gspread.exceptions")
+    return bool(erros_gspread) and isinstance(erro, erros_gspread.APIError) and erro.code == 429
+
+class BaldeFichas:
+    """Limitador token bucket: taxa fichas por segundo, acumulando até capacidade"""
+    
+    def __init__(self, taxa, capacidade):
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self._fichas = float(capacidade)
+        self._atualizado_em = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def consumir(self):
+        """Retira uma ficha, esperando se preciso; devolve o tempo esperado (s)"""
+        with self._lock:
+            agora = time.monotonic()
+            self._fichas = min(self.capacidade, self._fichas + (agora - self._atualizado_em) * self.taxa)
+            self._atualizado_em = agora
+            # A ficha é reservada já; quem chega depois espera a sua vez na fila
+            self._fichas -= 1
+            espera = -self._fichas / self.taxa if self._fichas < 0 else 0.0
+        if espera:
+            time.sleep(espera)
+        return espera
+
+class VooUnico:
+    """Single-flight: chamadas simultâneas com a mesma chave esperam a primeira e recebem o mesmo resultado"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._em_andamento = {}
+    
+    def executar(self, chave, funcao):
+        """Devolve (resultado, compartilhado)"""
+        with self._lock:
+            voo = self._em_andamento.get(chave)
+            lider = voo is None
+            if lider:
+                voo = {"evento": threading.Event(), "resultado": None, "erro": None}
+                self._em_andamento[chave] = voo
+        
+        if not lider:
+            voo["evento"].wait()
+            if voo["erro"] is not None:
+                raise voo["erro"]
+            return voo["resultado"], True
+        
+        try:
+            voo["resultado"] = funcao()
+            return voo["resultado"], False
+        except Exception as e:
+            voo["erro"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._em_andamento[chave]
+            voo["evento"].set()
+
+class ControleCota:
+    """Limite de taxa, coalescência de leituras e novas tentativas das chamadas à API
+    
+    Compartilhado por todas as sessões do processo, pois a cota do Google é
+    da conta de serviço e não de cada usuário do app.
+    """
+    
+    def __init__(self, requisicoes_por_minuto, rajada):
+        self.balde = BaldeFichas(requisicoes_por_minuto / 60, rajada)
+        self.voo_unico = VooUnico()
+        self._lock = threading.Lock()
+        self.contadores = {"chamadas": 0, "coalescidas": 0, "novas_tentativas": 0, "erros": 0, "espera_cota_s": 0.0}
+    
+    def _contar(self, nome, valor=1):
+        with self._lock:
+            self.contadores[nome] += valor
+        contar(f"api_{nome}", valor)
+    
+    def estatisticas(self):
+        with self._lock:
+            return dict(self.contadores)
+    
+    def _chamar(self, funcao, leitura):
+        for tentativa in range(1, MAX_TENTATIVAS_API + 1):
+            self._contar("espera_cota_s", self.balde.consumir())
+            self._contar("chamadas")
+            try:
+                return funcao()
+            except Exception as e:
+                # Escrita que deu timeout ou 5xx pode já ter sido aplicada: quem decide
+                # se reenvia é a FilaGravacao, que confere antes o que chegou à planilha
+                repetir = erro_temporario(e) if leitura else erro_cota(e)
+                if not repetir or tentativa == MAX_TENTATIVAS_API:
+                    self._contar("erros")
+                    raise
+                self._contar("novas_tentativas")
+                time.sleep(ESPERA_BASE_API * 2 ** (tentativa - 1) * random.uniform(0.5, 1.5))
+    
+    def executar(self, chave, funcao, leitura):
+        """Executa a chamada; leituras idênticas em andamento são reaproveitadas"""
+        if not leitura:
+            return self._chamar(funcao, leitura)
+        resultado, compartilhado = self.voo_unico.executar(chave, lambda: self._chamar(funcao, leitura))
+        if compartilhado:
+            self._contar("coalescidas")
+        return resultado
+
+class ProxyCota:
+    """Envolve Client/Spreadsheet/Worksheet do gspread: toda chamada de método passa pelo ControleCota"""
+    
+    def __init__(self, objeto, controle):
+        self._objeto = objeto
+        self._controle = controle
+    
+    def __getattr__(self, nome):
+        atributo = getattr(self._objeto, nome)
+        if not callable(atributo):
+            return atributo
+        
+        def chamar(*args, **kwargs):
+            chave = (type(self._objeto).__name__, getattr(self._objeto, "id", None), getattr(self._objeto, "title", None), nome, repr(args), repr(sorted(kwargs.items())))
+            resultado = self._controle.executar(chave, lambda: atributo(*args, **kwargs), nome in METODOS_LEITURA_API)
+            # Planilhas e abas devolvidas também passam a ser controladas
+            if nome in ("open_by_key", "worksheet", "add_worksheet"):
+                return ProxyCota(resultado, self._controle)
+            if nome == "worksheets":
+                return [ProxyCota(aba, self._controle) for aba in resultado]
+            return resultado
+        return chamar
+
+@st.cache_resource(show_spinner=False)
+def obter_controle_cota():
+    """Controle de cota único do processo"""
+    return ControleCota(REQUISICOES_POR_MINUTO_API, RAJADA_API)
+
+# Abas carregadas pelo sistema
+ABAS_SISTEMA = ["operacoes", "veiculos", "atendimentos"]
+
+class CacheAbas:
+    """Cache de DataFrames por aba, cada uma com TTL e versão próprios
+    
+    A versão de uma aba só avança quando ela é recarregada, invalidada ou
+    recebe linhas novas, então gravar em uma aba não descarta as demais.
+    """
+    
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entradas = {}
+        self._versoes = {}
+        self._derivados = {}
+        self.recargas = VooUnico()
+    
+    def versao(self, aba_nome):
+        """Versão atual dos dados da aba"""
+        return self._versoes.get(aba_nome, 0)
+    
+    def obter(self, aba_nome, aceitar_expirado=False):
+        """Retorna uma visão do DataFrame em cache ou None se expirado/ausente
+        
+        A visão não copia os dados: com copy-on-write, o que a sessão alterar
+        nela é copiado só naquele momento, sem afetar o DataFrame compartilhado.
+        Com aceitar_expirado=True, devolve a última versão mesmo vencida
+        (stale-while-revalidate: a recarga acontece em segundo plano).
+        """
+        with self._lock:
+            entrada = self._entradas.get(aba_nome)
+            if entrada is None or (not aceitar_expirado and self._expirada(entrada)):
+                return None
+            return entrada["df"].copy(deep=False)
+    
+    def _expirada(self, entrada):
+        return time.time() - entrada["carregado_em"] > self.ttl
+    
+    def expirada(self, aba_nome):
+        with self._lock:
+            entrada = self._entradas.get(aba_nome)
+            return entrada is None or self._expirada(entrada)
+    
+    def idade(self, aba_nome):
+        """Segundos desde a última carga da aba (None se ausente)"""
+        with self._lock:
+            entrada = self._entradas.get(aba_nome)
+            return None if entrada is None else time.time() - entrada["carregado_em"]
+    
+    def armazenar(self, aba_nome, df):
+        """Guarda o DataFrame carregado da planilha e avança a versão da aba"""
+        with self._lock:
+            entrada = self._entradas.get(aba_nome)
+            if entrada is not None and entrada["df"].equals(df):
+                # Nada mudou: renova o prazo sem invalidar índices e agregados
+                entrada["carregado_em"] = time.time()
+                return df.copy(deep=False)
+            self._versoes[aba_nome] = self.versao(aba_nome) + 1
+            # versao_base marca a última troca completa; anexos e remoções
+            # ficam registrados em "alteracoes" para atualização incremental
+            self._entradas[aba_nome] = {
+                "df": df,
+                "carregado_em": time.time(),
+                "versao_base": self.versao(aba_nome),
+                "alteracoes": []
+            }
+        return df.copy(deep=False)
+    
+    def _registrar_alteracao(self, aba_nome, entrada, tipo, linhas):
+        self._versoes[aba_nome] = self.versao(aba_nome) + 1
+        entrada["alteracoes"].append((self.versao(aba_nome), tipo, linhas))
+        if len(entrada["alteracoes"]) > LIMITE_ALTERACOES_CACHE:
+            # Histórico longo demais: os derivados passam a ser reconstruídos
+            entrada["versao_base"] = self.versao(aba_nome)
+            entrada["alteracoes"] = []
+    
+    def anexar(self, aba_nome, novas_linhas):
+        """Acrescenta ao cache as linhas gravadas, sem recarregar a aba"""
+        with self._lock:
+            entrada = self._entradas.get(aba_nome)
+            if entrada is None:
+                return
+            entrada["df"] = aplicar_esquema(aba_nome, concatenar([entrada["df"], novas_linhas]))
+            self._registrar_alteracao(aba_nome, entrada, "anexar", novas_linhas)
+    
+    def remover(self, aba_nome, linhas):
+        """Retira do cache as linhas excluídas (localizadas pelo ID_REGISTRO ou pela chave), sem recarregar a aba"""
+        with self._lock:
+            entrada = self._entradas.get(aba_nome)
+            if entrada is None:
+                return
+            # Cada linha excluída retira uma só linha do cache, como nos backends
+            por_id = parear_por_id(entrada["df"], linhas)
+            excluir = chaves_ocorrencia(aba_nome, entrada["df"], por_id).isin(chaves_ocorrencia(aba_nome, linhas, por_id)).to_numpy()
+            removidas = entrada["df"][excluir]
+            entrada["df"] = entrada["df"][~excluir].reset_index(drop=True)
+            self._registrar_alteracao(aba_nome, entrada, "remover", removidas)
+    
+    def mesclar(self, aba_nome, linhas):
+        """Troca no cache as linhas com a mesma chave e acrescenta as novas, sem recarregar a aba
+        
+        As linhas mudam no lugar, então os derivados da aba são reconstruídos.
+        """
+        with self._lock:
+            entrada = self._entradas.get(aba_nome)
+            if entrada is None:
+                return
+            entrada["df"] = mesclar_tabelas(aba_nome, entrada["df"], linhas)
+            self._versoes[aba_nome] = self.versao(aba_nome) + 1
+            entrada["versao_base"] = self.versao(aba_nome)
+            entrada["alteracoes"] = []
+    
+    def derivado(self, nome, abas, construir, estender=None):
+        """Objeto calculado a partir das abas (índices, junções, agregados)
+        
+        É construído uma vez por versão dos dados: enquanto nenhuma das abas
+        mudar, todas as sessões recebem o mesmo objeto (somente leitura).
+        Se a primeira aba só recebeu anexos/remoções desde a última construção
+        e as demais não mudaram, estender(anterior, alteracoes, *demais) é
+        tentado antes; alteracoes é uma lista de ("anexar" | "remover", linhas)
+        e, se estender devolver None, o objeto é reconstruído por inteiro.
+        """
+        with self._lock:
+            versoes = tuple(self.versao(aba_nome) for aba_nome in abas)
+            item = self._derivados.get(nome)
+            if item is not None and item["versoes"] == versoes:
+                contar("derivado_acerto")
+                return item["valor"]
+            dfs = [self._entradas[aba_nome]["df"] if aba_nome in self._entradas else pd.DataFrame() for aba_nome in abas]
+            principal = self._entradas.get(abas[0])
+            incremental = (
+                estender is not None
+                and item is not None
+                and principal is not None
+                and item["versoes"][1:] == versoes[1:]
+                and item["versoes"][0] >= principal["versao_base"]
+            )
+        
+        contar("derivado_falha")
+        valor = None
+        if incremental:
+            alteracoes = [(tipo, linhas) for versao, tipo, linhas in principal["alteracoes"] if versao > item["versoes"][0]]
+            with medir(f"derivado.{nome}.estender"):
+                valor = estender(item["valor"], alteracoes, *dfs[1:])
+        if valor is None:
+            with medir(f"derivado.{nome}.construir"):
+                valor = construir(*dfs)
+        with self._lock:
+            self._derivados[nome] = {"versoes": versoes, "valor": valor}
+        return valor
+    
+    def memoria(self):
+        """Linhas, colunas e memória ocupada (MB) de cada aba em cache"""
+        with self._lock:
+            entradas = {aba_nome: entrada["df"] for aba_nome, entrada in self._entradas.items()}
+        linhas = [
+            {
+                "aba": aba_nome,
+                "linhas": len(df),
+                "colunas": len(df.columns),
+                "categoricas": len(df.select_dtypes("category").columns),
+                "memoria_mb": df.memory_usage(deep=True).sum() / 2**20
+            }
+            for aba_nome, df in sorted(entradas.items())
+        ]
+        return pd.DataFrame(linhas, columns=["aba", "linhas", "colunas", "categoricas", "memoria_mb"])
+    
+    def invalidar(self, aba_nome):
+        """Descarta somente a aba informada"""
+        with self._lock:
+            self._entradas.pop(aba_nome, None)
+            self._versoes[aba_nome] = self.versao(aba_nome) + 1
+    
+    def invalidar_todas(self):
+        """Descarta todas as abas (atualização manual)"""
+        for aba_nome in list(self._entradas):
+            self.invalidar(aba_nome)
+
+@st.cache_resource(show_spinner=False)
+def obter_cache_abas(identificador):
+    """Cache de abas compartilhado por todas as sessões"""
+    return CacheAbas(CACHE_DURATION)
+
+# -------------------- ESQUEMA DAS ABAS --------------------
+FORMATO_DATA = '%d/%m/%Y'
+FORMATO_DATA_HORA = '%d/%m/%Y %H:%M:%S'
+
+# Tipo de cada coluna conhecida, por aba:
+#   "data" / "data_hora": datas em dd/mm/aaaa, com ou sem hh:mm:ss
+#   "numero": float; "categoria": pd.Categorical; "texto": mantido como está
+#   Colunas com poucos valores distintos e muito repetidos são "categoria":
+#   cada texto é guardado uma vez e as linhas só apontam para ele. A PLACA
+#   de veiculos e a OPERAÇÃO de operacoes são chaves únicas e ficam "texto".
+ESQUEMAS = {
+    "operacoes": {
+        "OPERAÇÃO": "texto", "OPERAÇÃO TITULAR": "categoria", "MARCA": "categoria", "MODELO": "categoria",
+        "TIPO": "categoria", "META": "numero", "DATA_CRIACAO": "data_hora", "CRIADO_POR": "texto"
+    },
+    "veiculos": {
+        "PLACA": "texto", "MARCA": "categoria", "MODELO": "categoria", "OPERAÇÃO": "texto",
+        "PROPRIETÁRIO": "texto", "TIPO": "categoria", "DATA_CADASTRO": "data"
+    },
+    "atendimentos": {
+        "MOTORISTA": "texto", "COLABORADOR": "categoria", "DATA_ABORDAGEM": "data", "DATA_LANCAMENTO": "data_hora",
+        "PLACA": "categoria", "MODELO": "categoria", "REVISAO": "categoria", "TACOGRAFO": "categoria",
+        "OPERACAO": "categoria", "DATA_INICIO": "data", "DATA_FIM": "data", "META": "numero",
+        "MEDIA_ATENDIMENTO": "numero", "OBSERVACAO": "texto", "DATA_MODIFICACAO": "data_hora",
+        "MODIFICADO_POR": "texto", "ID_REGISTRO": "texto"
+    }
+}
+
+# Valores aceitos nos campos de situação dos atendimentos
+OPCOES_REVISAO = ["REVISÃO EM DIA", "PENDENTE"]
+OPCOES_TACOGRAFO = ["TACÓGRAFO EM DIA", "PENDENTE"]
+
+def colunas_do_tipo(aba_nome, *tipos):
+    """Colunas do esquema da aba com algum dos tipos informados"""
+    return [col for col, tipo in ESQUEMAS.get(aba_nome, {}).items() if tipo in tipos]
+
+def converter_data(serie, formato):
+    """Converte texto em datetime com formato fixo (vetorizado, sem inferência)
+    
+    Valores que não casam com o formato principal são tentados no formato
+    alternativo, pois regravações antigas salvaram todas as datas com hora.
+    """
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+    texto = serie.astype("string").str.strip()
+    convertida = pd.to_datetime(texto, format=formato, errors='coerce')
+    
+    restantes = convertida.isna() & texto.fillna("").ne("")
+    if restantes.any():
+        alternativo = FORMATO_DATA_HORA if formato == FORMATO_DATA else FORMATO_DATA
+        convertida = convertida.fillna(pd.to_datetime(texto[restantes], format=alternativo, errors='coerce'))
+    return convertida
+
+def aplicar_esquema(aba_nome, df, categorias=True):
+    """Aplica o esquema da aba uma única vez, na carga ou ao receber linhas novas
+    
+    categorias=False mantém como texto as colunas "categoria" (cópias de uso
+    único, como chaves de busca e valores a gravar, em que a conversão não compensa).
+    """
+    if df.empty:
+        return df
+    
+    with medir("converter_tipos"):
+        for col, tipo in ESQUEMAS.get(aba_nome, {}).items():
+            if col not in df.columns:
+                continue
+            if tipo == "data":
+                df[col] = converter_data(df[col], FORMATO_DATA)
+            elif tipo == "data_hora":
+                df[col] = converter_data(df[col], FORMATO_DATA_HORA)
+            elif tipo == "numero":
+                df[col] = pd.to_numeric(df[col], errors='coerce')
+            elif tipo == "categoria" and categorias and not isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype("category")
+    return df
+
+def concatenar(dfs):
+    """pd.concat que mantém as colunas categóricas
+    
+    Categorias diferentes entre as partes fariam a coluna voltar a texto;
+    aqui elas são unidas (em ordem alfabética) antes de juntar as linhas.
+    """
+    dfs = list(dfs)
+    for col in dfs[0].select_dtypes("category").columns:
+        tipo = dfs[0][col].dtype
+        for df in dfs[1:]:
+            if col in df.columns:
+                serie = df[col]
+                novas = serie.cat.categories if isinstance(serie.dtype, pd.CategoricalDtype) else pd.Index(serie.dropna().unique())
+                # Caso comum (linhas novas só com valores já conhecidos): mantém o tipo
+                if (tipo.categories.get_indexer(novas) < 0).any():
+                    tipo = pd.CategoricalDtype(tipo.categories.union(novas))
+        # Partes que já têm exatamente essas categorias não são recodificadas
+        dfs = [df.astype({col: tipo}) if col in df.columns and df[col].dtype != tipo else df for df in dfs]
+    return pd.concat(dfs, ignore_index=True)
+
+# -------------------- SNAPSHOT LOCAL --------------------
+# Colunas usadas como marca d'água de alteração, em ordem de preferência
+COLUNAS_MARCA = ['DATA_MODIFICACAO', 'DATA_LANCAMENTO', 'DATA_CADASTRO', 'DATA_CRIACAO']
+COLUNA_MARCA_SNAPSHOT = "__marca__"
+COLUNA_HASH_SNAPSHOT = "__hash__"
+SEPARADOR_MARCA = "\x1f"
+LIMITE_FAIXAS_DELTA = 50  # Acima disso, relê a partir da primeira divergência
+LINHAS_VERIFICACAO_SINCRONIZACAO = 5000  # Linhas conferidas por sincronização (edições feitas à mão na planilha)
+
+class SnapshotLocal:
+    """Snapshot em disco (Parquet) dos DataFrames tipados de cada aba
+    
+    Junto com cada aba são guardados o cabeçalho, a marca de cada linha
+    (marca d'água + identidade), usada para descobrir quais linhas mudaram na
+    planilha, e o hash do conteúdo bruto de cada linha, usado para conferi-las.
+    """
+    
+    def __init__(self, diretorio):
+        self.diretorio = diretorio
+    
+    def _caminhos(self, aba_nome):
+        base = os.path.join(self.diretorio, aba_nome)
+        return base + ".parquet", base + ".json"
+    
+    def carregar(self, aba_nome):
+        """Retorna (df, marcas, hashes, meta) do snapshot ou (None, None, None, None)"""
+        caminho_dados, caminho_meta = self._caminhos(aba_nome)
+        try:
+            with open(caminho_meta, encoding="utf-8") as f:
+                meta = json.load(f)
+            df = pd.read_parquet(caminho_dados)
+            marcas = df.pop(COLUNA_MARCA_SNAPSHOT).tolist()
+            hashes = df.pop(COLUNA_HASH_SNAPSHOT).to_numpy(dtype=np.uint64)
+        except Exception:
+            return None, None, None, None
+        return df, marcas, hashes, meta
+    
+    def salvar(self, aba_nome, df, marcas, hashes, meta):
+        """Grava o snapshot de forma atômica (arquivo temporário + rename)"""
+        caminho_dados, caminho_meta = self._caminhos(aba_nome)
+        try:
+            os.makedirs(self.diretorio, exist_ok=True)
+            tabela = df.copy()
+            tabela[COLUNA_MARCA_SNAPSHOT] = marcas
+            tabela[COLUNA_HASH_SNAPSHOT] = hashes
+            tabela.to_parquet(caminho_dados + ".tmp", index=False)
+            with open(caminho_meta + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False)
+            os.replace(caminho_dados + ".tmp", caminho_dados)
+            os.replace(caminho_meta + ".tmp", caminho_meta)
+        except Exception:
+            # Sem snapshot o sistema continua funcionando com a carga completa
+            pass
+    
+    def salvar_meta(self, aba_nome, meta):
+        """Regrava só os metadados (sincronização sem linhas alteradas)"""
+        _, caminho_meta = self._caminhos(aba_nome)
+        try:
+            with open(caminho_meta + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False)
+            os.replace(caminho_meta + ".tmp", caminho_meta)
+        except Exception:
+            pass
+    
+    def descartar(self, aba_nome):
+        """Força a próxima leitura completa da aba"""
+        for caminho in self._caminhos(aba_nome):
+            try:
+                os.remove(caminho)
+            except OSError:
+                pass
+
+@st.cache_resource(show_spinner=False)
+def obter_snapshot(sheet_id):
+    """Snapshot local da planilha, compartilhado por todas as sessões"""
+    return SnapshotLocal(os.path.join(DIRETORIO_SNAPSHOT, sheet_id))
+
+def quadro_bruto(cabecalho, linhas):
+    """Linhas brutas da planilha (texto), completadas até a largura do cabeçalho"""
+    largura = len(cabecalho)
+    linhas = [(linha + [""] * (largura - len(linha)))[:largura] for linha in linhas]
+    return pd.DataFrame(linhas, columns=cabecalho)
+
+def hashes_linhas(bruto):
+    """Hash (uint64) do conteúdo bruto de cada linha"""
+    return pd.util.hash_pandas_object(bruto, index=False).to_numpy(dtype=np.uint64)
+
+def montar_dataframe(aba_nome, cabecalho, linhas):
+    """Monta o DataFrame tipado a partir das linhas brutas da planilha"""
+    return aplicar_esquema(aba_nome, quadro_bruto(cabecalho, linhas))
+
+def montar_com_hashes(aba_nome, cabecalho, linhas):
+    """DataFrame tipado e hash do conteúdo bruto de cada linha"""
+    bruto = quadro_bruto(cabecalho, linhas)
+    hashes = hashes_linhas(bruto)
+    return aplicar_esquema(aba_nome, bruto), hashes
+
+def colunas_marca(aba_nome, cabecalho):
+    """Colunas lidas a cada sincronização para localizar linhas novas, alteradas e removidas
+    
+    A marca d'água muda quando o sistema edita a linha; a identidade
+    (ID_REGISTRO ou, na falta dele, a chave da aba) denuncia linhas removidas
+    ou inseridas no meio da aba, mesmo entre vizinhas com a mesma marca d'água.
+    """
+    marca = [col for col in COLUNAS_MARCA if col in cabecalho][:1]
+    if COLUNA_ID_REGISTRO in cabecalho:
+        identidade = [COLUNA_ID_REGISTRO]
+    else:
+        identidade = [col for col in CHAVES_ABAS.get(aba_nome, []) if col in cabecalho]
+    return list(dict.fromkeys(marca + identidade))
+
+def marcas_linhas(cabecalho, colunas, linhas):
+    """Marca de cada linha bruta: valores das colunas de marca unidos"""
+    indices = [cabecalho.index(col) for col in colunas]
+    return [SEPARADOR_MARCA.join(linha[i] if len(linha) > i else "" for i in indices) for linha in linhas]
+
+def marcas_colunas(blocos):
+    """Marca de cada linha a partir das colunas de marca lidas em intervalos separados"""
+    n_linhas = max((len(bloco) for bloco in blocos), default=0)
+    colunas = [[linha[0] if linha else "" for linha in bloco] + [""] * (n_linhas - len(bloco)) for bloco in blocos]
+    return [SEPARADOR_MARCA.join(valores) for valores in zip(*colunas)]
+
+def agrupar_faixas(posicoes):
+    """Agrupa posições ordenadas em faixas contíguas [inicio, fim)"""
+    faixas = []
+    for pos in posicoes:
+        if faixas and faixas[-1][1] == pos:
+            faixas[-1][1] = pos + 1
+        else:
+            faixas.append([pos, pos + 1])
+    return faixas
+
+def intervalo_aba(aba_nome, a1=None):
+    """Intervalo em notação A1 qualificado pelo nome da aba"""
+    nome = "'" + aba_nome.replace("'", "''") + "'"
+    return f"{nome}!{a1}" if a1 else nome
+
+def letra_coluna(indice):
+    """Letra da coluna a partir do índice (base 1)"""
+    from gspread.utils import rowcol_to_a1
+    return rowcol_to_a1(1, indice)[:-1]
+
+def buscar_intervalos(spreadsheet, intervalos):
+    """Busca vários intervalos em uma única chamada values.batchGet"""
+    with medir("sheets.leitura"):
+        resposta = spreadsheet.values_batch_get(intervalos)
+    return [faixa.get("values", []) for faixa in resposta.get("valueRanges", [])]
+
+def carga_completa(aba_nome, valores, snapshot, agora):
+    """Monta a aba a partir de todos os seus valores e regrava o snapshot"""
+    cabecalho = valores[0] if valores else []
+    if not cabecalho:
+        return pd.DataFrame()
+    
+    linhas = valores[1:]
+    df, hashes = montar_com_hashes(aba_nome, cabecalho, linhas)
+    colunas = colunas_marca(aba_nome, cabecalho)
+    snapshot.salvar(aba_nome, df, marcas_linhas(cabecalho, colunas, linhas), hashes, {
+        "cabecalho": cabecalho,
+        "colunas_marca": colunas,
+        "completo_em": agora,
+        "sincronizado_em": agora,
+        "cursor_verificacao": 0
+    })
+    return df
+
+def aplicar_delta(aba_nome, estado, blocos_faixas, cauda, snapshot, agora):
+    """Remonta a aba trocando apenas os trechos alterados e anexando a cauda nova"""
+    df_snapshot, hashes_snapshot, cabecalho = estado["df"], estado["hashes"], estado["meta"]["cabecalho"]
+    estado["meta"]["sincronizado_em"] = agora
+    if not estado["faixas"] and not cauda and estado["inicio_cauda"] == len(df_snapshot):
+        snapshot.salvar_meta(aba_nome, estado["meta"])
+        return df_snapshot
+    
+    partes, hashes = [], []
+    anterior = 0
+    for (inicio, fim), bloco in zip(estado["faixas"], blocos_faixas):
+        novas, novos_hashes = montar_com_hashes(aba_nome, cabecalho, bloco)
+        partes += [df_snapshot.iloc[anterior:inicio], novas]
+        hashes += [hashes_snapshot[anterior:inicio], novos_hashes]
+        anterior = fim
+    novas, novos_hashes = montar_com_hashes(aba_nome, cabecalho, cauda)
+    partes += [df_snapshot.iloc[anterior:estado["inicio_cauda"]], novas]
+    hashes += [hashes_snapshot[anterior:estado["inicio_cauda"]], novos_hashes]
+    
+    partes = [parte for parte in partes if len(parte)] or [df_snapshot.iloc[:0]]
+    df = aplicar_esquema(aba_nome, pd.concat(partes, ignore_index=True))
+    
+    marcas = (estado["marcas_atuais"] + [""] * len(df))[:len(df)]
+    snapshot.salvar(aba_nome, df, marcas, np.concatenate(hashes).astype(np.uint64), estado["meta"])
+    return df
+
+def remendar_snapshot(snapshot, aba_nome, cabecalho, atualizar=(), excluir=()):
+    """Aplica ao snapshot as edições e exclusões que acabaram de ser enviadas à planilha
+    
+    Assim a próxima sincronização continua sendo por delta. Posições além do
+    snapshot ficam para a cauda da próxima sincronização; o texto que a
+    planilha exibir diferente do enviado (números formatados, por exemplo) é
+    corrigido depois pela conferência por hash.
+    """
+    df, marcas, hashes, meta = snapshot.carregar(aba_nome)
+    if df is None:
+        return
+    if meta["cabecalho"] != cabecalho:
+        snapshot.descartar(aba_nome)
+        return
+    
+    # Edições nas posições originais (a última de cada posição vale), depois as exclusões
+    editadas = {pos: linha for pos, linha in atualizar if pos < len(df)}
+    if editadas:
+        posicoes = np.fromiter(editadas, dtype=np.int64)
+        linhas = preparar_valores_para_planilha(pd.concat(list(editadas.values())).reindex(columns=cabecalho, fill_value=""), aba_nome)
+        novas, novos_hashes = montar_com_hashes(aba_nome, cabecalho, linhas)
+        mantidas = ~np.isin(np.arange(len(df)), posicoes)
+        ordem = np.argsort(np.concatenate([np.flatnonzero(mantidas), posicoes]), kind="stable")
+        df = aplicar_esquema(aba_nome, concatenar([df[mantidas], novas]).iloc[ordem].reset_index(drop=True))
+        hashes = np.concatenate([hashes[mantidas], novos_hashes])[ordem]
+        novas_marcas = dict(zip(posicoes.tolist(), marcas_linhas(cabecalho, meta["colunas_marca"], linhas)))
+        marcas = [novas_marcas.get(pos, marca) for pos, marca in enumerate(marcas)]
+    
+    mantidas = ~np.isin(np.arange(len(df)), list(excluir))
+    if not mantidas.all():
+        df = df[mantidas].reset_index(drop=True)
+        hashes = hashes[mantidas]
+        marcas = np.array(marcas, dtype=object)[mantidas].tolist()
+    snapshot.salvar(aba_nome, df, marcas, hashes, meta)
+
+def sincronizar_abas(spreadsheet, abas, snapshot):
+    """Sincroniza as abas com o snapshot local em no máximo duas chamadas batchGet
+    
+    A primeira chamada traz, para cada aba com snapshot válido, o cabeçalho,
+    as colunas de marca, as linhas novas e uma janela de linhas para
+    conferência; abas sem snapshot vêm inteiras. A janela avança a cada
+    sincronização e, pelo hash do conteúdo, acha as edições feitas direto na
+    planilha, que não mudam a marca d'água. A segunda chamada só acontece
+    quando há linhas alteradas ou removidas fora da janela.
+    """
+    agora = time.time()
+    estados = {}
+    intervalos = []
+    
+    for aba_nome in abas:
+        df_snapshot, marcas, hashes, meta = snapshot.carregar(aba_nome)
+        estado = {"df": df_snapshot, "marcas": marcas, "hashes": hashes, "meta": meta, "inicio": len(intervalos)}
+        
+        valido = (
+            df_snapshot is not None
+            and meta.get("colunas_marca")
+            and agora - meta.get("completo_em", 0) <= INTERVALO_SINCRONIZACAO_COMPLETA
+        )
+        if valido:
+            cabecalho = meta["cabecalho"]
+            estado["ultima_coluna"] = letra_coluna(len(cabecalho))
+            letras = [letra_coluna(cabecalho.index(col) + 1) for col in meta["colunas_marca"]]
+            # A janela de conferência continua de onde a anterior parou
+            cursor = meta.get("cursor_verificacao", 0)
+            estado["inicio_janela"] = cursor if cursor < len(marcas) else 0
+            fim_janela = estado["inicio_janela"] + LINHAS_VERIFICACAO_SINCRONIZACAO
+            intervalos += (
+                [intervalo_aba(aba_nome, "1:1")]
+                + [intervalo_aba(aba_nome, f"{letra}2:{letra}") for letra in letras]
+                + [
+                    intervalo_aba(aba_nome, f"A{len(marcas) + 2}:{estado['ultima_coluna']}"),
+                    intervalo_aba(aba_nome, f"A{estado['inicio_janela'] + 2}:{estado['ultima_coluna']}{fim_janela + 1}")
+                ]
+            )
+        else:
+            intervalos.append(intervalo_aba(aba_nome))
+        estado["fim"] = len(intervalos)
+        estados[aba_nome] = estado
+    
+    respostas = buscar_intervalos(spreadsheet, intervalos)
+    dados = {}
+    segunda_fase = []
+    
+    for aba_nome, estado in estados.items():
+        blocos = respostas[estado["inicio"]:estado["fim"]]
+        
+        if len(blocos) == 1:
+            dados[aba_nome] = carga_completa(aba_nome, blocos[0], snapshot, agora)
+            continue
+        
+        meta = estado["meta"]
+        cabecalho = blocos[0][0] if blocos[0] else []
+        if cabecalho != meta["cabecalho"]:
+            estado["pedidos"] = [intervalo_aba(aba_nome)]
+            segunda_fase.append(aba_nome)
+            continue
+        
+        # Compara as marcas atuais (marca d'água + identidade) com as do snapshot
+        n_colunas = len(meta["colunas_marca"])
+        marcas_atuais = marcas_colunas(blocos[1:1 + n_colunas])
+        cauda, janela = blocos[1 + n_colunas], blocos[2 + n_colunas]
+        marcas_snapshot = estado["marcas"]
+        n_comum = min(len(marcas_atuais), len(marcas_snapshot))
+        divergentes = np.flatnonzero(
+            np.array(marcas_atuais[:n_comum], dtype=object) != np.array(marcas_snapshot[:n_comum], dtype=object)
+        ).tolist()
+        estado["marcas_atuais"] = marcas_atuais
+        
+        # Conferência: linhas da janela com a mesma marca, mas com outro conteúdo
+        inicio_janela = estado["inicio_janela"]
+        conferidas = max(min(inicio_janela + len(janela), n_comum) - inicio_janela, 0)
+        hashes_janela = hashes_linhas(quadro_bruto(cabecalho, janela[:conferidas]))
+        editadas = (inicio_janela + np.flatnonzero(hashes_janela != estado["hashes"][inicio_janela:inicio_janela + conferidas])).tolist()
+        proxima = inicio_janela + LINHAS_VERIFICACAO_SINCRONIZACAO
+        meta["cursor_verificacao"] = proxima if proxima < len(marcas_atuais) else 0
+        
+        def da_janela(inicio, fim):
+            return janela[inicio - inicio_janela:fim - inicio_janela] if inicio >= inicio_janela and fim <= inicio_janela + len(janela) else None
+        
+        if len(marcas_atuais) < len(marcas_snapshot) or len(agrupar_faixas(divergentes)) > LIMITE_FAIXAS_DELTA:
+            # Linhas removidas deslocam as posições: relê a partir da primeira divergência
+            estado["inicio_cauda"] = divergentes[0] if divergentes else n_comum
+            estado["faixas"] = agrupar_faixas([pos for pos in editadas if pos < estado["inicio_cauda"]])
+            estado["blocos"] = [da_janela(inicio, fim) for inicio, fim in estado["faixas"]]
+            estado["pedidos"] = [intervalo_aba(aba_nome, f"A{estado['inicio_cauda'] + 2}:{estado['ultima_coluna']}")]
+        else:
+            estado["faixas"] = agrupar_faixas(sorted(set(divergentes) | set(editadas)))
+            estado["inicio_cauda"] = len(marcas_snapshot)
+            estado["cauda"] = cauda
+            estado["blocos"] = [da_janela(inicio, fim) for inicio, fim in estado["faixas"]]
+            estado["pedidos"] = [
+                intervalo_aba(aba_nome, f"A{inicio + 2}:{estado['ultima_coluna']}{fim + 1}")
+                for (inicio, fim), bloco in zip(estado["faixas"], estado["blocos"]) if bloco is None
+            ]
+        
+        if estado["pedidos"]:
+            segunda_fase.append(aba_nome)
+        else:
+            dados[aba_nome] = aplicar_delta(aba_nome, estado, estado["blocos"], estado["cauda"], snapshot, agora)
+    
+    if segunda_fase:
+        respostas = buscar_intervalos(spreadsheet, [pedido for aba_nome in segunda_fase for pedido in estados[aba_nome]["pedidos"]])
+        for aba_nome in segunda_fase:
+            estado = estados[aba_nome]
+            blocos, respostas = respostas[:len(estado["pedidos"])], respostas[len(estado["pedidos"]):]
+            
+            if "marcas_atuais" not in estado:
+                dados[aba_nome] = carga_completa(aba_nome, blocos[0], snapshot, agora)
+            elif "cauda" in estado:
+                # Trechos fora da janela chegam na ordem das faixas
+                buscados = iter(blocos)
+                blocos_faixas = [bloco if bloco is not None else next(buscados) for bloco in estado["blocos"]]
+                dados[aba_nome] = aplicar_delta(aba_nome, estado, blocos_faixas, estado["cauda"], snapshot, agora)
+            else:
+                dados[aba_nome] = aplicar_delta(aba_nome, estado, estado["blocos"], blocos[0], snapshot, agora)
+    
+    return dados
+
+def converter_datetime_para_string(obj):
+    """Função auxiliar para converter datetime para string durante a serialização"""
+    if isinstance(obj, (datetime, pd.Timestamp)):
+        return obj.strftime('%d/%m/%Y %H:%M:%S')
+    raise TypeError(f"Object of type {type(obj)} is not JSON serializable")
+
+def preparar_valores_para_planilha(df, aba_nome=None):
+    """Converte o DataFrame em linhas de valores aceitas pelo Google Sheets"""
+    df = df.copy()
+    colunas_data = colunas_do_tipo(aba_nome, "data")
+    for col in df.columns:
+        # Converte colunas de datetime para string no formato do esquema
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            formato = FORMATO_DATA if col in colunas_data else FORMATO_DATA_HORA
+            df[col] = df[col].dt.strftime(formato).fillna("")
+        # Converte outros tipos de dados problemáticos
+        elif pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = df[col].fillna(0)
+        else:
+            # Texto ausente vira célula vazia (e não "nan")
+            df[col] = df[col].astype(object).where(df[col].notna(), "")
+    
+    # Garante que todos os valores sejam strings ou números
+    return df.astype(str).values.tolist()
+
+def anexar_linhas_planilha(worksheet, df, aba_nome=None):
+    """Anexa apenas as novas linhas ao final da aba, alinhadas ao cabeçalho existente"""
+    cabecalho = worksheet.row_values(1)
+    
+    if not cabecalho:
+        # Aba vazia: grava cabeçalho e linhas em uma única chamada
+        values = [df.columns.tolist()] + preparar_valores_para_planilha(df, aba_nome)
+        worksheet.update(values, value_input_option='USER_ENTERED')
+        return
+    
+    # Colunas novas são acrescentadas ao final do cabeçalho
+    novas_colunas = [col for col in df.columns if col not in cabecalho]
+    if novas_colunas:
+        cabecalho = cabecalho + novas_colunas
+        if len(cabecalho) > worksheet.col_count:
+            worksheet.add_cols(len(cabecalho) - worksheet.col_count)
+        worksheet.update([cabecalho], 'A1', value_input_option='USER_ENTERED')
+    
+    df = df.reindex(columns=cabecalho, fill_value="")
+    worksheet.append_rows(
+        preparar_valores_para_planilha(df, aba_nome),
+        value_input_option='USER_ENTERED',
+        insert_data_option='INSERT_ROWS',
+        table_range='A1'
+    )
+
+# -------------------- ARMAZENAMENTO --------------------
+# Colunas que identificam uma linha em cada aba (as linhas com ID_REGISTRO são identificadas por ele)
+CHAVES_ABAS = {
+    "operacoes": ["OPERAÇÃO"],
+    "veiculos": ["PLACA"],
+    "atendimentos": ["PLACA", "DATA_LANCAMENTO", "COLABORADOR"]
+}
+# Colunas indexadas no backend SQLite
+INDICES_SQLITE = {
+    "operacoes": ["OPERAÇÃO"],
+    "veiculos": ["PLACA"],
+    "atendimentos": ["PLACA", "OPERACAO", "DATA_ABORDAGEM", "ID_REGISTRO"]
+}
+# Coluna com o identificador único gerado no envio (idempotência da fila de gravação)
+COLUNA_ID_REGISTRO = "ID_REGISTRO"
+FORMATO_DATA_SQLITE = '%Y-%m-%d %H:%M:%S'
+
+def chave_linhas(aba_nome, df, colunas=None, por_id=False):
+    """Chave textual de cada linha, usada para localizar linhas a atualizar ou excluir
+    
+    Com por_id, as linhas que têm ID_REGISTRO são identificadas por ele; a
+    chave composta da aba só vale para as gravadas antes de o ID existir.
+    """
+    partes = []
+    for col in colunas or CHAVES_ABAS[aba_nome]:
+        if col not in df.columns:
+            serie = pd.Series("", index=df.index)
+        elif pd.api.types.is_datetime64_any_dtype(df[col]):
+            serie = df[col].dt.strftime('%d/%m/%Y %H:%M:%S').fillna("")
+        else:
+            serie = df[col].astype(str).str.strip()
+        partes.append(serie)
+    chaves = partes[0].str.cat(partes[1:], sep="|") if len(partes) > 1 else partes[0]
+    if por_id and COLUNA_ID_REGISTRO in df.columns:
+        ids = df[COLUNA_ID_REGISTRO].astype("string").str.strip().fillna("")
+        chaves = chaves.where(ids.eq(""), "#" + ids)
+    return chaves
+
+def parear_por_id(*dfs):
+    """Se as linhas destas tabelas podem ser pareadas pelo ID_REGISTRO (todas têm a coluna)"""
+    return all(COLUNA_ID_REGISTRO in df.columns for df in dfs)
+
+def colunas_idempotencia(aba_nome, df):
+    """Colunas que dizem se uma linha enviada já está gravada: o ID do registro, se houver, ou a chave"""
+    return [COLUNA_ID_REGISTRO] if COLUNA_ID_REGISTRO in df.columns else CHAVES_ABAS[aba_nome]
+
+def numerar_ocorrencias(chaves):
+    """Acrescenta à chave o nº da ocorrência (a 1ª linha repetida casa com a 1ª, a 2ª com a 2ª...)"""
+    chaves = chaves.reset_index(drop=True)
+    return chaves + "#" + chaves.groupby(chaves).cumcount().astype(str)
+
+def chaves_ocorrencia(aba_nome, df, por_id=False):
+    """Chave da linha + nº da ocorrência, para parear linhas com chave repetida"""
+    return numerar_ocorrencias(chave_linhas(aba_nome, df, por_id=por_id))
+
+def valores_comparaveis(aba_nome, df, colunas):
+    """Linhas de df como tuplas de texto, na forma em que seriam gravadas (para comparar versões)"""
+    df = df.reindex(columns=colunas)
+    for col in df.columns:
+        if pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = df[col].astype(float)
+    return [tuple(linha) for linha in preparar_valores_para_planilha(df, aba_nome)]
+
+def diferencas_tabelas(aba_nome, antigo, novo):
+    """Diferença entre duas versões de uma aba, pareando as linhas pelo ID_REGISTRO ou pela chave
+    
+    Devolve (excluir, atualizar, anexar): posições de antigo que saíram,
+    pares (posição em antigo, posição em novo) com conteúdo alterado e
+    posições de novo que não existiam.
+    """
+    colunas = list(dict.fromkeys(list(antigo.columns) + list(novo.columns)))
+    por_id = parear_por_id(antigo, novo)
+    posicao_antiga = {chave: pos for pos, chave in enumerate(chaves_ocorrencia(aba_nome, antigo, por_id))}
+    valores_antigos = valores_comparaveis(aba_nome, antigo, colunas)
+    valores_novos = valores_comparaveis(aba_nome, novo, colunas)
+    
+    atualizar, anexar, mantidas = [], [], set()
+    for pos_nova, chave in enumerate(chaves_ocorrencia(aba_nome, novo, por_id)):
+        pos_antiga = posicao_antiga.get(chave)
+        if pos_antiga is None:
+            anexar.append(pos_nova)
+            continue
+        mantidas.add(pos_antiga)
+        if valores_antigos[pos_antiga] != valores_novos[pos_nova]:
+            atualizar.append((pos_antiga, pos_nova))
+    excluir = [pos for pos in range(len(antigo)) if pos not in mantidas]
+    return excluir, atualizar, anexar
+
+def mesclar_tabelas(aba_nome, df, linhas):
+    """df com as linhas de mesma chave trocadas pelas de linhas (na mesma posição) e as demais no final"""
+    linhas = aplicar_esquema(aba_nome, linhas.copy())
+    linhas = linhas[~chave_linhas(aba_nome, linhas, por_id=True).duplicated(keep="last")].reset_index(drop=True)
+    if df.empty:
+        return linhas
+    por_id = parear_por_id(df, linhas)
+    chaves = chave_linhas(aba_nome, df, por_id=por_id).reset_index(drop=True).drop_duplicates()
+    posicoes = pd.Index(chaves).get_indexer(chave_linhas(aba_nome, linhas, por_id=por_id))
+    existentes = posicoes >= 0
+    ordem = np.arange(len(df))
+    ordem[chaves.index.to_numpy()[posicoes[existentes]]] = len(df) + np.flatnonzero(existentes)
+    ordem = np.concatenate([ordem, len(df) + np.flatnonzero(~existentes)])
+    juntas = concatenar([df.reset_index(drop=True), linhas])
+    return aplicar_esquema(aba_nome, juntas.iloc[ordem].reset_index(drop=True))
+
+class Armazenamento:
+    """Interface comum dos backends de persistência
+    
+    Todos os métodos de leitura devolvem DataFrames já tipados; os de escrita
+    aceitam DataFrames tipados ou com datas em texto (dd/mm/aaaa).
+    """
+    
+    identificador = ""
+    
+    def conectar(self):
+        """Abre a conexão com o backend (erros aqui indicam falha geral)"""
+    
+    def carregar_tabela(self, aba_nome):
+        """Carrega a tabela inteira"""
+        raise NotImplementedError
+    
+    def carregar_tabelas(self, abas):
+        """Carrega várias tabelas de uma vez ({aba: DataFrame})"""
+        return {aba_nome: self.carregar_tabela(aba_nome) for aba_nome in abas}
+    
+    def anexar_linhas(self, aba_nome, df):
+        """Acrescenta as linhas de df ao final da tabela"""
+        raise NotImplementedError
+    
+    def atualizar_linhas(self, aba_nome, df):
+        """Regrava as linhas de df, localizadas pela chave da aba"""
+        raise NotImplementedError
+    
+    def excluir_linhas(self, aba_nome, df):
+        """Remove, para cada linha de df, a primeira linha da tabela com a mesma chave
+        
+        Linhas antigas (sem ID_REGISTRO) repetidas saem uma por linha de df.
+        """
+        raise NotImplementedError
+    
+    def mesclar_linhas(self, aba_nome, df):
+        """Regrava as linhas de df que já existem (pela chave) e anexa as demais"""
+        existe = np.asarray(self.existentes(aba_nome, df, CHAVES_ABAS[aba_nome]), dtype=bool)
+        if existe.any():
+            self.atualizar_linhas(aba_nome, df[existe])
+        if not existe.all():
+            self.anexar_linhas(aba_nome, df[~existe])
+    
+    def substituir_tabela(self, aba_nome, df):
+        """Regrava a tabela inteira com o conteúdo de df"""
+        raise NotImplementedError
+    
+    def existentes(self, aba_nome, df, colunas):
+        """Para cada linha de df, se já há na tabela uma linha com os mesmos valores em colunas"""
+        tabela = self.carregar_tabela(aba_nome)
+        if tabela.empty:
+            return [False] * len(df)
+        return chave_linhas(aba_nome, df, colunas).isin(chave_linhas(aba_nome, tabela, colunas)).tolist()
+    
+    def consultar_intervalo(self, aba_nome, coluna, inicio, fim):
+        """Linhas com coluna entre inicio e fim (inclusive)"""
+        df = self.carregar_tabela(aba_nome)
+        return df[(df[coluna] >= inicio) & (df[coluna] <= fim)].reset_index(drop=True)
+    
+    def descartar_copia_local(self):
+        """Descarta cópias locais da tabela, forçando a próxima leitura completa"""
+
+class ArmazenamentoGoogleSheets(Armazenamento):
+    """Backend Google Sheets, com leitura via snapshot local + delta"""
+    
+    def __init__(self, client, sheet_id):
+        self.client = client
+        self.sheet_id = sheet_id
+        self.identificador = f"sheets:{sheet_id}"
+        self._spreadsheet = None
+    
+    def conectar(self):
+        if self._spreadsheet is None:
+            self._spreadsheet = self.client.open_by_key(self.sheet_id)
+        return self._spreadsheet
+    
+    def _worksheet(self, aba_nome, criar=False):
+        spreadsheet = self.conectar()
+        try:
+            return spreadsheet.worksheet(aba_nome)
+        except Exception:
+            if not criar:
+                raise
+            return spreadsheet.add_worksheet(title=aba_nome, rows=1000, cols=20)
+    
+    def _linhas_celulas(self, df, aba_nome):
+        """Linhas no formato CellData da API (números como número, vazio como célula limpa)
+        
+        Datas vão como formulaValue, interpretadas como se digitadas (igual ao
+        USER_ENTERED dos anexos): a coluna fica só com datas, sem texto misturado.
+        """
+        numericas = {i for i, col in enumerate(df.columns) if pd.api.types.is_numeric_dtype(df[col])}
+        datas = {i for i, col in enumerate(df.columns) if col in colunas_do_tipo(aba_nome, "data", "data_hora")}
+        
+        def celula(i, valor):
+            if i in numericas:
+                return {"numberValue": float(valor)}
+            return {"formulaValue": valor} if i in datas else {"stringValue": valor}
+        
+        return [
+            {"values": [{"userEnteredValue": celula(i, valor)} if valor != "" else {} for i, valor in enumerate(linha)]}
+            for linha in preparar_valores_para_planilha(df, aba_nome)
+        ]
+    
+    def _enviar_alteracoes(self, worksheet, aba_nome, cabecalho, atualizar=(), excluir=(), anexar=None, novo_cabecalho=None):
+        """Aplica cabeçalho, edições, exclusões e anexos em um único spreadsheets.batchUpdate
+        
+        atualizar: pares (posição base 0 sem cabeçalho, DataFrame de uma linha)
+        já alinhados ao cabeçalho final. As requisições são aplicadas em ordem:
+        edições nas posições originais, depois exclusões de baixo para cima,
+        por fim os anexos; a aba nunca fica vazia no meio do caminho.
+        """
+        requisicoes = []
+        if novo_cabecalho and novo_cabecalho != cabecalho:
+            if len(novo_cabecalho) > worksheet.col_count:
+                requisicoes.append({"appendDimension": {
+                    "sheetId": worksheet.id, "dimension": "COLUMNS", "length": len(novo_cabecalho) - worksheet.col_count
+                }})
+            requisicoes.append({"updateCells": {
+                "start": {"sheetId": worksheet.id, "rowIndex": 0, "columnIndex": 0},
+                "rows": [{"values": [{"userEnteredValue": {"stringValue": str(col)}} for col in novo_cabecalho]}],
+                "fields": "userEnteredValue"
+            }})
+        # Células de todas as edições convertidas de uma vez
+        editadas = self._linhas_celulas(pd.concat([linha for _, linha in atualizar]), aba_nome) if atualizar else []
+        for (pos, _), celulas in zip(atualizar, editadas):
+            requisicoes.append({"updateCells": {
+                "start": {"sheetId": worksheet.id, "rowIndex": pos + 1, "columnIndex": 0},
+                "rows": [celulas],
+                "fields": "userEnteredValue"
+            }})
+        for inicio, fim in reversed(agrupar_faixas(sorted(set(excluir)))):
+            requisicoes.append({"deleteDimension": {"range": {
+                "sheetId": worksheet.id, "dimension": "ROWS", "startIndex": inicio + 1, "endIndex": fim + 1
+            }}})
+        if anexar is not None and not anexar.empty:
+            requisicoes.append({"appendCells": {
+                "sheetId": worksheet.id, "rows": self._linhas_celulas(anexar, aba_nome), "fields": "userEnteredValue"
+            }})
+        if requisicoes:
+            self.conectar().batch_update({"requests": requisicoes})
+        if atualizar or excluir:
+            remendar_snapshot(obter_snapshot(self.sheet_id), aba_nome, novo_cabecalho or cabecalho, atualizar, excluir)
+    
+    def _posicoes(self, worksheet, aba_nome, df, colunas=None, ocorrencias=False):
+        """Posições (base 0, sem cabeçalho) das linhas da aba com as chaves de df
+        
+        Sem colunas explícitas, as linhas com ID_REGISTRO são localizadas por ele.
+        Com ocorrencias, linhas de df com a mesma chave vão para posições
+        diferentes (a 1ª para a 1ª linha da aba com a chave, a 2ª para a 2ª...).
+        """
+        cabecalho = worksheet.row_values(1)
+        por_id = colunas is None and COLUNA_ID_REGISTRO in cabecalho and parear_por_id(df)
+        colunas = [col for col in colunas or CHAVES_ABAS[aba_nome] if col in cabecalho]
+        if not colunas:
+            return cabecalho, [None] * len(df)
+        lidas = colunas + ([COLUNA_ID_REGISTRO] if por_id else [])
+        letras = [letra_coluna(cabecalho.index(col) + 1) for col in lidas]
+        blocos = worksheet.batch_get([f"{letra}2:{letra}" for letra in letras])
+        
+        n_linhas = max((len(bloco) for bloco in blocos), default=0)
+        atuais = pd.DataFrame({
+            col: [linha[0] if linha else "" for linha in bloco] + [""] * (n_linhas - len(bloco))
+            for col, bloco in zip(lidas, blocos)
+        })
+        chaves_atuais = chave_linhas(aba_nome, aplicar_esquema(aba_nome, atuais, categorias=False), colunas, por_id)
+        chaves = chave_linhas(aba_nome, aplicar_esquema(aba_nome, df.copy(), categorias=False), colunas, por_id)
+        if ocorrencias:
+            chaves_atuais, chaves = numerar_ocorrencias(chaves_atuais), numerar_ocorrencias(chaves)
+        posicao_por_chave = dict(zip(chaves_atuais.tolist()[::-1], range(n_linhas - 1, -1, -1)))
+        
+        return cabecalho, [posicao_por_chave.get(chave) for chave in chaves]
+    
+    def carregar_tabela(self, aba_nome):
+        return self.carregar_tabelas([aba_nome])[aba_nome]
+    
+    def carregar_tabelas(self, abas):
+        return sincronizar_abas(self.conectar(), abas, obter_snapshot(self.sheet_id))
+    
+    def descartar_copia_local(self):
+        snapshot = obter_snapshot(self.sheet_id)
+        for aba_nome in ABAS_SISTEMA:
+            snapshot.descartar(aba_nome)
+    
+    def anexar_linhas(self, aba_nome, df):
+        anexar_linhas_planilha(self._worksheet(aba_nome, criar=True), df, aba_nome)
+    
+    def atualizar_linhas(self, aba_nome, df):
+        worksheet = self._worksheet(aba_nome)
+        cabecalho, posicoes = self._posicoes(worksheet, aba_nome, df)
+        alinhado = df.reindex(columns=cabecalho, fill_value="")
+        atualizar = [(pos, alinhado.iloc[[i]]) for i, pos in enumerate(posicoes) if pos is not None]
+        self._enviar_alteracoes(worksheet, aba_nome, cabecalho, atualizar=atualizar)
+    
+    def excluir_linhas(self, aba_nome, df):
+        worksheet = self._worksheet(aba_nome)
+        cabecalho, posicoes = self._posicoes(worksheet, aba_nome, df, ocorrencias=True)
+        self._enviar_alteracoes(worksheet, aba_nome, cabecalho, excluir=[pos for pos in posicoes if pos is not None])
+    
+    def mesclar_linhas(self, aba_nome, df):
+        """Edições das linhas existentes e anexos das novas em um único spreadsheets.batchUpdate"""
+        worksheet = self._worksheet(aba_nome, criar=True)
+        cabecalho, posicoes = self._posicoes(worksheet, aba_nome, df)
+        if not cabecalho:
+            anexar_linhas_planilha(worksheet, df, aba_nome)
+            return
+        novo_cabecalho = cabecalho + [col for col in df.columns if col not in cabecalho]
+        alinhado = df.reindex(columns=novo_cabecalho, fill_value="")
+        self._enviar_alteracoes(
+            worksheet, aba_nome, cabecalho,
+            atualizar=[(pos, alinhado.iloc[[i]]) for i, pos in enumerate(posicoes) if pos is not None],
+            anexar=alinhado.iloc[[i for i, pos in enumerate(posicoes) if pos is None]],
+            novo_cabecalho=novo_cabecalho
+        )
+    
+    def substituir_tabela(self, aba_nome, df):
+        """Grava só a diferença para o conteúdo atual (sem limpar a aba antes)"""
+        worksheet = self._worksheet(aba_nome, criar=True)
+        valores = worksheet.get_all_values()
+        if not valores or not valores[0]:
+            worksheet.update([df.columns.tolist()] + preparar_valores_para_planilha(df, aba_nome), value_input_option='USER_ENTERED')
+            obter_snapshot(self.sheet_id).descartar(aba_nome)
+            return
+        
+        cabecalho = valores[0]
+        novo_cabecalho = cabecalho + [col for col in df.columns if col not in cabecalho]
+        atual = montar_dataframe(aba_nome, cabecalho, valores[1:])
+        novo = df.reindex(columns=novo_cabecalho, fill_value="")
+        excluir, atualizar, anexar = diferencas_tabelas(aba_nome, atual, novo)
+        self._enviar_alteracoes(
+            worksheet, aba_nome, cabecalho,
+            atualizar=[(pos_antiga, novo.iloc[[pos_nova]]) for pos_antiga, pos_nova in atualizar],
+            excluir=excluir,
+            anexar=novo.iloc[anexar],
+            novo_cabecalho=novo_cabecalho
+        )
+    
+    def existentes(self, aba_nome, df, colunas):
+        from gspread.exceptions import WorksheetNotFound
+        try:
+            worksheet = self._worksheet(aba_nome)
+        except WorksheetNotFound:
+            return [False] * len(df)
+        _, posicoes = self._posicoes(worksheet, aba_nome, df, colunas)
+        return [pos is not None for pos in posicoes]
+
+def citar_sql(nome):
+    """Cita um identificador SQL (abas e colunas têm acentos e espaços)"""
+    return '"' + str(nome).replace('"', '""') + '"'
+
+class ArmazenamentoSQLite(Armazenamento):
+    """Backend local em SQLite, com índices em PLACA, OPERACAO e DATA_ABORDAGEM
+    
+    Datas são gravadas como texto ISO (aaaa-mm-dd hh:mm:ss), que ordena
+    corretamente e permite consultas por intervalo usando o índice.
+    """
+    
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.identificador = f"sqlite:{os.path.abspath(caminho)}"
+        self._lock = threading.Lock()
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False)
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+    
+    def _colunas(self, aba_nome):
+        return [linha[1] for linha in self._conexao.execute(f"PRAGMA table_info({citar_sql(aba_nome)})")]
+    
+    def _garantir_tabela(self, aba_nome, colunas):
+        existentes = self._colunas(aba_nome)
+        numericas = colunas_do_tipo(aba_nome, "numero")
+        tipos = {col: "REAL" if col in numericas else "TEXT" for col in colunas}
+        
+        if not existentes:
+            definicoes = ", ".join(f"{citar_sql(col)} {tipos[col]}" for col in colunas)
+            self._conexao.execute(f"CREATE TABLE {citar_sql(aba_nome)} ({definicoes})")
+        else:
+            for col in colunas:
+                if col not in existentes:
+                    self._conexao.execute(f"ALTER TABLE {citar_sql(aba_nome)} ADD COLUMN {citar_sql(col)} {tipos[col]}")
+        
+        for col in INDICES_SQLITE.get(aba_nome, []):
+            if col in colunas or col in existentes:
+                self._conexao.execute(
+                    f"CREATE INDEX IF NOT EXISTS {citar_sql(f'idx_{aba_nome}_{col}')} "
+                    f"ON {citar_sql(aba_nome)} ({citar_sql(col)})"
+                )
+    
+    def _serializar(self, aba_nome, df):
+        """Converte df para listas de valores Python aceitos pelo sqlite3"""
+        df = aplicar_esquema(aba_nome, df.copy(), categorias=False)
+        for col in df.columns:
+            if pd.api.types.is_datetime64_any_dtype(df[col]):
+                df[col] = df[col].dt.strftime(FORMATO_DATA_SQLITE)
+        df = df.astype(object)
+        return df.where(df.notna(), None).values.tolist()
+    
+    def _filtro(self, colunas):
+        return " AND ".join(f"{citar_sql(col)} = ?" for col in colunas)
+    
+    def _grupos_chave(self, aba_nome, df):
+        """Linhas de df agrupadas pela forma de localizá-las: (colunas do WHERE, posições, valores dessas colunas)
+        
+        As que têm ID_REGISTRO são localizadas só por ele; as demais pela
+        chave da aba. Chamar com o lock.
+        """
+        grupos = [(CHAVES_ABAS[aba_nome], np.ones(len(df), dtype=bool))]
+        if parear_por_id(df) and COLUNA_ID_REGISTRO in self._colunas(aba_nome):
+            com_id = df[COLUNA_ID_REGISTRO].astype("string").str.strip().fillna("").ne("").to_numpy()
+            grupos = [([COLUNA_ID_REGISTRO], com_id), (CHAVES_ABAS[aba_nome], ~com_id)]
+        return [
+            (colunas, np.flatnonzero(mascara), self._serializar(aba_nome, df[mascara].reindex(columns=colunas)))
+            for colunas, mascara in grupos if mascara.any()
+        ]
+    
+    def _desserializar(self, aba_nome, df):
+        """Converte as datas ISO lidas do banco e aplica o esquema da aba"""
+        for col in colunas_do_tipo(aba_nome, "data", "data_hora"):
+            if col in df.columns:
+                df[col] = pd.to_datetime(df[col], format=FORMATO_DATA_SQLITE, errors='coerce')
+        return aplicar_esquema(aba_nome, df)
+    
+    def carregar_tabela(self, aba_nome):
+        with self._lock:
+            if not self._colunas(aba_nome):
+                return pd.DataFrame()
+            df = pd.read_sql_query(f"SELECT * FROM {citar_sql(aba_nome)} ORDER BY rowid", self._conexao)
+        
+        return self._desserializar(aba_nome, df)
+    
+    def _inserir(self, aba_nome, df):
+        colunas = ", ".join(citar_sql(col) for col in df.columns)
+        marcadores = ", ".join("?" for _ in df.columns)
+        self._garantir_tabela(aba_nome, df.columns.tolist())
+        self._conexao.executemany(
+            f"INSERT INTO {citar_sql(aba_nome)} ({colunas}) VALUES ({marcadores})",
+            self._serializar(aba_nome, df)
+        )
+    
+    def anexar_linhas(self, aba_nome, df):
+        with self._lock, self._conexao:
+            self._inserir(aba_nome, df)
+    
+    def atualizar_linhas(self, aba_nome, df):
+        atribuicoes = ", ".join(f"{citar_sql(col)} = ?" for col in df.columns)
+        valores = self._serializar(aba_nome, df)
+        with self._lock, self._conexao:
+            self._garantir_tabela(aba_nome, df.columns.tolist())
+            for colunas, posicoes, chaves in self._grupos_chave(aba_nome, df):
+                self._conexao.executemany(
+                    f"UPDATE {citar_sql(aba_nome)} SET {atribuicoes} WHERE {self._filtro(colunas)}",
+                    [valores[pos] + chave for pos, chave in zip(posicoes, chaves)]
+                )
+    
+    def excluir_linhas(self, aba_nome, df):
+        with self._lock, self._conexao:
+            if not self._colunas(aba_nome):
+                return
+            # Uma linha por execução: a primeira (por rowid) que ainda casa com a chave
+            for colunas, _, chaves in self._grupos_chave(aba_nome, df):
+                self._conexao.executemany(
+                    f"DELETE FROM {citar_sql(aba_nome)} WHERE rowid = "
+                    f"(SELECT rowid FROM {citar_sql(aba_nome)} WHERE {self._filtro(colunas)} ORDER BY rowid LIMIT 1)",
+                    chaves
+                )
+    
+    def mesclar_linhas(self, aba_nome, df):
+        # Uma só transação: UPDATE pela chave e INSERT das linhas que não casaram
+        atribuicoes = ", ".join(f"{citar_sql(col)} = ?" for col in df.columns)
+        valores = self._serializar(aba_nome, df)
+        with self._lock, self._conexao:
+            self._garantir_tabela(aba_nome, df.columns.tolist())
+            novas = []
+            for colunas, posicoes, chaves in self._grupos_chave(aba_nome, df):
+                for pos, chave in zip(posicoes, chaves):
+                    cursor = self._conexao.execute(
+                        f"UPDATE {citar_sql(aba_nome)} SET {atribuicoes} WHERE {self._filtro(colunas)}",
+                        valores[pos] + chave
+                    )
+                    if cursor.rowcount == 0:
+                        novas.append(pos)
+            if novas:
+                self._inserir(aba_nome, df.iloc[sorted(novas)])
+    
+    def substituir_tabela(self, aba_nome, df):
+        # Uma só transação: leitores (WAL) continuam vendo a versão anterior até o commit
+        with self._lock, self._conexao:
+            # BEGIN explícito: o sqlite3 não abre transação sozinho antes de DDL
+            self._conexao.execute("BEGIN")
+            self._conexao.execute(f"DROP TABLE IF EXISTS {citar_sql(aba_nome)}")
+            self._inserir(aba_nome, df)
+    
+    def existentes(self, aba_nome, df, colunas):
+        with self._lock:
+            colunas_tabela = self._colunas(aba_nome)
+            if not colunas_tabela or not set(colunas) <= set(colunas_tabela):
+                return [False] * len(df)
+            filtro = " AND ".join(f"{citar_sql(col)} = ?" for col in colunas)
+            return [
+                self._conexao.execute(f"SELECT 1 FROM {citar_sql(aba_nome)} WHERE {filtro} LIMIT 1", valores).fetchone() is not None
+                for valores in self._serializar(aba_nome, df.reindex(columns=colunas))
+            ]
+    
+    def consultar_intervalo(self, aba_nome, coluna, inicio, fim):
+        if coluna in colunas_do_tipo(aba_nome, "data", "data_hora"):
+            inicio = pd.Timestamp(inicio).strftime(FORMATO_DATA_SQLITE)
+            fim = pd.Timestamp(fim).strftime(FORMATO_DATA_SQLITE)
+        with self._lock:
+            df = pd.read_sql_query(
+                f"SELECT * FROM {citar_sql(aba_nome)} WHERE {citar_sql(coluna)} BETWEEN ? AND ? ORDER BY rowid",
+                self._conexao,
+                params=(inicio, fim)
+            )
+        return self._desserializar(aba_nome, df)
+
+@st.cache_resource(show_spinner=False, ttl=3600)
+def obter_armazenamento(backend, destino):
+    """Instancia o backend de armazenamento configurado"""
+    if backend == "sqlite":
+        return ArmazenamentoSQLite(destino)
+    
+    client = get_google_sheets_client()
+    if not client:
+        return None
+    return ArmazenamentoGoogleSheets(ProxyCota(client, obter_controle_cota()), destino)
+
+def carregar_dados_otimizado(armazenamento):
+    """Carrega dados de forma otimizada, recarregando só as abas expiradas"""
+    cache = obter_cache_abas(armazenamento.identificador)
+    atualizador = obter_atualizador(armazenamento)
+    # Abas vencidas continuam servindo a versão anterior enquanto recarregam em segundo plano
+    dados = {aba_nome: cache.obter(aba_nome, aceitar_expirado=True) for aba_nome in ABAS_SISTEMA}
+    vencidas = [aba_nome for aba_nome, df in dados.items() if df is not None and cache.expirada(aba_nome)]
+    if vencidas:
+        atualizador.solicitar()
+    pendentes = [aba_nome for aba_nome, df in dados.items() if df is None]
+    contar("cache_abas_acerto", len(dados) - len(vencidas) - len(pendentes))
+    contar("cache_abas_vencida", len(vencidas))
+    contar("cache_abas_falha", len(pendentes))
+    if not pendentes:
+        return dados
+    
+    try:
+        armazenamento.conectar()
+    except Exception as e:
+        st.error(f"Erro ao carregar planilha: {str(e)}")
+        return {}
+    
+    # Sessões cujo cache expirou ao mesmo tempo esperam uma única recarga
+    erros, _ = cache.recargas.executar(tuple(pendentes), lambda: recarregar_abas(armazenamento, pendentes))
+    
+    for aba_nome in pendentes:
+        df = cache.obter(aba_nome) if aba_nome not in erros else None
+        if df is None:
+            st.warning(f"Aba {aba_nome} não encontrada ou vazia: {erros.get(aba_nome, '')}")
+            df = pd.DataFrame()
+        dados[aba_nome] = df
+    
+    return dados
+
+def recarregar_abas(armazenamento, pendentes):
+    """Lê as abas do backend e as guarda no cache; devolve {aba: erro} das que falharam"""
+    cache = obter_cache_abas(armazenamento.identificador)
+    fila = obter_fila_gravacao(armazenamento)
+    capturados = fila.capturar_pendentes()
+    # Todas as abas expiradas em uma única leitura em lote
+    try:
+        with medir("carregar_abas"):
+            carregados = armazenamento.carregar_tabelas(pendentes)
+    except Exception:
+        carregados = {}
+    
+    erros = {}
+    for aba_nome in pendentes:
+        try:
+            df = carregados[aba_nome] if aba_nome in carregados else armazenamento.carregar_tabela(aba_nome)
+            # Gravações ainda na fila continuam visíveis depois da recarga
+            df = fila.sobrepor_pendentes(aba_nome, df, capturados)
+            cache.armazenar(aba_nome, df)
+            contar("linhas_carregadas", len(df))
+        except Exception as e:
+            erros[aba_nome] = str(e)
+    return erros
+
+class AtualizadorFundo:
+    """Thread que recarrega as abas antes de o TTL vencer (stale-while-revalidate)
+    
+    Ao ser criado, já aquece o cache com todas as abas. Depois, recarrega as
+    que passaram de FRACAO_TTL_ATUALIZACAO do TTL, de modo que as sessões
+    quase nunca encontram o cache vencido; quando encontram, recebem a versão
+    anterior e pedem a recarga com solicitar(), sem esperar por ela.
+    """
+    
+    def __init__(self, armazenamento):
+        self.armazenamento = armazenamento
+        self.ultimo_erro = None
+        self._pedido = threading.Event()
+        self._thread = threading.Thread(target=self._executar, name="atualizador-abas", daemon=True)
+        self._thread.start()
+    
+    def solicitar(self):
+        """Pede uma recarga imediata (não bloqueia)"""
+        self._pedido.set()
+    
+    def _vencendo(self, cache):
+        limite = cache.ttl * FRACAO_TTL_ATUALIZACAO
+        return [aba_nome for aba_nome in ABAS_SISTEMA if (cache.idade(aba_nome) or float("inf")) >= limite]
+    
+    def _executar(self):
+        cache = obter_cache_abas(self.armazenamento.identificador)
+        while True:
+            abas = self._vencendo(cache)
+            if abas:
+                # Instância atual do backend (obter_armazenamento a recria a cada hora)
+                armazenamento = self.armazenamento
+                try:
+                    erros, _ = cache.recargas.executar(tuple(abas), lambda: recarregar_abas(armazenamento, abas))
+                    self.ultimo_erro = "; ".join(f"{aba_nome}: {erro}" for aba_nome, erro in erros.items()) or None
+                except Exception as e:
+                    # Sem planilha agora: as sessões seguem com a versão anterior
+                    self.ultimo_erro = str(e)
+            # Dorme até a próxima aba chegar ao ponto de recarga (ou até um pedido)
+            idades = [cache.idade(aba_nome) for aba_nome in ABAS_SISTEMA]
+            proxima = min((cache.ttl * FRACAO_TTL_ATUALIZACAO - idade for idade in idades if idade is not None), default=cache.ttl)
+            self._pedido.wait(max(proxima, INTERVALO_MINIMO_ATUALIZACAO))
+            self._pedido.clear()
+
+@st.cache_resource(show_spinner=False)
+def criar_atualizador(identificador, _armazenamento):
+    """Atualizador em segundo plano compartilhado por todas as sessões (um por backend)"""
+    return AtualizadorFundo(_armazenamento)
+
+def obter_atualizador(armazenamento):
+    """Atualizador do backend, apontado para a instância atual dele (ver obter_fila_gravacao)"""
+    atualizador = criar_atualizador(armazenamento.identificador, armazenamento)
+    atualizador.armazenamento = armazenamento
+    return atualizador
+
+# -------------------- FILA DE GRAVAÇÃO --------------------
+class FilaGravacao:
+    """Fila de gravações do processo, esvaziada em lotes por uma thread própria
+    
+    enfileirar() aplica a alteração no cache na hora (a interface confirma sem
+    esperar a planilha) e devolve um ticket. A thread grava os pedidos na
+    ordem de chegada, juntando os consecutivos da mesma aba e modo em uma
+    única chamada. Erros de cota levam a novas tentativas com espera
+    exponencial; antes de reenviar linhas, o que já chegou à planilha (pelo
+    ID_REGISTRO ou pela chave) é descartado, para não duplicar linhas.
+    """
+    
+    def __init__(self, armazenamento):
+        self.armazenamento = armazenamento
+        self._condicao = threading.Condition()
+        self._itens = []
+        self._estados = OrderedDict()
+        self._thread = None
+    
+    def enfileirar(self, aba_nome, df, modo):
+        """Agenda a gravação de df (modo "anexar", "excluir", "mesclar" ou "substituir") e devolve o ticket"""
+        item = {"ticket": uuid.uuid4().hex, "aba": aba_nome, "modo": modo, "df": df, "tentativas": 0, "proxima": 0.0}
+        cache = obter_cache_abas(self.armazenamento.identificador)
+        with self._condicao:
+            self._itens.append(item)
+            self._definir_estado(item["ticket"], "pendente")
+            if modo == "anexar":
+                cache.anexar(aba_nome, aplicar_esquema(aba_nome, df.copy()))
+            elif modo == "excluir":
+                cache.remover(aba_nome, df)
+            elif modo == "mesclar":
+                cache.mesclar(aba_nome, df)
+            else:
+                cache.armazenar(aba_nome, aplicar_esquema(aba_nome, df.copy()))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._executar, name="fila-gravacao", daemon=True)
+                self._thread.start()
+            self._condicao.notify()
+        return item["ticket"]
+    
+    def _definir_estado(self, ticket, estado, erro=None):
+        self._estados[ticket] = (estado, erro)
+        self._estados.move_to_end(ticket)
+        # Tickets antigos que nenhuma sessão consultou são descartados
+        while len(self._estados) > 1000:
+            self._estados.popitem(last=False)
+    
+    def estado(self, ticket):
+        """("pendente" | "concluida" | "falhou", erro) do ticket"""
+        with self._condicao:
+            return self._estados.get(ticket, ("concluida", None))
+    
+    def pendentes(self):
+        with self._condicao:
+            return len(self._itens)
+    
+    def capturar_pendentes(self):
+        """Itens ainda na fila; capturados antes de ler o backend, para sobrepor_pendentes"""
+        with self._condicao:
+            return list(self._itens)
+    
+    def sobrepor_pendentes(self, aba_nome, df, capturados=()):
+        """Aplica sobre df recém-carregado as gravações da aba que ainda não chegaram ao backend
+        
+        capturados traz os itens pendentes antes da leitura: um item gravado
+        enquanto o backend era lido já saiu da fila, mas pode faltar em df.
+        Reaplicar um item que já está em df não o altera.
+        """
+        with self._condicao:
+            tickets = {item["ticket"] for item in capturados}
+            itens = [
+                item for item in list(capturados) + [item for item in self._itens if item["ticket"] not in tickets]
+                if item["aba"] == aba_nome and self._estados.get(item["ticket"], ("",))[0] != "falhou"
+            ]
+        for item in itens:
+            linhas = item["df"]
+            if item["modo"] == "substituir":
+                df = linhas.copy()
+            elif item["modo"] == "mesclar":
+                df = mesclar_tabelas(aba_nome, df, linhas)
+            elif df.empty:
+                df = linhas.copy() if item["modo"] == "anexar" else df
+            else:
+                colunas = colunas_idempotencia(aba_nome, linhas) if item["modo"] == "anexar" else None
+                tipado = aplicar_esquema(aba_nome, linhas.copy())
+                por_id = colunas is None and parear_por_id(df, tipado)
+                presentes = chave_linhas(aba_nome, df, colunas, por_id).isin(chave_linhas(aba_nome, tipado, colunas, por_id))
+                if item["modo"] == "excluir":
+                    df = df[~presentes].reset_index(drop=True)
+                else:
+                    faltando = ~chave_linhas(aba_nome, tipado, colunas).isin(chave_linhas(aba_nome, df, colunas))
+                    df = pd.concat([df, tipado[faltando]], ignore_index=True)
+        return aplicar_esquema(aba_nome, df) if itens else df
+    
+    def _executar(self):
+        while True:
+            with self._condicao:
+                while not self._itens or self._itens[0]["proxima"] > time.time():
+                    espera = self._itens[0]["proxima"] - time.time() if self._itens else None
+                    self._condicao.wait(espera)
+            # Dá tempo para envios simultâneos entrarem no mesmo lote
+            time.sleep(JANELA_LOTE_GRAVACAO)
+            with self._condicao:
+                primeiro = self._itens[0]
+                lote = []
+                for item in self._itens:
+                    if item["aba"] != primeiro["aba"] or item["modo"] != primeiro["modo"]:
+                        break
+                    lote.append(item)
+            self._gravar(lote)
+    
+    def _gravar(self, lote):
+        aba_nome, modo = lote[0]["aba"], lote[0]["modo"]
+        armazenamento = self.armazenamento
+        inicio = time.perf_counter()
+        try:
+            if modo == "substituir":
+                # Só a última versão completa da aba importa
+                armazenamento.substituir_tabela(aba_nome, lote[-1]["df"])
+            else:
+                df = pd.concat([item["df"] for item in lote], ignore_index=True)
+                if modo == "excluir":
+                    armazenamento.excluir_linhas(aba_nome, df)
+                elif modo == "mesclar":
+                    # Localiza pela chave a cada envio: repetir depois de um erro não duplica linhas
+                    armazenamento.mesclar_linhas(aba_nome, df[~chave_linhas(aba_nome, df, por_id=True).duplicated(keep="last")])
+                else:
+                    if any(item["tentativas"] for item in lote):
+                        # A tentativa anterior pode ter chegado à planilha antes do erro
+                        ja_gravadas = armazenamento.existentes(aba_nome, df, colunas_idempotencia(aba_nome, df))
+                        df = df[~np.asarray(ja_gravadas, dtype=bool)]
+                    if not df.empty:
+                        armazenamento.anexar_linhas(aba_nome, df)
+        except Exception as e:
+            obter_metricas().registrar_span(f"gravar.{modo}", time.perf_counter() - inicio)
+            tentativas = lote[0]["tentativas"] + 1
+            if erro_temporario(e) and tentativas < MAX_TENTATIVAS_GRAVACAO:
+                espera = min(ESPERA_BASE_GRAVACAO * 2 ** (tentativas - 1), ESPERA_MAXIMA_GRAVACAO)
+                with self._condicao:
+                    for item in lote:
+                        item["tentativas"] = tentativas
+                        item["proxima"] = time.time() + espera * random.uniform(0.8, 1.2)
+                contar("gravacoes_novas_tentativas")
+                return
+            with self._condicao:
+                for item in lote:
+                    self._itens.remove(item)
+                    self._definir_estado(item["ticket"], "falhou", str(e))
+            contar("gravacoes_falhas", len(lote))
+            # Descarta as alterações otimistas: a próxima leitura vem do backend
+            obter_cache_abas(armazenamento.identificador).invalidar(aba_nome)
+            return
+        
+        obter_metricas().registrar_span(f"gravar.{modo}", time.perf_counter() - inicio)
+        contar("linhas_gravadas", sum(len(item["df"]) for item in lote))
+        with self._condicao:
+            for item in lote:
+                self._itens.remove(item)
+                self._definir_estado(item["ticket"], "concluida")
+
+@st.cache_resource(show_spinner=False)
+def criar_fila_gravacao(identificador, _armazenamento):
+    """Fila de gravação compartilhada por todas as sessões (uma por backend)"""
+    return FilaGravacao(_armazenamento)
+
+def obter_fila_gravacao(armazenamento):
+    """Fila de gravação do backend, apontada para a instância atual dele
+    
+    obter_armazenamento recria o backend a cada hora; a fila vive o processo
+    todo e passa a gravar pela instância nova a partir do próximo lote.
+    """
+    fila = criar_fila_gravacao(armazenamento.identificador, armazenamento)
+    fila.armazenamento = armazenamento
+    return fila
+
+def enviar_gravacao(armazenamento, aba_nome, df, modo, descricao):
+    """Coloca a gravação na fila; a confirmação aparece na próxima execução da página"""
+    ticket = obter_fila_gravacao(armazenamento).enfileirar(aba_nome, df, modo)
+    st.session_state.setdefault("gravacoes", {})[ticket] = descricao
+    st.session_state.setdefault("avisos", []).append(f"✅ {descricao}")
+
+def acompanhar_gravacoes(armazenamento):
+    """Mostra as confirmações pendentes e as gravações desta sessão que falharam"""
+    for aviso in st.session_state.pop("avisos", []):
+        st.toast(aviso)
+    
+    gravacoes = st.session_state.get("gravacoes", {})
+    if not gravacoes:
+        return
+    fila = obter_fila_gravacao(armazenamento)
+    for ticket, descricao in list(gravacoes.items()):
+        estado, erro = fila.estado(ticket)
+        if estado == "pendente":
+            continue
+        del gravacoes[ticket]
+        if estado == "falhou":
+            st.error(f"❌ Não foi possível gravar ({descricao}): {erro}")
+    if gravacoes:
+        st.sidebar.caption(f"⏳ {len(gravacoes)} gravação(ões) sendo enviada(s)")
+
+# -------------------- ÍNDICES E VISÕES DERIVADAS --------------------
+# Placas antigas (ABC1234) viram Mercosul (ABC1C34): o 5º caractere 0-9 vira A-J
+DIGITO_PARA_LETRA_MERCOSUL = {str(digito): chr(ord('A') + digito) for digito in range(10)}
+PADRAO_PLACA_ANTIGA = r'^[A-Z]{3}[0-9][0-9]'
+
+def limpar_placas(placas):
+    """Placas (Series) em maiúsculas, sem hífen/espaço, no formato em que foram cadastradas"""
+    return placas.astype("string").str.upper().str.replace(r'[\s-]', '', regex=True)
+
+def normalizar_placas(placas):
+    """Normaliza placas (Series): maiúsculas, sem hífen/espaço e no formato Mercosul"""
+    chaves = limpar_placas(placas)
+    antigas = chaves.str.contains(PADRAO_PLACA_ANTIGA, regex=True, na=False)
+    if antigas.any():
+        chaves = chaves.where(
+            ~antigas,
+            chaves.str[:4] + chaves.str[4].map(DIGITO_PARA_LETRA_MERCOSUL) + chaves.str[5:]
+        )
+    return chaves
+
+def normalizar_placa(placa):
+    """Normaliza uma placa (ou início de placa) digitada pelo usuário"""
+    chave = re.sub(r'[\s-]', '', str(placa).upper())
+    if re.match(PADRAO_PLACA_ANTIGA, chave):
+        chave = chave[:4] + DIGITO_PARA_LETRA_MERCOSUL[chave[4]] + chave[5:]
+    return chave
+
+class IndicePlacas:
+    """Índice hash das placas da frota, construído uma vez por versão dos veículos
+    
+    Guarda o DataFrame de origem, de modo que as posições retornadas sempre
+    correspondem às linhas da mesma versão usada para construir o índice.
+    """
+    
+    def __init__(self, df_veiculos):
+        self.df = df_veiculos
+        if 'PLACA' in df_veiculos.columns:
+            self.placas = limpar_placas(df_veiculos['PLACA']).reset_index(drop=True)
+            self.chaves = normalizar_placas(self.placas)
+        else:
+            self.placas = self.chaves = pd.Series([], dtype="string")
+        self.posicoes = {}
+        for pos, chave in enumerate(self.chaves.tolist()):
+            if not pd.isna(chave):
+                self.posicoes.setdefault(chave, []).append(pos)
+        self.chaves_ordenadas = sorted(self.posicoes)
+    
+    def buscar(self, placa):
+        """Posições da placa exata (O(1))"""
+        return self.posicoes.get(normalizar_placa(placa), [])
+    
+    def veiculo(self, placa):
+        """Linha do veículo com a placa informada, ou None"""
+        posicoes = self.buscar(placa)
+        return self.df.iloc[posicoes[0]] if posicoes else None
+    
+    def localizar(self, placas):
+        """Posição do primeiro veículo de cada placa de uma Series (-1 se não cadastrada), sem laço"""
+        unicas = self.chaves.dropna().drop_duplicates()
+        posicoes = pd.Index(unicas).get_indexer(normalizar_placas(placas).fillna(""))
+        return np.where(posicoes >= 0, unicas.index.to_numpy()[posicoes], -1)
+    
+    def buscar_prefixo(self, prefixo):
+        """Posições das placas que começam com o prefixo (busca binária)"""
+        prefixo = normalizar_placa(prefixo)
+        inicio = bisect.bisect_left(self.chaves_ordenadas, prefixo)
+        fim = bisect.bisect_left(self.chaves_ordenadas, prefixo + '\uffff')
+        return sorted(pos for chave in self.chaves_ordenadas[inicio:fim] for pos in self.posicoes[chave])
+    
+    def pesquisar(self, texto):
+        """Prefixo pelo índice; se nada casar, procura o trecho em qualquer posição
+        
+        O trecho é procurado na placa como cadastrada e na chave Mercosul: em
+        ABC-1234 (chave ABC1C34), "1234" e "1C34" encontram o veículo.
+        """
+        posicoes = self.buscar_prefixo(texto)
+        if not posicoes:
+            trecho = re.sub(r'[\s-]', '', str(texto).upper())
+            casam = self.placas.str.contains(trecho, regex=False, na=False) | self.chaves.str.contains(trecho, regex=False, na=False)
+            posicoes = np.flatnonzero(casam.to_numpy()).tolist()
+        return self.df.iloc[posicoes]
+
+def obter_indice_placas(armazenamento):
+    """Índice de placas da versão atual da aba de veículos"""
+    return obter_cache_abas(armazenamento.identificador).derivado("indice_placas", ["veiculos"], IndicePlacas)
+
+def enriquecer_atendimentos(df_atendimentos, df_operacoes):
+    """Acrescenta OPERAÇÃO TITULAR aos atendimentos (junção por OPERACAO → OPERAÇÃO)"""
+    if 'OPERACAO' not in df_atendimentos.columns:
+        return df_atendimentos
+    
+    with medir("enriquecer_atendimentos"):
+        if {'OPERAÇÃO', 'OPERAÇÃO TITULAR'} <= set(df_operacoes.columns):
+            titulares = df_operacoes.drop_duplicates('OPERAÇÃO', keep='last').set_index('OPERAÇÃO')['OPERAÇÃO TITULAR']
+        else:
+            titulares = pd.Series(dtype=object)
+        return df_atendimentos.assign(**{'OPERAÇÃO TITULAR': df_atendimentos['OPERACAO'].map(titulares).astype("category")})
+
+def estender_atendimentos_enriquecidos(anterior, alteracoes, df_operacoes):
+    """Enriquece só as linhas anexadas e as junta à visão anterior"""
+    if any(tipo != "anexar" for tipo, _ in alteracoes):
+        return None
+    novas = [enriquecer_atendimentos(linhas, df_operacoes) for _, linhas in alteracoes if not linhas.empty]
+    return concatenar([anterior] + novas) if novas else anterior
+
+def obter_atendimentos_enriquecidos(armazenamento):
+    """Visão compartilhada (somente leitura) dos atendimentos com OPERAÇÃO TITULAR"""
+    return obter_cache_abas(armazenamento.identificador).derivado(
+        "atendimentos_enriquecidos",
+        ["atendimentos", "operacoes"],
+        enriquecer_atendimentos,
+        estender_atendimentos_enriquecidos
+    )
+
+# Dimensões dos agregados do Dashboard: nome → coluna da visão enriquecida
+DIMENSOES_AGREGADOS = {
+    "titular": "OPERAÇÃO TITULAR",
+    "operacao": "OPERACAO",
+    "colaborador": "COLABORADOR",
+    "revisao": "REVISAO",
+    "dia_lancamento": "DATA_LANCAMENTO",
+    "dia_abordagem": "DATA_ABORDAGEM"
+}
+
+class AgregadosAtendimentos:
+    """Contagens, somas e médias de MEDIA_ATENDIMENTO por dimensão
+    
+    Cada instância corresponde a uma versão dos dados e não é alterada:
+    combinar() devolve uma nova instância com as linhas somadas ou subtraídas.
+    """
+    
+    def __init__(self, df=None):
+        self.quantidade = 0
+        self.soma = 0.0
+        self.validos = 0
+        self.grupos = {dimensao: pd.DataFrame(columns=["quantidade", "soma", "validos"]) for dimensao in DIMENSOES_AGREGADOS}
+        if df is not None and not df.empty:
+            self._acumular(df, 1)
+    
+    @staticmethod
+    def _parciais(df, coluna):
+        media = df['MEDIA_ATENDIMENTO'] if 'MEDIA_ATENDIMENTO' in df.columns else pd.Series(np.nan, index=df.index)
+        chave = df[coluna] if coluna in df.columns else pd.Series(np.nan, index=df.index)
+        if pd.api.types.is_datetime64_any_dtype(chave):
+            chave = chave.dt.normalize()
+        return pd.DataFrame({
+            "chave": chave.astype(object),
+            "quantidade": 1,
+            "soma": media.fillna(0).astype(float),
+            "validos": media.notna().astype(int)
+        }).groupby("chave", dropna=True).sum()
+    
+    def _acumular(self, df, sinal):
+        media = df['MEDIA_ATENDIMENTO'] if 'MEDIA_ATENDIMENTO' in df.columns else pd.Series(np.nan, index=df.index)
+        self.quantidade += sinal * len(df)
+        self.soma += sinal * float(media.fillna(0).sum())
+        self.validos += sinal * int(media.notna().sum())
+        for dimensao, coluna in DIMENSOES_AGREGADOS.items():
+            grupos = self.grupos[dimensao].add(sinal * self._parciais(df, coluna), fill_value=0)
+            self.grupos[dimensao] = grupos[grupos["quantidade"] > 0].sort_index()
+    
+    def combinar(self, alteracoes):
+        """Nova instância com as linhas anexadas somadas e as removidas subtraídas"""
+        novo = AgregadosAtendimentos()
+        novo.quantidade, novo.soma, novo.validos = self.quantidade, self.soma, self.validos
+        novo.grupos = dict(self.grupos)
+        for tipo, linhas in alteracoes:
+            if not linhas.empty:
+                novo._acumular(linhas, 1 if tipo == "anexar" else -1)
+        return novo
+    
+    def contagem(self, dimensao):
+        """Quantidade de atendimentos por valor da dimensão, em ordem decrescente"""
+        return self.grupos[dimensao]["quantidade"].astype(int).sort_values(ascending=False, kind="stable")
+    
+    def media(self, dimensao):
+        """Média de MEDIA_ATENDIMENTO por valor da dimensão"""
+        grupos = self.grupos[dimensao]
+        return (grupos["soma"] / grupos["validos"].where(grupos["validos"] > 0)).astype(float)
+    
+    def principais(self, dimensao, limite, rotulo_resto="Outros"):
+        """Quantidade e média por valor, limitado a `limite` linhas para gráficos
+        
+        Se houver mais valores que o limite, os menores (em quantidade) são
+        somados em uma única linha rotulo_resto, com a média ponderada deles.
+        """
+        grupos = self.grupos[dimensao]
+        if len(grupos) > limite:
+            maiores = grupos["quantidade"].sort_values(ascending=False, kind="stable").index[:limite - 1]
+            manter = grupos.index.isin(maiores)
+            resto = grupos[~manter].sum().to_frame(rotulo_resto).T
+            grupos = pd.concat([grupos[manter], resto])
+        return pd.DataFrame({
+            "quantidade": grupos["quantidade"].astype(int),
+            "media": (grupos["soma"] / grupos["validos"].where(grupos["validos"] > 0)).astype(float)
+        })
+    
+    def media_geral(self):
+        return self.soma / self.validos if self.validos else np.nan
+    
+    def quantidade_no_dia(self, dimensao, dia):
+        """Atendimentos de um dia em uma dimensão de data"""
+        grupos = self.grupos[dimensao]
+        dia = pd.Timestamp(dia)
+        return int(grupos.loc[dia, "quantidade"]) if dia in grupos.index else 0
+
+def construir_agregados(df_atendimentos, df_operacoes):
+    return AgregadosAtendimentos(enriquecer_atendimentos(df_atendimentos, df_operacoes))
+
+def estender_agregados(anterior, alteracoes, df_operacoes):
+    return anterior.combinar([(tipo, enriquecer_atendimentos(linhas, df_operacoes)) for tipo, linhas in alteracoes])
+
+def obter_agregados_atendimentos(armazenamento):
+    """Agregados do Dashboard da versão atual dos dados"""
+    return obter_cache_abas(armazenamento.identificador).derivado(
+        "agregados_atendimentos",
+        ["atendimentos", "operacoes"],
+        construir_agregados,
+        estender_agregados
+    )
+
+# Dimensões do cubo de atendimentos: nome → coluna da visão enriquecida
+DIMENSOES_CUBO = {
+    "titular": "OPERAÇÃO TITULAR",
+    "operacao": "OPERACAO",
+    "colaborador": "COLABORADOR",
+    "revisao": "REVISAO",
+    "tacografo": "TACOGRAFO"
+}
+# Granularidade → frequência de período do pandas (semanas de segunda a domingo)
+GRANULARIDADES_CUBO = {"dia": "D", "semana": "W-SUN", "mes": "M"}
+MEDIDAS_CUBO = ["quantidade", "soma", "validos", "na_meta", "com_meta"]
+SEM_VALOR_CUBO = "(não informado)"
+
+class CuboAtendimentos:
+    """Medidas de atendimentos por dia de abordagem × todas as dimensões do cubo
+    
+    Guarda uma célula por combinação (dia, titular, operação, colaborador,
+    revisão, tacógrafo) com quantidade, soma e válidos de MEDIA_ATENDIMENTO
+    e quantos atingiram a META. Semanas e meses, totais por menos dimensões
+    (roll-up) e recortes por valor (drill-down) saem dessas células, sem
+    voltar às linhas. Linhas sem DATA_ABORDAGEM ficam fora do cubo.
+    Assim como os agregados, cada instância é somente leitura.
+    """
+    
+    def __init__(self, df=None):
+        self.celulas = self._parciais(df if df is not None else pd.DataFrame())
+        self._periodos = {}
+    
+    @staticmethod
+    def _parciais(df):
+        def coluna(nome):
+            return df[nome] if nome in df.columns else pd.Series(np.nan, index=df.index)
+        
+        media = pd.to_numeric(coluna('MEDIA_ATENDIMENTO'), errors='coerce')
+        meta = pd.to_numeric(coluna('META'), errors='coerce')
+        com_meta = media.notna() & meta.notna()
+        parciais = pd.DataFrame({
+            "dia": pd.to_datetime(coluna('DATA_ABORDAGEM'), errors='coerce').dt.normalize(),
+            **{dimensao: coluna(nome).astype(object).fillna(SEM_VALOR_CUBO) for dimensao, nome in DIMENSOES_CUBO.items()},
+            "quantidade": 1,
+            "soma": media.fillna(0).astype(float),
+            "validos": media.notna().astype(int),
+            "na_meta": (com_meta & (media >= meta)).astype(int),
+            "com_meta": com_meta.astype(int)
+        })
+        return parciais.dropna(subset=["dia"]).groupby(["dia"] + list(DIMENSOES_CUBO)).sum()
+    
+    def combinar(self, alteracoes):
+        """Nova instância com as linhas anexadas somadas e as removidas subtraídas"""
+        novo = CuboAtendimentos()
+        celulas = self.celulas
+        for tipo, linhas in alteracoes:
+            if not linhas.empty:
+                sinal = 1 if tipo == "anexar" else -1
+                celulas = celulas.add(sinal * self._parciais(linhas), fill_value=0)
+        novo.celulas = celulas[celulas["quantidade"] > 0]
+        return novo
+    
+    def _por_periodo(self, granularidade):
+        """Células somadas por período, calculadas na primeira consulta de cada granularidade"""
+        if granularidade not in self._periodos:
+            celulas = self.celulas.reset_index()
+            celulas["periodo"] = celulas["dia"].dt.to_period(GRANULARIDADES_CUBO[granularidade]).dt.start_time
+            self._periodos[granularidade] = celulas.groupby(["periodo"] + list(DIMENSOES_CUBO))[MEDIDAS_CUBO].sum().reset_index()
+        return self._periodos[granularidade]
+    
+    def consultar(self, granularidade="dia", dimensoes=(), filtros=None, inicio=None, fim=None, limite=None):
+        """Medidas por período (e pelas dimensões pedidas), em ordem de período
+        
+        filtros: {dimensão: valor} para recortar o cubo antes de agrupar;
+        inicio/fim: datas limite (inclusive); entram os períodos que as contêm;
+        limite: máximo de valores da última dimensão (os demais viram "Outros").
+        Devolve as colunas periodo, dimensões, quantidade, soma, validos,
+        media e percentual_meta (0 a 100, NaN sem META).
+        """
+        celulas = self._por_periodo(granularidade)
+        for dimensao, valor in (filtros or {}).items():
+            celulas = celulas[celulas[dimensao] == valor]
+        frequencia = GRANULARIDADES_CUBO[granularidade]
+        if inicio is not None:
+            celulas = celulas[celulas["periodo"] >= pd.Timestamp(inicio).to_period(frequencia).start_time]
+        if fim is not None:
+            celulas = celulas[celulas["periodo"] <= pd.Timestamp(fim)]
+        if limite is not None and dimensoes:
+            ultima = dimensoes[-1]
+            totais = celulas.groupby(ultima)["quantidade"].sum()
+            if len(totais) > limite:
+                maiores = totais.sort_values(ascending=False, kind="stable").index[:limite - 1]
+                celulas = celulas.assign(**{ultima: celulas[ultima].where(celulas[ultima].isin(maiores), "Outros")})
+        resultado = celulas.groupby(["periodo"] + list(dimensoes))[MEDIDAS_CUBO].sum().reset_index()
+        resultado["media"] = resultado["soma"] / resultado["validos"].where(resultado["validos"] > 0)
+        resultado["percentual_meta"] = 100 * resultado["na_meta"] / resultado["com_meta"].where(resultado["com_meta"] > 0)
+        return resultado.drop(columns=["na_meta", "com_meta"]).astype({"quantidade": int, "validos": int})
+    
+    def comparar_periodos(self, granularidade, referencia, filtros=None):
+        """Totais do período que contém `referencia` e do período anterior
+        
+        Devolve (atual, anterior), cada um um dicionário com quantidade,
+        media e percentual_meta (NaN quando não há dados).
+        """
+        frequencia = GRANULARIDADES_CUBO[granularidade]
+        atual = pd.Timestamp(referencia).to_period(frequencia)
+        resultado = self.consultar(granularidade, filtros=filtros, inicio=(atual - 1).start_time, fim=atual.end_time).set_index("periodo")
+        vazio = {"quantidade": 0, "media": np.nan, "percentual_meta": np.nan}
+        
+        def totais(periodo):
+            if periodo.start_time not in resultado.index:
+                return dict(vazio)
+            linha = resultado.loc[periodo.start_time]
+            return {"quantidade": int(linha["quantidade"]), "media": linha["media"], "percentual_meta": linha["percentual_meta"]}
+        
+        return totais(atual), totais(atual - 1)
+    
+    def valores(self, dimensao, filtros=None):
+        """Valores presentes de uma dimensão (para os seletores de drill-down)"""
+        celulas = self._por_periodo("mes")
+        for nome, valor in (filtros or {}).items():
+            celulas = celulas[celulas[nome] == valor]
+        return sorted(celulas[dimensao].unique())
+
+def construir_cubo(df_atendimentos, df_operacoes):
+    return CuboAtendimentos(enriquecer_atendimentos(df_atendimentos, df_operacoes))
+
+def estender_cubo(anterior, alteracoes, df_operacoes):
+    return anterior.combinar([(tipo, enriquecer_atendimentos(linhas, df_operacoes)) for tipo, linhas in alteracoes])
+
+def obter_cubo_atendimentos(armazenamento):
+    """Cubo de tendências da versão atual dos dados"""
+    return obter_cache_abas(armazenamento.identificador).derivado(
+        "cubo_atendimentos",
+        ["atendimentos", "operacoes"],
+        construir_cubo,
+        estender_cubo
+    )
+
+# Filtros categóricos do Histórico: nome → coluna da visão enriquecida
+FILTROS_HISTORICO = {
+    "titular": "OPERAÇÃO TITULAR",
+    "status": "REVISAO"
+}
+
+class IndiceHistorico:
+    """Atendimentos ordenados por DATA_ABORDAGEM, com listas de posições por categoria
+    
+    Um período vira uma fatia por busca binária e cada valor de titular/status
+    tem as posições (já ordenadas) onde aparece, então um filtro custa o
+    tamanho do resultado e não o do histórico. As linhas mantêm o índice da
+    visão enriquecida, de modo que .loc continua valendo sobre ela.
+    """
+    
+    def __init__(self, df):
+        if 'DATA_ABORDAGEM' in df.columns:
+            # Ordenação estável: no mesmo dia, preserva a ordem de lançamento; datas vazias ao final
+            self.df = df.sort_values('DATA_ABORDAGEM', kind="stable", na_position="last")
+            datas = self.df['DATA_ABORDAGEM']
+            self.datas = datas[datas.notna()].to_numpy(dtype="datetime64[ns]")
+        else:
+            self.df = df
+            self.datas = np.array([], dtype="datetime64[ns]")
+        self.posicoes = {}
+        for filtro, coluna in FILTROS_HISTORICO.items():
+            if coluna in self.df.columns:
+                self.posicoes[filtro] = self._listas(self.df[coluna].astype(object))
+            else:
+                self.posicoes[filtro] = {}
+        # Placas normalizadas, para o seletor de exclusão buscar pela chave
+        if 'PLACA' in self.df.columns:
+            self.posicoes_placa = self._listas(normalizar_placas(self.df['PLACA']))
+        else:
+            self.posicoes_placa = {}
+    
+    @staticmethod
+    def _listas(valores):
+        valores = valores.reset_index(drop=True)
+        return {
+            valor: np.asarray(posicoes, dtype=np.int64)
+            for valor, posicoes in valores.groupby(valores, dropna=True, observed=True).indices.items()
+        }
+    
+    def periodo(self):
+        """Primeira e última DATA_ABORDAGEM (date), ou None se não houver datas"""
+        if not len(self.datas):
+            return None
+        return pd.Timestamp(self.datas[0]).date(), pd.Timestamp(self.datas[-1]).date()
+    
+    def valores(self, filtro):
+        """Valores existentes de um filtro categórico, em ordem"""
+        return sorted(self.posicoes[filtro], key=str)
+    
+    def _fatia(self, inicio, fim):
+        # Sem período, as linhas sem data também entram (como no filtro original)
+        if inicio is None and fim is None:
+            return 0, len(self.df)
+        esquerda = 0 if inicio is None else np.searchsorted(self.datas, np.datetime64(pd.Timestamp(inicio)), side="left")
+        direita = len(self.datas) if fim is None else np.searchsorted(
+            self.datas, np.datetime64(pd.Timestamp(fim) + pd.Timedelta(days=1)), side="left"
+        )
+        return int(esquerda), int(max(esquerda, direita))
+    
+    def buscar_placa(self, placa, dia=None):
+        """Atendimentos de uma placa (opcionalmente só no dia informado)"""
+        posicoes = self.posicoes_placa.get(normalizar_placa(placa), np.array([], dtype=np.int64))
+        if dia is not None:
+            esquerda, direita = self._fatia(dia, dia)
+            posicoes = posicoes[np.searchsorted(posicoes, esquerda):np.searchsorted(posicoes, direita)]
+        return self.df.iloc[posicoes]
+    
+    def filtrar(self, inicio=None, fim=None, **selecoes):
+        """Linhas no período [inicio, fim] (dias inteiros) e com os valores selecionados
+        
+        selecoes: filtro → lista de valores (ex.: titular=[...], status=[...]);
+        listas vazias ou None não filtram.
+        """
+        esquerda, direita = self._fatia(inicio, fim)
+        resultado = None
+        for filtro, escolhidos in selecoes.items():
+            if not escolhidos:
+                continue
+            listas = [self.posicoes[filtro][valor] for valor in escolhidos if valor in self.posicoes[filtro]]
+            posicoes = np.unique(np.concatenate(listas)) if listas else np.array([], dtype=np.int64)
+            # Restringe ao período pela própria lista ordenada
+            posicoes = posicoes[np.searchsorted(posicoes, esquerda):np.searchsorted(posicoes, direita)]
+            resultado = posicoes if resultado is None else np.intersect1d(resultado, posicoes, assume_unique=True)
+        if resultado is None:
+            return self.df.iloc[esquerda:direita]
+        return self.df.iloc[resultado]
+
+def paginar(df, coluna, crescente, inicio, tamanho):
+    """Página [inicio, inicio + tamanho) do DataFrame ordenado pela coluna
+    
+    Resultados do IndiceHistorico já vêm em ordem de DATA_ABORDAGEM: nesse
+    caso a página é uma fatia direta; nas demais colunas, ordena só as
+    linhas filtradas.
+    """
+    if coluna == 'DATA_ABORDAGEM':
+        if crescente:
+            return df.iloc[inicio:inicio + tamanho]
+        # Decrescente com datas vazias ao final: inverte só a parte com data
+        com_data = int(df['DATA_ABORDAGEM'].notna().sum())
+        posicoes = np.r_[np.arange(com_data - 1, -1, -1), np.arange(com_data, len(df))]
+        return df.iloc[posicoes[inicio:inicio + tamanho]]
+    ordem = df[coluna].reset_index(drop=True).sort_values(ascending=crescente, kind="stable", na_position="last")
+    return df.iloc[ordem.index[inicio:inicio + tamanho]]
+
+def construir_indice_historico(df_atendimentos, df_operacoes):
+    return IndiceHistorico(enriquecer_atendimentos(df_atendimentos, df_operacoes))
+
+def obter_indice_historico(armazenamento):
+    """Índice por data e categoria da versão atual dos atendimentos"""
+    return obter_cache_abas(armazenamento.identificador).derivado(
+        "indice_historico",
+        ["atendimentos", "operacoes"],
+        construir_indice_historico
+    )
+
+class SelecaoOperacoes:
+    """Tabela do seletor de operações dos Registros e busca de uma operação pelo nome
+    
+    Montada uma vez por versão das operações; a cada interação só a
+    pesquisa digitada é aplicada sobre a tabela pronta.
+    """
+    
+    COLUNAS = ['OPERAÇÃO', 'OPERAÇÃO TITULAR', 'MARCA', 'MODELO', 'TIPO', 'META']
+    
+    def __init__(self, df_operacoes):
+        tabela = df_operacoes.reindex(columns=self.COLUNAS)
+        tabela['META'] = pd.to_numeric(tabela['META'], errors='coerce').round(2)
+        tabela.insert(0, 'SELECIONAR', False)
+        self.tabela = tabela.reset_index(drop=True)
+        if 'OPERAÇÃO' in df_operacoes.columns:
+            # Como na busca original, vale a primeira linha de cada operação
+            self.por_nome = df_operacoes.drop_duplicates('OPERAÇÃO').set_index('OPERAÇÃO')
+        else:
+            self.por_nome = pd.DataFrame()
+    
+    def filtrar(self, pesquisa):
+        """Linhas cuja operação ou titular contém o texto pesquisado, numeradas a partir de 1"""
+        tabela = self.tabela
+        if pesquisa:
+            tabela = tabela[
+                tabela['OPERAÇÃO TITULAR'].str.contains(pesquisa, case=False, na=False) |
+                tabela['OPERAÇÃO'].str.contains(pesquisa, case=False, na=False)
+            ]
+        tabela = tabela.assign(ID=range(1, len(tabela) + 1))
+        return tabela[['SELECIONAR', 'ID'] + self.COLUNAS]
+    
+    def operacao(self, nome):
+        """Linha completa da operação, ou None"""
+        return self.por_nome.loc[nome] if nome in self.por_nome.index else None
+
+def obter_selecao_operacoes(armazenamento):
+    """Seletor de operações da versão atual da aba de operações"""
+    return obter_cache_abas(armazenamento.identificador).derivado("selecao_operacoes", ["operacoes"], SelecaoOperacoes)
+
+# -------------------- EXPORTAÇÃO --------------------
+# Formato → (extensão, MIME); XLSX só aparece se o openpyxl estiver instalado
+FORMATOS_EXPORTACAO = {
+    "CSV": (".csv", "text/csv"),
+    "CSV compactado (gzip)": (".csv.gz", "application/gzip"),
+    "Parquet": (".parquet", "application/vnd.apache.parquet"),
+}
+if importlib.util.find_spec("openpyxl") is not None:
+    FORMATOS_EXPORTACAO["Excel (XLSX)"] = (".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+
+def escrever_csv(df, destino):
+    """Escreve o CSV em blocos de linhas, sem montar o texto inteiro em memória"""
+    for inicio in range(0, max(len(df), 1), LINHAS_POR_BLOCO_EXPORTACAO):
+        bloco = df.iloc[inicio:inicio + LINHAS_POR_BLOCO_EXPORTACAO]
+        destino.write(bloco.to_csv(index=False, sep=';', header=inicio == 0).encode("utf-8"))
+
+def gerar_exportacao(df, formato):
+    """Conteúdo (bytes) do DataFrame no formato escolhido"""
+    buffer = BytesIO()
+    with medir(f"exportar.{formato}"):
+        if formato == "CSV":
+            escrever_csv(df, buffer)
+        elif formato == "CSV compactado (gzip)":
+            with gzip.GzipFile(fileobj=buffer, mode="wb") as compactado:
+                escrever_csv(df, compactado)
+        elif formato == "Parquet":
+            # Categorias viram texto para o arquivo abrir igual em qualquer leitor
+            df.astype({coluna: object for coluna in df.select_dtypes("category").columns}).to_parquet(buffer, index=False)
+        else:
+            df.to_excel(buffer, index=False, engine="openpyxl")
+    return buffer.getvalue()
+
+class CacheLRU:
+    """Resultados caros por chave, com descarte do menos usado (LRU)
+    
+    Usado pelas exportações (chave: dados, versão, filtros, formato) e pelas
+    figuras do Dashboard (chave: gráfico, versão, parâmetros). Nas
+    exportações nada é gerado ao exibir a página: o download_button recebe
+    uma função, chamada só no clique, e o resultado fica disponível para as
+    demais sessões enquanto os dados não mudarem.
+    """
+    
+    def __init__(self, limite):
+        self.limite = limite
+        self._lock = threading.Lock()
+        self._arquivos = OrderedDict()
+    
+    def obter(self, chave, gerar):
+        with self._lock:
+            if chave in self._arquivos:
+                self._arquivos.move_to_end(chave)
+                return self._arquivos[chave]
+        conteudo = gerar()
+        with self._lock:
+            self._arquivos[chave] = conteudo
+            while len(self._arquivos) > self.limite:
+                self._arquivos.popitem(last=False)
+        return conteudo
+
+@st.cache_resource(show_spinner=False)
+def obter_cache_exportacoes(identificador):
+    """Cache de exportações compartilhado por todas as sessões"""
+    return CacheLRU(LIMITE_EXPORTACOES_CACHE)
+
+def botao_exportacao(armazenamento, nome, df, abas, filtros=()):
+    """Seletor de formato + botão de download gerado sob demanda
+    
+    abas: abas de que o DataFrame depende (a versão delas entra na chave);
+    filtros: valores dos filtros aplicados a df, se houver.
+    """
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        formato = st.selectbox("Formato", list(FORMATOS_EXPORTACAO), key=f"formato_exportacao_{nome}", label_visibility="collapsed")
+    extensao, mime = FORMATOS_EXPORTACAO[formato]
+    cache_abas = obter_cache_abas(armazenamento.identificador)
+    chave = (nome, tuple(cache_abas.versao(aba_nome) for aba_nome in abas), filtros, formato)
+    exportacoes = obter_cache_exportacoes(armazenamento.identificador)
+    with col2:
+        st.download_button(
+            label=f"📤 Exportar ({formato})",
+            data=lambda: exportacoes.obter(chave, lambda: gerar_exportacao(df, formato)),
+            file_name=f"{nome}_{datetime.now().strftime('%Y%m%d_%H%M%S')}{extensao}",
+            mime=mime,
+            key=f"exportar_{nome}",
+            use_container_width=True
+        )
+
+# -------------------- IMPORTAÇÃO --------------------
+# Colunas do arquivo de importação de atendimentos; as demais são preenchidas no envio
+COLUNAS_IMPORTACAO = [
+    "PLACA", "MOTORISTA", "DATA_ABORDAGEM", "REVISAO", "TACOGRAFO", "OPERACAO",
+    "DATA_INICIO", "DATA_FIM", "MEDIA_ATENDIMENTO", "OBSERVACAO"
+]
+COLUNAS_OPCIONAIS_IMPORTACAO = ["OBSERVACAO"]
+LIMITE_LINHAS_IMPORTACAO = 5000  # Linhas por arquivo (um único envio à planilha)
+
+def ler_arquivo_importacao(arquivo):
+    """Conteúdo de um CSV (separado por ; ou ,) ou XLSX enviado, com todos os valores como texto"""
+    if arquivo.name.lower().endswith(".xlsx"):
+        df = pd.read_excel(arquivo, dtype=str, engine="openpyxl")
+    else:
+        df = pd.read_csv(arquivo, dtype=str, sep=None, engine="python", encoding="utf-8-sig")
+    df.columns = [str(col).strip().upper() for col in df.columns]
+    return df.apply(lambda coluna: coluna.str.strip()).fillna("")
+
+def converter_data_importacao(serie):
+    """Datas em dd/mm/aaaa ou, como o Excel grava, aaaa-mm-dd [hh:mm:ss]; NaT nas inválidas"""
+    datas = pd.to_datetime(serie, format=FORMATO_DATA, errors="coerce")
+    iso = pd.to_datetime(serie.where(datas.isna(), ""), format="ISO8601", errors="coerce")
+    return datas.fillna(iso).dt.normalize()
+
+def ids_importacao(df):
+    """ID_REGISTRO determinístico por linha: reenviar o mesmo arquivo não duplica atendimentos
+    
+    Linhas idênticas no mesmo arquivo se distinguem pela ocorrência.
+    """
+    conteudo = df.astype(str).assign(_ocorrencia=df.astype(str).groupby(list(df.columns)).cumcount())
+    partes = [pd.util.hash_pandas_object(conteudo, index=False, hash_key=chave).to_numpy() for chave in ("importacao000001", "importacao000002")]
+    return [f"{a:016x}{b:016x}" for a, b in zip(*partes)]
+
+class ErrosArquivo:
+    """Erros de validação de um arquivo enviado (atendimentos ou veículos)
+    
+    Cada erro traz a linha do arquivo (contando o cabeçalho), a coluna e o
+    motivo; os que recusam o arquivo inteiro vêm sem linha.
+    """
+    
+    def __init__(self):
+        self._partes = []
+    
+    @staticmethod
+    def recusa(df, obrigatorias):
+        """Erro que recusa o arquivo inteiro (colunas ausentes, sem linhas ou grande demais), ou None"""
+        ausentes = [col for col in obrigatorias if col not in df.columns]
+        if ausentes:
+            motivo = f"Colunas ausentes: {', '.join(ausentes)}"
+        elif df.empty:
+            motivo = "Arquivo sem linhas"
+        elif len(df) > LIMITE_LINHAS_IMPORTACAO:
+            motivo = f"Mais de {LIMITE_LINHAS_IMPORTACAO} linhas"
+        else:
+            return None
+        return pd.DataFrame({"linha": [None], "coluna": [""], "erro": [motivo]})
+    
+    def reprovar(self, mascara, coluna, motivo):
+        """Registra o erro nas linhas marcadas (posições no DataFrame validado)"""
+        linhas = np.flatnonzero(np.asarray(mascara, dtype=bool))
+        self._partes.append(pd.DataFrame({"linha": linhas + 2, "coluna": coluna, "erro": motivo}))
+    
+    def concluir(self, n_linhas):
+        """(validas, erros): máscara das linhas sem nenhum erro e os erros ordenados"""
+        erros = pd.concat(self._partes, ignore_index=True).sort_values(["linha", "coluna"], kind="stable").reset_index(drop=True)
+        return ~np.isin(np.arange(n_linhas), erros["linha"] - 2), erros
+
+def validar_importacao(df, indice_placas, selecao_operacoes, df_atendimentos, nome_usuario):
+    """Valida todas as linhas de uma vez e monta os atendimentos a gravar
+    
+    Devolve (validas, erros): validas no formato do formulário de Registros;
+    erros com a linha do arquivo (contando o cabeçalho), a coluna e o motivo.
+    """
+    recusa = ErrosArquivo.recusa(df, [col for col in COLUNAS_IMPORTACAO if col not in COLUNAS_OPCIONAIS_IMPORTACAO])
+    if recusa is not None:
+        return pd.DataFrame(), recusa
+    df = df.reindex(columns=COLUNAS_IMPORTACAO, fill_value="").reset_index(drop=True)
+    erros = ErrosArquivo()
+    reprovar = erros.reprovar
+    
+    for col in COLUNAS_IMPORTACAO:
+        if col not in COLUNAS_OPCIONAIS_IMPORTACAO:
+            reprovar(df[col].eq(""), col, "Campo obrigatório vazio")
+    
+    # Placa e operação pelos índices já montados para a versão atual dos dados
+    posicao_veiculo = indice_placas.localizar(df["PLACA"])
+    reprovar(df["PLACA"].ne("") & (posicao_veiculo < 0), "PLACA", "Placa não cadastrada")
+    operacoes = selecao_operacoes.por_nome
+    posicao_operacao = operacoes.index.get_indexer(df["OPERACAO"]) if not operacoes.empty else np.full(len(df), -1)
+    reprovar(df["OPERACAO"].ne("") & (posicao_operacao < 0), "OPERACAO", "Operação não cadastrada")
+    metas = pd.to_numeric(operacoes["META"], errors="coerce").to_numpy() if "META" in operacoes.columns else np.full(len(operacoes), np.nan)
+    meta = np.where(posicao_operacao >= 0, metas[np.maximum(posicao_operacao, 0)] if len(metas) else np.nan, np.nan)
+    reprovar((posicao_operacao >= 0) & np.isnan(meta), "OPERACAO", "Operação sem META cadastrada")
+    
+    datas = {}
+    for col in ["DATA_ABORDAGEM", "DATA_INICIO", "DATA_FIM"]:
+        datas[col] = converter_data_importacao(df[col])
+        reprovar(df[col].ne("") & datas[col].isna(), col, "Data inválida (use dd/mm/aaaa)")
+    reprovar(datas["DATA_FIM"] < datas["DATA_INICIO"], "DATA_FIM", "Data fim anterior à data início")
+    
+    media = pd.to_numeric(df["MEDIA_ATENDIMENTO"].str.replace(",", ".", regex=False), errors="coerce")
+    reprovar(df["MEDIA_ATENDIMENTO"].ne("") & (media.isna() | (media < 0)), "MEDIA_ATENDIMENTO", "Número inválido")
+    
+    revisao, tacografo = df["REVISAO"].str.upper(), df["TACOGRAFO"].str.upper()
+    reprovar(revisao.ne("") & ~revisao.isin(OPCOES_REVISAO), "REVISAO", f"Use {' ou '.join(OPCOES_REVISAO)}")
+    reprovar(tacografo.ne("") & ~tacografo.isin(OPCOES_TACOGRAFO), "TACOGRAFO", f"Use {' ou '.join(OPCOES_TACOGRAFO)}")
+    
+    ids = pd.Series(ids_importacao(df), index=df.index)
+    if COLUNA_ID_REGISTRO in df_atendimentos.columns:
+        reprovar(ids.isin(df_atendimentos[COLUNA_ID_REGISTRO]), "", "Linha já importada anteriormente")
+    
+    validas, erros = erros.concluir(len(df))
+    veiculos = indice_placas.df.iloc[posicao_veiculo[validas]]
+    agora = pd.Timestamp.now().floor("s")
+    # Um segundo por linha, terminando agora: a chave (placa, lançamento, colaborador) não se repete no lote
+    lancamentos = agora - pd.to_timedelta(np.arange(int(validas.sum()))[::-1], unit="s")
+    agora = agora.strftime(FORMATO_DATA_HORA)
+    linhas = pd.DataFrame({
+        "MOTORISTA": df.loc[validas, "MOTORISTA"].to_numpy(),
+        "COLABORADOR": nome_usuario,
+        "DATA_ABORDAGEM": datas["DATA_ABORDAGEM"][validas].dt.strftime(FORMATO_DATA).to_numpy(),
+        "DATA_LANCAMENTO": lancamentos.strftime(FORMATO_DATA_HORA),
+        "PLACA": veiculos["PLACA"].astype(object).to_numpy(),
+        "MODELO": veiculos["MODELO"].astype(object).fillna("").to_numpy() if "MODELO" in veiculos.columns else "",
+        "REVISAO": revisao[validas].to_numpy(),
+        "TACOGRAFO": tacografo[validas].to_numpy(),
+        "OPERACAO": df.loc[validas, "OPERACAO"].to_numpy(),
+        "DATA_INICIO": datas["DATA_INICIO"][validas].dt.strftime(FORMATO_DATA).to_numpy(),
+        "DATA_FIM": datas["DATA_FIM"][validas].dt.strftime(FORMATO_DATA).to_numpy(),
+        "META": meta[validas],
+        "MEDIA_ATENDIMENTO": media[validas].round(2).to_numpy(),
+        "OBSERVACAO": df.loc[validas, "OBSERVACAO"].to_numpy(),
+        "DATA_MODIFICACAO": agora,
+        "MODIFICADO_POR": nome_usuario,
+        COLUNA_ID_REGISTRO: ids[validas].to_numpy()
+    })
+    return linhas, erros
+
+def modelo_importacao():
+    """CSV de exemplo com as colunas esperadas na importação"""
+    exemplo = pd.DataFrame([{
+        "PLACA": "ABC1D23", "MOTORISTA": "NOME DO MOTORISTA", "DATA_ABORDAGEM": datetime.now().strftime(FORMATO_DATA),
+        "REVISAO": OPCOES_REVISAO[0], "TACOGRAFO": OPCOES_TACOGRAFO[0], "OPERACAO": "NOME DA OPERAÇÃO",
+        "DATA_INICIO": datetime.now().strftime(FORMATO_DATA), "DATA_FIM": datetime.now().strftime(FORMATO_DATA),
+        "MEDIA_ATENDIMENTO": "2,50", "OBSERVACAO": ""
+    }], columns=COLUNAS_IMPORTACAO)
+    return exemplo.to_csv(index=False, sep=";").encode("utf-8-sig")
+
+# -------------------- CADASTRO DE VEÍCULOS --------------------
+COLUNAS_CADASTRO_VEICULOS = ["PLACA", "MARCA", "MODELO", "OPERAÇÃO", "PROPRIETÁRIO", "TIPO"]
+OBRIGATORIAS_VEICULO_NOVO = ["MARCA", "MODELO", "TIPO"]
+# Cabeçalhos sem acento também são aceitos no arquivo
+SINONIMOS_CADASTRO_VEICULOS = {"OPERACAO": "OPERAÇÃO", "PROPRIETARIO": "PROPRIETÁRIO"}
+PADRAO_PLACA = r'^[A-Z]{3}[0-9][A-Z0-9][0-9]{2}$'
+
+def cadastro_veiculos(df, indice_placas):
+    """Diferença entre os veículos enviados e a frota atual, pareados pela placa normalizada
+    
+    Campos vazios mantêm o valor cadastrado. Devolve (gravar, resumo, erros):
+    gravar traz só os veículos novos e os alterados, com todas as colunas da
+    aba; resumo conta novos, alterados e sem alteração; erros segue o formato
+    da importação de atendimentos.
+    """
+    df = df.rename(columns=SINONIMOS_CADASTRO_VEICULOS)
+    recusa = ErrosArquivo.recusa(df, ["PLACA"])
+    if recusa is not None:
+        return pd.DataFrame(), {"novos": 0, "alterados": 0, "sem_alteracao": 0}, recusa
+    df = df.reindex(columns=COLUNAS_CADASTRO_VEICULOS, fill_value="").fillna("").reset_index(drop=True)
+    erros = ErrosArquivo()
+    reprovar = erros.reprovar
+    
+    placas = df["PLACA"].str.upper().str.replace(r'[\s-]', '', regex=True)
+    reprovar(placas.eq(""), "PLACA", "Campo obrigatório vazio")
+    reprovar(placas.ne("") & ~placas.str.match(PADRAO_PLACA), "PLACA", "Placa inválida (use ABC1234 ou ABC1D23)")
+    reprovar(placas.ne("") & normalizar_placas(placas).duplicated(keep=False), "PLACA", "Placa repetida no arquivo")
+    posicao = indice_placas.localizar(placas)
+    novos = posicao < 0
+    for col in OBRIGATORIAS_VEICULO_NOVO:
+        reprovar(novos & placas.ne("") & df[col].eq(""), col, "Obrigatório para veículo novo")
+    
+    validas, erros = erros.concluir(len(df))
+    campos = COLUNAS_CADASTRO_VEICULOS[1:]
+    colunas = list(dict.fromkeys(list(indice_placas.df.columns) + COLUNAS_CADASTRO_VEICULOS + ["DATA_CADASTRO"]))
+    
+    # Veículos já cadastrados: a linha atual (placa como gravada, data de cadastro) com os campos preenchidos
+    existentes = validas & ~novos
+    atuais = indice_placas.df.iloc[posicao[existentes]].reindex(columns=colunas).reset_index(drop=True)
+    atuais[campos] = atuais[campos].astype(object).fillna("")
+    enviados = df.loc[existentes, campos].reset_index(drop=True)
+    editados = atuais.copy()
+    editados[campos] = enviados.where(enviados.ne(""), atuais[campos])
+    alterados = (editados[campos].astype(str).apply(lambda coluna: coluna.str.strip()) != atuais[campos].astype(str).apply(lambda coluna: coluna.str.strip())).any(axis=1)
+    
+    cadastrar = validas & novos
+    novas_linhas = df.loc[cadastrar].assign(PLACA=placas[cadastrar], DATA_CADASTRO=pd.Timestamp(datetime.now().date()))
+    
+    gravar = pd.concat([editados[alterados], novas_linhas.reindex(columns=colunas, fill_value="")], ignore_index=True)
+    resumo = {"novos": int(cadastrar.sum()), "alterados": int(alterados.sum()), "sem_alteracao": int((~alterados).sum())}
+    return gravar, resumo, erros
+
+def modelo_cadastro_veiculos():
+    """CSV de exemplo com as colunas do cadastro de veículos"""
+    exemplo = pd.DataFrame([{
+        "PLACA": "ABC1D23", "MARCA": "MARCA", "MODELO": "MODELO", "OPERAÇÃO": "NOME DA OPERAÇÃO",
+        "PROPRIETÁRIO": "PROPRIETÁRIO", "TIPO": "URBANO"
+    }], columns=COLUNAS_CADASTRO_VEICULOS)
+    return exemplo.to_csv(index=False, sep=";").encode("utf-8-sig")
+
+# -------------------- GRÁFICOS --------------------
+@st.cache_resource(show_spinner=False)
+def obter_cache_graficos(identificador):
+    """Cache de figuras compartilhado por todas as sessões"""
+    return CacheLRU(LIMITE_GRAFICOS_CACHE)
+
+def figura_em_cache(armazenamento, nome, abas, parametros, construir):
+    """Figura Plotly construída uma vez por (gráfico, versão das abas, parâmetros)
+    
+    Guarda a própria Figure, já validada: o st.plotly_chart só a converte
+    para dicionário, o que custa bem menos que montar de novo pelo plotly
+    express ou revalidar uma especificação em JSON. A figura é compartilhada
+    entre as sessões e não deve ser alterada depois de construída.
+    """
+    cache_abas = obter_cache_abas(armazenamento.identificador)
+    chave = (nome, tuple(cache_abas.versao(aba_nome) for aba_nome in abas), parametros)
+    return obter_cache_graficos(armazenamento.identificador).obter(chave, construir)
+
+# -------------------- INICIALIZAÇÃO RÁPIDA --------------------
+def armazenamento_configurado():
+    """Backend escolhido por ABORDAGENS_BACKEND (None sem credenciais do Google)"""
+    destino = CAMINHO_SQLITE if BACKEND_ARMAZENAMENTO == "sqlite" else SHEET_ID
+    return obter_armazenamento(BACKEND_ARMAZENAMENTO, destino)
+
+def aquecer_cache():
+    """Dispara a carga das abas em segundo plano, sem esperar por ela
+    
+    Chamado na partida do servidor (servidor.py) e, com `streamlit run
+    DeepLearning.py`, no início do script, antes do login. A primeira sessão
+    encontra a carga pronta ou em andamento e espera por ela em vez de
+    começar outra.
+    """
+    armazenamento = armazenamento_configurado()
+    if armazenamento:
+        obter_atualizador(armazenamento)
+
+def inicializar_sistema():
+    """Inicializa o sistema de forma ultra rápida"""
+    armazenamento = armazenamento_configurado()
+    if not armazenamento:
+        st.stop()
+    
+    # Carrega dados com loading otimizado
+    with st.spinner("⚡ Carregando dados..."):
+        todas_abas = carregar_dados_otimizado(armazenamento)
+    
+    return armazenamento, todas_abas
+
+# Custo de importar este módulo (parte da partida do processo), visto no painel de desempenho
+obter_metricas().registrar_span("importar.dados", time.perf_counter() - INICIO_IMPORTACAO)
@@ -0,0 +1,33 @@
+"""Páginas do sistema, importadas sob demanda
+
+Cada módulo expõe renderizar(armazenamento, todas_abas, nome_usuario). O
+script principal importa só a página escolhida no menu, então bibliotecas
+usadas por uma única página (como o plotly no Dashboard) não pesam nas demais.
+"""
+import importlib
+import sys
+
+from dados import medir
+
+# Rótulo no menu → módulo da página
+PAGINAS = {
+    "📊 Dashboard": "dashboard",
+    "🏢 Operações": "operacoes",
+    "📝 Registros": "registros",
+    "📋 Histórico": "historico",
+    "🚗 Veículos": "veiculos"
+}
+
+def carregar_pagina(modulo):
+    """Módulo da página, importado (e cronometrado) na primeira vez em que é aberta"""
+    nome = f"{__name__}.{modulo}"
+    if nome not in sys.modules:
+        with medir(f"importar.{nome}"):
+            importlib.import_module(nome)
+    return sys.modules[nome]
+
+def renderizar_pagina(rotulo, armazenamento, todas_abas, nome_usuario):
+    modulo = PAGINAS[rotulo]
+    pagina = carregar_pagina(modulo)
+    with medir(f"pagina.{modulo}"):
+        pagina.renderizar(armazenamento, todas_abas, nome_usuario)
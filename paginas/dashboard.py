@@ -0,0 +1,249 @@
+"""Página Dashboard: indicadores do dia e gráficos por operação titular e colaborador"""
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+from datetime import datetime
+
+from dados import (
+    LIMITE_CATEGORIAS_GRAFICO, figura_em_cache, medir, obter_agregados_atendimentos,
+    obter_atendimentos_enriquecidos, obter_cubo_atendimentos
+)
+
+LIMITE_FATIAS_PIZZA = 10  # Operações titulares na pizza (e nas barras ao lado); o resto vira "Outros"
+PERIODOS_TENDENCIA = {"semana": "Semanal", "mes": "Mensal", "dia": "Diário"}
+PERIODO_ATUAL = {"semana": "nesta semana", "mes": "neste mês", "dia": "hoje"}
+DETALHES_TENDENCIA = {
+    None: "Total",
+    "titular": "Operação titular",
+    "operacao": "Operação",
+    "colaborador": "Colaborador",
+    "revisao": "Revisão",
+    "tacografo": "Tacógrafo"
+}
+
+# -------------------- GRÁFICOS --------------------
+def grafico_titular_pizza(agregados):
+    operacao_count = agregados.principais("titular", LIMITE_FATIAS_PIZZA)["quantidade"]
+    with medir("grafico.titular_pizza"):
+        return px.pie(
+            values=operacao_count.values, 
+            names=operacao_count.index, 
+            title="📊 Atendimentos por Operação Titular",
+            color_discrete_sequence=px.colors.sequential.YlOrRd
+        )
+
+def grafico_titular_barras(agregados):
+    operacao_count_bar = agregados.principais("titular", LIMITE_FATIAS_PIZZA)["quantidade"].sort_values(ascending=False, kind="stable")
+    with medir("grafico.titular_barras"):
+        fig_bar = px.bar(
+            x=operacao_count_bar.index,
+            y=operacao_count_bar.values,
+            title="📈 Quantidade de Atendimentos por Operação Titular",
+            labels={'x': 'Operação Titular', 'y': 'Quantidade de Atendimentos'},
+            color=operacao_count_bar.values,
+            color_continuous_scale="ylorrd"
+        )
+        fig_bar.update_layout(xaxis_tickangle=-45)
+    return fig_bar
+
+def grafico_media_titular(agregados):
+    media_por_operacao = (
+        agregados.principais("titular", LIMITE_CATEGORIAS_GRAFICO)["media"].round(2)
+        .rename_axis('OPERAÇÃO TITULAR').reset_index(name='MEDIA_ATENDIMENTO')
+    )
+    with medir("grafico.media_titular"):
+        fig = px.bar(
+            media_por_operacao, 
+            x='OPERAÇÃO TITULAR', 
+            y='MEDIA_ATENDIMENTO',
+            title="Média de Atendimento por Operação Titular",
+            color='MEDIA_ATENDIMENTO',
+            color_continuous_scale="ylorrd"
+        )
+        fig.update_layout(yaxis_tickformat=".2f", xaxis_tickangle=-45)
+    return fig
+
+def grafico_colaborador(agregados):
+    colaborador_count = agregados.principais("colaborador", LIMITE_CATEGORIAS_GRAFICO)["quantidade"].sort_values(ascending=False, kind="stable")
+    with medir("grafico.colaborador"):
+        fig_colab = px.bar(
+            x=colaborador_count.index,
+            y=colaborador_count.values,
+            title="Quantidade de Registros por Colaborador",
+            labels={'x': 'Colaborador', 'y': 'Quantidade de Registros'},
+            color=colaborador_count.values,
+            color_continuous_scale="ylorrd"
+        )
+        fig_colab.update_layout(xaxis_tickangle=-45)
+    return fig_colab
+
+def grafico_tendencia(tendencia, detalhe):
+    with medir("grafico.tendencia"):
+        fig = px.line(
+            tendencia,
+            x="periodo",
+            y="quantidade",
+            color=detalhe,
+            markers=True,
+            title="Atendimentos por Período",
+            labels={"periodo": "Período", "quantidade": "Atendimentos", **({detalhe: DETALHES_TENDENCIA[detalhe]} if detalhe else {})},
+            color_discrete_sequence=px.colors.sequential.YlOrRd[2:]
+        )
+    return fig
+
+def secao_tendencias(armazenamento):
+    """Indicadores do período com variação e evolução a partir do cubo de atendimentos"""
+    st.subheader("📆 Tendências")
+    cubo = obter_cubo_atendimentos(armazenamento)
+    
+    col_periodo, col_titular, col_detalhe = st.columns(3)
+    with col_periodo:
+        granularidade = st.selectbox("Período", list(PERIODOS_TENDENCIA), format_func=PERIODOS_TENDENCIA.get, key="tendencia_periodo")
+    with col_titular:
+        # Drill-down: escolher um titular recorta o cubo antes de agrupar
+        titular = st.selectbox("Operação titular", [None] + cubo.valores("titular"),
+                               format_func=lambda valor: "Todas" if valor is None else valor, key="tendencia_titular")
+    with col_detalhe:
+        detalhe = st.selectbox("Detalhar por", list(DETALHES_TENDENCIA), format_func=DETALHES_TENDENCIA.get, key="tendencia_detalhe")
+    filtros = {"titular": titular} if titular is not None else None
+    
+    # Período atual (até agora) comparado ao anterior
+    atual, anterior = cubo.comparar_periodos(granularidade, datetime.now(), filtros)
+    col1, col2, col3 = st.columns(3)
+    
+    def variacao(chave, formato):
+        if pd.isna(atual[chave]) or pd.isna(anterior[chave]):
+            return None
+        return formato.format(atual[chave] - anterior[chave])
+    
+    with col1:
+        st.metric(f"📋 Atendimentos {PERIODO_ATUAL[granularidade]}", atual["quantidade"],
+                  delta=atual["quantidade"] - anterior["quantidade"], help="Comparado ao período anterior inteiro")
+    with col2:
+        st.metric("⭐ Média no período", "—" if pd.isna(atual["media"]) else f"{atual['media']:.2f}",
+                  delta=variacao("media", "{:+.2f}"))
+    with col3:
+        st.metric("🎯 Na meta", "—" if pd.isna(atual["percentual_meta"]) else f"{atual['percentual_meta']:.0f}%",
+                  delta=variacao("percentual_meta", "{:+.0f} p.p."), help="Atendimentos com MÉDIA ATENDIMENTO ≥ META")
+    
+    dimensoes = (detalhe,) if detalhe else ()
+    tendencia = cubo.consultar(granularidade, dimensoes, filtros, limite=LIMITE_CATEGORIAS_GRAFICO)
+    if tendencia.empty:
+        st.info("Nenhum atendimento com data de abordagem para o recorte escolhido.")
+        return
+    
+    fig = figura_em_cache(armazenamento, "tendencia", ["atendimentos", "operacoes"], (granularidade, titular, detalhe),
+                          lambda: grafico_tendencia(tendencia, detalhe))
+    st.plotly_chart(fig, use_container_width=True)
+    
+    with st.expander("🔢 Números por período"):
+        tabela = tendencia.drop(columns=["soma", "validos"]).sort_values("periodo", ascending=False, kind="stable")
+        st.dataframe(
+            tabela.round({"media": 2, "percentual_meta": 1}),
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                "periodo": st.column_config.DateColumn("Período", format="DD/MM/YYYY"),
+                "quantidade": "Atendimentos",
+                "media": "Média",
+                "percentual_meta": st.column_config.NumberColumn("% na meta", format="%.1f%%"),
+                **({detalhe: DETALHES_TENDENCIA[detalhe]} if detalhe else {})
+            }
+        )
+
+# -------------------- PÁGINA --------------------
+def renderizar(armazenamento, todas_abas, nome_usuario):
+    """Indicadores e gráficos a partir dos agregados da versão atual dos dados"""
+    df_operacoes = todas_abas.get("operacoes", pd.DataFrame())
+    df_veiculos = todas_abas.get("veiculos", pd.DataFrame())
+    df_atendimentos = obter_atendimentos_enriquecidos(armazenamento)
+    
+    # Header com título e logo
+    col_title, col_logo = st.columns([3, 1])
+    with col_title:
+        st.markdown('<h1 class="main-header">Gestão de Abordados Telemetria</h1>', unsafe_allow_html=True)
+    with col_logo:
+        # Imagem no canto superior direito
+        st.markdown("""
+        <div style="text-align: right;">
+            <img src="https://cdn-icons-png.flaticon.com/512/1006/1006555.png" class="logo-img" alt="Logo">
+        </div>
+        """, unsafe_allow_html=True)
+    
+    # Agregados pré-calculados por versão dos dados
+    agregados = obter_agregados_atendimentos(armazenamento)
+    
+    # Lançamentos do dia
+    st.subheader("📈 Lançamentos do Dia")
+    hoje = datetime.now().date()
+    lancamentos_hoje = agregados.quantidade_no_dia("dia_lancamento", hoje)
+    
+    col1, col2, col3, col4, col5 = st.columns(5)
+    
+    with col1:
+        st.metric("🚗 Total de Veículos", len(df_veiculos), help="Veículos cadastrados no sistema")
+    
+    with col2:
+        st.metric("📋 Total de Atendimentos", len(df_atendimentos), help="Total de abordagens realizadas")
+    
+    with col3:
+        st.metric("🏢 Operações Ativas", len(df_operacoes), help="Operações cadastradas")
+    
+    with col4:
+        if not df_atendimentos.empty and 'MEDIA_ATENDIMENTO' in df_atendimentos.columns:
+            media_geral = agregados.media_geral()
+            media_formatada = f"{media_geral:.2f}" if not pd.isna(media_geral) else "0.00"
+            st.metric("⭐ Média Geral", media_formatada, help="Média geral de atendimentos")
+        else:
+            st.metric("⭐ Média Geral", "0.00")
+    
+    with col5:
+        st.metric("📅 Lançamentos Hoje", lancamentos_hoje, help="Atendimentos registrados hoje")
+    
+    # Gráficos otimizados - usando OPERAÇÃO TITULAR
+    # Cada figura é montada uma vez por versão dos dados e reaproveitada por todas as sessões
+    abas_graficos = ["atendimentos", "operacoes"]
+    if not df_atendimentos.empty and 'OPERAÇÃO TITULAR' in df_atendimentos.columns and df_atendimentos['OPERAÇÃO TITULAR'].notna().any():
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            # Gráfico de pizza - Atendimentos por operação titular
+            fig = figura_em_cache(armazenamento, "titular_pizza", abas_graficos, LIMITE_FATIAS_PIZZA,
+                                  lambda: grafico_titular_pizza(agregados))
+            st.plotly_chart(fig, use_container_width=True)
+        
+        with col2:
+            # Gráfico de barras - Quantidade de atendimentos por operação titular
+            fig_bar = figura_em_cache(armazenamento, "titular_barras", abas_graficos, LIMITE_FATIAS_PIZZA,
+                                      lambda: grafico_titular_barras(agregados))
+            st.plotly_chart(fig_bar, use_container_width=True)
+        
+        # Gráfico de média por operação titular
+        st.subheader("📈 Média de Atendimento por Operação Titular")
+        fig = figura_em_cache(armazenamento, "media_titular", abas_graficos, LIMITE_CATEGORIAS_GRAFICO,
+                              lambda: grafico_media_titular(agregados))
+        st.plotly_chart(fig, use_container_width=True)
+    
+    # Gráfico de registros por colaborador
+    if not df_atendimentos.empty and 'COLABORADOR' in df_atendimentos.columns:
+        st.subheader("📊 Registros por Colaborador")
+        fig_colab = figura_em_cache(armazenamento, "colaborador", abas_graficos, LIMITE_CATEGORIAS_GRAFICO,
+                                    lambda: grafico_colaborador(agregados))
+        st.plotly_chart(fig_colab, use_container_width=True)
+    
+    # Tendências por dia/semana/mês
+    if not df_atendimentos.empty:
+        secao_tendencias(armazenamento)
+    
+    # Últimos registros
+    st.subheader("📋 Últimos Atendimentos")
+    if not df_atendimentos.empty:
+        ultimos_atendimentos = df_atendimentos.tail(5)
+        if 'MEDIA_ATENDIMENTO' in ultimos_atendimentos.columns:
+            ultimos_atendimentos['MEDIA_ATENDIMENTO'] = ultimos_atendimentos['MEDIA_ATENDIMENTO'].round(2)
+        
+        st.dataframe(ultimos_atendimentos[[
+            'PLACA', 'MOTORISTA', 'DATA_ABORDAGEM', 'OPERACAO', 'MEDIA_ATENDIMENTO'
+        ]], use_container_width=True)
+    else:
+        st.info("Nenhum atendimento registrado ainda.")
@@ -0,0 +1,213 @@
+"""Página Histórico: indicadores, filtros, paginação, exportação e exclusão de atendimentos"""
+import streamlit as st
+import pandas as pd
+from datetime import datetime
+
+from dados import (
+    SENHA_ADMIN, botao_exportacao, enviar_gravacao, obter_agregados_atendimentos,
+    obter_atendimentos_enriquecidos, obter_indice_historico, paginar
+)
+
+# -------------------- COMPONENTES --------------------
+def criar_filtros_avancados(indice_historico, df_operacoes):
+    """Cria interface de filtros avançados (opções lidas do índice do histórico)"""
+    df_atendimentos = indice_historico.df
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        # Filtro de data
+        if not df_atendimentos.empty and 'DATA_ABORDAGEM' in df_atendimentos.columns:
+            periodo = indice_historico.periodo()
+            if periodo is not None:
+                min_date, max_date = periodo
+                data_range = st.date_input(
+                    "📅 Período",
+                    value=(),
+                    min_value=min_date,
+                    max_value=max_date,
+                    key="filtro_data"
+                )
+    
+    with col2:
+        # Filtro de operação titular
+        if not df_atendimentos.empty and 'OPERAÇÃO TITULAR' in df_atendimentos.columns and not df_operacoes.empty:
+            # OPERAÇÃO TITULAR já vem da visão enriquecida dos atendimentos
+            operacoes_titulares = indice_historico.valores("titular")
+            operacao_filtro = st.multiselect(
+                "👑 Operação Titular",
+                options=operacoes_titulares,
+                default=[],
+                key="filtro_operacao_titular"
+            )
+    
+    with col3:
+        # Filtro de status de revisão
+        if not df_atendimentos.empty and 'REVISAO' in df_atendimentos.columns:
+            status_options = indice_historico.valores("status")
+            status_filtro = st.multiselect(
+                "🔧 Status Revisão",
+                options=status_options,
+                default=[],
+                key="filtro_status"
+            )
+    
+    return {
+        'data_range': data_range if 'data_range' in locals() else None,
+        'operacao_filtro': operacao_filtro,
+        'status_filtro': status_filtro
+    }
+
+# -------------------- PÁGINA --------------------
+def renderizar(armazenamento, todas_abas, nome_usuario):
+    """Histórico filtrado pelo índice por data/categoria, paginado no servidor"""
+    df_operacoes = todas_abas.get("operacoes", pd.DataFrame())
+    df_atendimentos = obter_atendimentos_enriquecidos(armazenamento)
+    
+    st.markdown('<h1 class="main-header">Histórico de Atendimentos</h1>', unsafe_allow_html=True)
+    
+    # Indicadores de histórico
+    if not df_atendimentos.empty:
+        agregados = obter_agregados_atendimentos(armazenamento)
+        col1, col2, col3, col4 = st.columns(4)
+        
+        with col1:
+            st.markdown(f"""
+            <div class="card-indicador">
+                <h3>📋 Total</h3>
+                <h2>{len(df_atendimentos)}</h2>
+            </div>
+            """, unsafe_allow_html=True)
+        
+        with col2:
+            hoje = datetime.now().date()
+            hoje_count = agregados.quantidade_no_dia("dia_abordagem", hoje)
+            st.markdown(f"""
+            <div class="card-indicador">
+                <h3>📅 Hoje</h3>
+                <h2>{hoje_count}</h2>
+            </div>
+            """, unsafe_allow_html=True)
+        
+        with col3:
+            media_geral = agregados.media_geral()
+            media_formatada = f"{media_geral:.2f}" if not pd.isna(media_geral) else "0.00"
+            st.markdown(f"""
+            <div class="card-indicador">
+                <h3>⭐ Média</h3>
+                <h2>{media_formatada}</h2>
+            </div>
+            """, unsafe_allow_html=True)
+        
+        with col4:
+            em_dia = int(agregados.contagem("revisao").get('REVISÃO EM DIA', 0))
+            st.markdown(f"""
+            <div class="card-indicador">
+                <h3>✅ Em dia</h3>
+                <h2>{em_dia}</h2>
+            </div>
+            """, unsafe_allow_html=True)
+    
+    # Filtros avançados
+    st.subheader("🔍 Filtros")
+    indice_historico = obter_indice_historico(armazenamento)
+    filtros = criar_filtros_avancados(indice_historico, df_operacoes)
+    
+    # Aplicar filtros: período por busca binária, titular/status pelas listas de posições
+    data_inicio = data_fim = None
+    if filtros['data_range'] and len(filtros['data_range']) == 2:
+        data_inicio, data_fim = filtros['data_range']
+    df_filtrado = indice_historico.filtrar(
+        data_inicio, data_fim,
+        titular=filtros['operacao_filtro'],
+        status=filtros['status_filtro']
+    )
+    
+    # Botão de exportação: exporta o resultado dos filtros ativos
+    if not df_filtrado.empty:
+        botao_exportacao(
+            armazenamento, "historico_atendimentos", df_filtrado, ["atendimentos", "operacoes"],
+            filtros=(data_inicio, data_fim, tuple(filtros['operacao_filtro']), tuple(filtros['status_filtro']))
+        )
+    
+    # Exibir histórico filtrado
+    st.subheader("📊 Histórico de Atendimentos")
+    if not df_filtrado.empty:
+        colunas_historico = [
+            'PLACA', 'MOTORISTA', 'DATA_ABORDAGEM', 'OPERACAO', 
+            'OPERAÇÃO TITULAR', 'MEDIA_ATENDIMENTO', 'META', 'REVISAO', 'COLABORADOR'
+        ]
+        
+        # Ordenação e paginação feitas aqui: só a página atual vai para o navegador
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            coluna_ordem = st.selectbox(
+                "Ordenar por", colunas_historico,
+                index=colunas_historico.index('DATA_ABORDAGEM'), key="historico_ordem"
+            )
+        with col2:
+            crescente = st.selectbox("Ordem", ["Decrescente", "Crescente"], key="historico_sentido") == "Crescente"
+        with col3:
+            tamanho_pagina = st.selectbox("Linhas por página", [25, 50, 100, 200], key="historico_tamanho")
+        total_paginas = max(1, -(-len(df_filtrado) // tamanho_pagina))
+        # Filtros mais restritivos podem deixar a página escolhida além da última
+        if st.session_state.get("historico_pagina", 1) > total_paginas:
+            st.session_state["historico_pagina"] = total_paginas
+        with col4:
+            pagina = st.number_input("Página", min_value=1, max_value=total_paginas, step=1, key="historico_pagina")
+        
+        inicio = (int(pagina) - 1) * tamanho_pagina
+        df_pagina = paginar(df_filtrado, coluna_ordem, crescente, inicio, tamanho_pagina)
+        st.caption(f"Mostrando {inicio + 1}–{inicio + len(df_pagina)} de {len(df_filtrado)} atendimentos")
+        
+        # Formatar colunas numéricas
+        df_display = df_pagina
+        if 'MEDIA_ATENDIMENTO' in df_display.columns:
+            df_display['MEDIA_ATENDIMENTO'] = df_display['MEDIA_ATENDIMENTO'].round(2)
+        if 'META' in df_display.columns:
+            df_display['META'] = df_display['META'].round(2)
+        
+        # Exibir dados
+        st.dataframe(
+            df_display[colunas_historico],
+            use_container_width=True,
+            height=400
+        )
+    else:
+        st.info("Nenhum atendimento encontrado com os filtros aplicados.")
+    
+    # Controles de exclusão: busca pela chave (placa e, opcionalmente, data)
+    if not df_atendimentos.empty:
+        st.subheader("🗑️ Excluir Atendimento")
+        col1, col2 = st.columns(2)
+        with col1:
+            placa_excluir = st.text_input("Placa do atendimento", key="excluir_placa")
+        with col2:
+            dia_excluir = st.date_input("Data da abordagem (opcional)", value=None, key="excluir_data")
+        
+        if placa_excluir:
+            encontrados = indice_historico.buscar_placa(placa_excluir, dia_excluir)
+            if encontrados.empty:
+                st.info("Nenhum atendimento encontrado para essa placa.")
+            else:
+                # Rótulos só para os atendimentos encontrados; a opção é o próprio índice da linha
+                rotulos = {
+                    idx: f"{row['PLACA']} - {row['DATA_ABORDAGEM']} - {row['OPERACAO']} - {row['COLABORADOR']}"
+                    for idx, row in encontrados.iterrows()
+                }
+                original_idx = st.selectbox(
+                    "Selecione o atendimento para excluir:",
+                    options=list(rotulos),
+                    format_func=rotulos.get,
+                    key="atendimento_excluir_select"
+                )
+                
+                senha_exclusao = st.text_input("🔒 Digite a senha de administração para excluir:", type="password", key="senha_exclusao_atendimento")
+                
+                if st.button("🗑️ Confirmar Exclusão", use_container_width=True, disabled=not senha_exclusao):
+                    if senha_exclusao == SENHA_ADMIN:
+                        # Exclui só a linha escolhida (localizada pela chave), sem regravar a aba
+                        atendimento = indice_historico.df.loc[[original_idx]].drop(columns=['OPERAÇÃO TITULAR'], errors='ignore')
+                        enviar_gravacao(armazenamento, "atendimentos", atendimento, "excluir", "Atendimento excluído com sucesso!")
+                        st.rerun()
+                    else:
+                        st.error("❌ Senha incorreta. Não é possível excluir.")
@@ -0,0 +1,92 @@
+"""Página Operações: cadastro, exportação e exclusão de operações"""
+import streamlit as st
+import pandas as pd
+from datetime import datetime
+
+from dados import SENHA_ADMIN, botao_exportacao, enviar_gravacao
+
+def renderizar(armazenamento, todas_abas, nome_usuario):
+    """Cadastro e exclusão de operações (protegidos pela senha de administração)"""
+    df_operacoes = todas_abas.get("operacoes", pd.DataFrame())
+    
+    st.markdown('<h1 class="main-header">Gestão de Operações</h1>', unsafe_allow_html=True)
+    
+    # Verificação de senha para modificações
+    senha = st.text_input("🔒 Senha de Administração", type="password", key="senha_operacoes")
+    acesso_permitido = senha == SENHA_ADMIN
+    
+    if not acesso_permitido and senha:
+        st.error("❌ Senha incorreta. Acesso não autorizado.")
+    
+    col1, col2 = st.columns([1, 2])
+    
+    with col1:
+        st.subheader("➕ Adicionar Nova Operação")
+        
+        with st.form("nova_operacao", clear_on_submit=True):
+            operacao = st.text_input("🏢 OPERAÇÃO", key="operacao_input", disabled=not acesso_permitido)
+            operacao_titular = st.text_input("👑 OPERAÇÃO TITULAR", key="operacao_titular_input", disabled=not acesso_permitido)
+            marca = st.text_input("🏭 MARCA", key="marca_operacao_input", disabled=not acesso_permitido)
+            modelo = st.text_input("🔧 MODELO", key="modelo_operacao_input", disabled=not acesso_permitido)
+            tipo = st.text_input("📋 TIPO", key="tipo_operacao_input", disabled=not acesso_permitido)
+            meta = st.number_input("🎯 META", min_value=0.0, format="%.2f", key="meta_input", disabled=not acesso_permitido)
+            
+            submitted = st.form_submit_button("✅ Adicionar Operação", use_container_width=True, disabled=not acesso_permitido)
+            
+            if submitted and acesso_permitido:
+                nova_operacao = pd.DataFrame({
+                    'OPERAÇÃO': [operacao],
+                    'OPERAÇÃO TITULAR': [operacao_titular],
+                    'MARCA': [marca],
+                    'MODELO': [modelo],
+                    'TIPO': [tipo],
+                    'META': [meta],
+                    'DATA_CRIACAO': [datetime.now().strftime("%d/%m/%Y %H:%M:%S")],
+                    'CRIADO_POR': [nome_usuario]
+                })
+                
+                # Só a linha nova vai para a fila; a confirmação aparece após o rerun
+                enviar_gravacao(armazenamento, "operacoes", nova_operacao, "anexar", f"Operação {operacao} adicionada com sucesso!")
+                st.rerun()
+            elif submitted and not acesso_permitido:
+                st.error("❌ Acesso não autorizado. Digite a senha correta.")
+    
+    with col2:
+        st.subheader("📋 Operações Cadastradas")
+        
+        # Botão de exportação (arquivo gerado só no clique)
+        if not df_operacoes.empty:
+            botao_exportacao(armazenamento, "operacoes", df_operacoes, ["operacoes"])
+        
+        if not df_operacoes.empty:
+            # Formatar META com 2 casas decimais (visão sem cópia dos dados: copy-on-write)
+            df_display = df_operacoes.copy(deep=False)
+            if 'META' in df_display.columns:
+                df_display['META'] = df_display['META'].round(2)
+            
+            # Exibir tabela
+            st.dataframe(
+                df_display[['OPERAÇÃO', 'OPERAÇÃO TITULAR', 'MARCA', 'MODELO', 'TIPO', 'META', 'DATA_CRIACAO']],
+                use_container_width=True,
+                height=400
+            )
+            
+            # Controles de exclusão
+            st.subheader("🗑️ Excluir Operação")
+            operacao_excluir = st.selectbox(
+                "Selecione a operação para excluir:",
+                options=df_operacoes['OPERAÇÃO'].tolist(),
+                key="operacao_excluir_select"
+            )
+            
+            senha_exclusao = st.text_input("🔒 Digite a senha de administração para excluir:", type="password", key="senha_exclusao_operacao")
+            
+            if st.button("🗑️ Confirmar Exclusão", use_container_width=True, disabled=not senha_exclusao):
+                if senha_exclusao == SENHA_ADMIN:
+                    operacao = df_operacoes[df_operacoes['OPERAÇÃO'] == operacao_excluir]
+                    enviar_gravacao(armazenamento, "operacoes", operacao, "excluir", f"Operação {operacao_excluir} excluída com sucesso!")
+                    st.rerun()
+                else:
+                    st.error("❌ Senha incorreta. Não é possível excluir.")
+        else:
+            st.info("Nenhuma operação cadastrada ainda.")
@@ -0,0 +1,287 @@
+"""Página Registros: lançamento de um atendimento (placa, abordagem e operação) ou de um arquivo de atendimentos
+
+Cada bloco do formulário é um fragmento: interagir com ele reexecuta só o
+próprio bloco, e não a página inteira. Os blocos conversam pelo
+session_state (os valores dos campos ficam nas chaves dos widgets), e o
+envio lê tudo de lá.
+"""
+import streamlit as st
+import pandas as pd
+from datetime import datetime, timedelta
+import uuid
+
+from dados import (
+    OPCOES_REVISAO, OPCOES_TACOGRAFO, enviar_gravacao, ler_arquivo_importacao, medir, modelo_importacao,
+    obter_atendimentos_enriquecidos, obter_indice_placas, obter_selecao_operacoes, validar_importacao
+)
+
+# -------------------- FRAGMENTOS --------------------
+@st.fragment
+def campos_veiculo(armazenamento):
+    """Placa validada pelo índice de placas a cada tecla, e motorista"""
+    with medir("fragmento.registros.veiculo"):
+        st.subheader("🚗 Informações do Veículo")
+        
+        # Campo de placa com validação
+        placa_digitada = st.text_input("🔢 DIGITE A PLACA", value=st.session_state.placa_digitada,
+                                     placeholder="Ex: ABC1234", key="placa_input")
+        
+        # Validação da placa
+        if placa_digitada:
+            st.session_state.placa_digitada = placa_digitada
+            veiculo_info = obter_indice_placas(armazenamento).veiculo(placa_digitada)
+            
+            if veiculo_info is not None:
+                st.success(f"✅ Placa encontrada: {veiculo_info['PLACA']}")
+            else:
+                st.error("❌ Placa não encontrada. Verifique o cadastro do veículo.")
+        
+        # Campo de motorista livre
+        st.text_input("👤 MOTORISTA", placeholder="Digite o nome do motorista", key="motorista_input")
+
+@st.fragment
+def campos_abordagem():
+    st.subheader("📋 Informações da Abordagem")
+    st.date_input("📅 DATA DE ABORDAGEM", value=datetime.today(), key="data_abordagem")
+    st.selectbox("🔧 REVISÃO", options=OPCOES_REVISAO, key="revisao_select")
+    st.selectbox("📊 TACÓGRAFO", options=OPCOES_TACOGRAFO, key="tacografo_select")
+
+@st.fragment
+def campos_periodo():
+    st.subheader("⏰ Período do Atendimento")
+    st.date_input("📅 DATA INÍCIO", value=datetime.today(), key="data_inicio")
+    st.date_input("📅 DATA FIM", value=datetime.today() + timedelta(days=7), key="data_fim")
+    
+    # Média de atendimento
+    st.number_input("⭐ MÉDIA ATENDIMENTO", min_value=0.0, format="%.2f", key="media_atendimento")
+    
+    # Observação
+    st.text_area("📝 OBSERVAÇÃO", placeholder="Digite observações relevantes sobre o atendimento...",
+               height=100, key="observacao_text")
+
+@st.fragment
+def seletor_operacao(armazenamento):
+    """Pesquisa e tabela de operações; a tabela base vem pronta do cache"""
+    with medir("fragmento.registros.operacao"):
+        st.subheader("🏢 Seleção de Operação")
+        
+        # Barra de pesquisa para operação titular
+        pesquisa_operacao = st.text_input("🔍 Pesquisar por Operação Titular:",
+                                        placeholder="Digite o nome da operação titular",
+                                        key="pesquisa_operacao")
+        
+        selecao = obter_selecao_operacoes(armazenamento)
+        
+        # Tabela de operações para seleção
+        st.markdown("**📋 Selecione uma operação:**")
+        
+        # Criar interface de seleção
+        edited_df = st.data_editor(
+            selecao.filtrar(pesquisa_operacao),
+            hide_index=True,
+            use_container_width=True,
+            height=200,
+            column_config={
+                "SELECIONAR": st.column_config.CheckboxColumn(
+                    "Selecionar",
+                    help="Selecione a operação",
+                    default=False,
+                    width="small"
+                ),
+                "ID": st.column_config.NumberColumn(
+                    "ID",
+                    help="Identificador",
+                    width="small"
+                ),
+                "OPERAÇÃO": st.column_config.TextColumn(
+                    "Operação",
+                    width="medium"
+                ),
+                "OPERAÇÃO TITULAR": st.column_config.TextColumn(
+                    "Titular",
+                    width="medium"
+                ),
+                "MARCA": st.column_config.TextColumn(
+                    "Marca",
+                    width="small"
+                ),
+                "MODELO": st.column_config.TextColumn(
+                    "Modelo",
+                    width="small"
+                ),
+                "TIPO": st.column_config.TextColumn(
+                    "Tipo",
+                    width="small"
+                ),
+                "META": st.column_config.NumberColumn(
+                    "Meta",
+                    format="%.2f",
+                    width="small"
+                )
+            },
+            disabled=["ID", "OPERAÇÃO", "OPERAÇÃO TITULAR", "MARCA", "MODELO", "TIPO", "META"],
+            key="operacoes_table"
+        )
+        
+        # Primeira operação marcada na tabela, se houver
+        marcadas = edited_df.loc[edited_df['SELECIONAR'].fillna(False).astype(bool), 'OPERAÇÃO']
+        operacao_selecionada = marcadas.iloc[0] if not marcadas.empty else None
+        
+        if operacao_selecionada:
+            st.session_state.operacao_selecionada = operacao_selecionada
+            st.success(f"✅ Operação selecionada: {operacao_selecionada}")
+            
+            # Exibir informações da operação selecionada
+            operacao_info_selecionada = selecao.operacao(operacao_selecionada)
+            col_info1, col_info2, col_info3 = st.columns(3)
+            with col_info1:
+                st.text_input("👑 OPERAÇÃO TITULAR", value=operacao_info_selecionada.get("OPERAÇÃO TITULAR", ""), disabled=True)
+            with col_info2:
+                st.text_input("🎯 META", value=f"{operacao_info_selecionada.get('META', 0):.2f}", disabled=True)
+            with col_info3:
+                st.text_input("📋 TIPO", value=operacao_info_selecionada.get("TIPO", ""), disabled=True)
+        else:
+            st.warning("⚠️ Selecione uma operação na tabela acima")
+
+@st.fragment
+def area_envio(armazenamento, nome_usuario):
+    """Valida e enfileira o atendimento com os valores guardados pelos demais blocos"""
+    # Botão de envio
+    st.subheader("✅ Confirmar Atendimento")
+    enviar = st.button("🚀 ENVIAR ATENDIMENTO", type="primary", use_container_width=True)
+    
+    if not enviar:
+        return
+    
+    with medir("fragmento.registros.envio"):
+        estado = st.session_state
+        placa_digitada = estado.get("placa_input", "")
+        veiculo_info = obter_indice_placas(armazenamento).veiculo(placa_digitada) if placa_digitada else None
+        motorista = estado.get("motorista_input", "")
+        
+        # Validações antes do envio
+        if not placa_digitada or veiculo_info is None:
+            st.error("❌ Por favor, digite uma placa válida cadastrada no sistema.")
+            return
+        if not estado.operacao_selecionada:
+            st.error("❌ Por favor, selecione uma operação.")
+            return
+        if not motorista:
+            st.error("❌ Por favor, digite o nome do motorista.")
+            return
+        
+        # Buscar informações da operação selecionada
+        operacao_info = obter_selecao_operacoes(armazenamento).operacao(estado.operacao_selecionada)
+        agora = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+        
+        novo_atendimento = pd.DataFrame({
+            "MOTORISTA": [motorista],
+            "COLABORADOR": [nome_usuario],
+            "DATA_ABORDAGEM": [estado.data_abordagem.strftime("%d/%m/%Y")],
+            "DATA_LANCAMENTO": [agora],
+            "PLACA": [veiculo_info["PLACA"]],
+            "MODELO": [veiculo_info.get("MODELO", "")],
+            "REVISAO": [estado.revisao_select],
+            "TACOGRAFO": [estado.tacografo_select],
+            "OPERACAO": [estado.operacao_selecionada],
+            "DATA_INICIO": [estado.data_inicio.strftime("%d/%m/%Y")],
+            "DATA_FIM": [estado.data_fim.strftime("%d/%m/%Y")],
+            "META": [operacao_info.get("META", 0) if operacao_info is not None else 0],
+            "MEDIA_ATENDIMENTO": [round(estado.media_atendimento, 2)],
+            "OBSERVACAO": [estado.get("observacao_text", "")],
+            "DATA_MODIFICACAO": [agora],
+            "MODIFICADO_POR": [nome_usuario],
+            # Identifica o envio: novas tentativas da fila não duplicam a linha
+            "ID_REGISTRO": [uuid.uuid4().hex]
+        })
+        
+        enviar_gravacao(armazenamento, "atendimentos", novo_atendimento, "anexar", "Atendimento registrado com sucesso!")
+        
+        # Limpar campos após envio
+        estado.placa_digitada = ""
+        estado.operacao_selecionada = None
+    
+    # Execução completa: mostra a confirmação e atualiza as demais páginas
+    st.rerun()
+
+@st.fragment
+def importacao_lote(armazenamento, nome_usuario):
+    """Importação de um arquivo de atendimentos: valida tudo de uma vez e grava as linhas válidas num único envio"""
+    st.subheader("📥 Importar Atendimentos em Lote")
+    st.caption("CSV (separado por ; ou ,) ou Excel com uma linha por atendimento. "
+               "Datas em dd/mm/aaaa; colaborador, modelo e META são preenchidos automaticamente.")
+    st.download_button("📄 Baixar modelo (CSV)", data=modelo_importacao, file_name="modelo_importacao_atendimentos.csv",
+                       mime="text/csv", key="modelo_importacao")
+    
+    arquivo = st.file_uploader("Arquivo de atendimentos", type=["csv", "xlsx"], key="arquivo_importacao")
+    if arquivo is None:
+        return
+    
+    with medir("fragmento.registros.importacao"):
+        try:
+            df_arquivo = ler_arquivo_importacao(arquivo)
+        except Exception as e:
+            st.error(f"❌ Não foi possível ler o arquivo: {str(e)}")
+            return
+        validas, erros = validar_importacao(
+            df_arquivo,
+            obter_indice_placas(armazenamento),
+            obter_selecao_operacoes(armazenamento),
+            obter_atendimentos_enriquecidos(armazenamento),
+            nome_usuario
+        )
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("✅ Linhas válidas", len(validas))
+    with col2:
+        st.metric("❌ Linhas com erro", erros["linha"].nunique() if erros["linha"].notna().any() else 0)
+    
+    if not erros.empty:
+        st.warning("⚠️ As linhas abaixo serão ignoradas. Corrija o arquivo e envie de novo para incluí-las.")
+        st.dataframe(erros, hide_index=True, use_container_width=True, height=200)
+    
+    if validas.empty:
+        return
+    
+    with st.expander(f"👀 Pré-visualizar {len(validas)} atendimento(s) válido(s)"):
+        st.dataframe(validas.drop(columns=["ID_REGISTRO"]), hide_index=True, use_container_width=True, height=250)
+    
+    if st.button(f"🚀 IMPORTAR {len(validas)} ATENDIMENTO(S)", type="primary", use_container_width=True, key="confirmar_importacao"):
+        # Todas as linhas válidas em um único anexo (uma requisição à planilha)
+        enviar_gravacao(armazenamento, "atendimentos", validas, "anexar", f"{len(validas)} atendimento(s) importado(s) com sucesso!")
+        st.rerun()
+
+# -------------------- PÁGINA --------------------
+def renderizar(armazenamento, todas_abas, nome_usuario):
+    """Formulário de novo atendimento e importação em lote; as gravações vão para a fila"""
+    st.markdown('<h1 class="main-header">Registro de Atendimentos</h1>', unsafe_allow_html=True)
+    
+    # Estado da sessão para controle das seleções
+    if 'operacao_selecionada' not in st.session_state:
+        st.session_state.operacao_selecionada = None
+    if 'placa_digitada' not in st.session_state:
+        st.session_state.placa_digitada = ""
+    
+    aba_individual, aba_lote = st.tabs(["📝 Atendimento Individual", "📥 Importar Arquivo"])
+    
+    with aba_individual:
+        # Layout em 3 colunas
+        col1, col2, col3 = st.columns([1, 1, 1])
+        
+        with col1:
+            campos_veiculo(armazenamento)
+        
+        with col2:
+            campos_abordagem()
+        
+        with col3:
+            campos_periodo()
+        
+        # SELEÇÃO DE OPERAÇÃO (abaixo das 3 colunas)
+        seletor_operacao(armazenamento)
+        
+        area_envio(armazenamento, nome_usuario)
+    
+    with aba_lote:
+        importacao_lote(armazenamento, nome_usuario)
@@ -0,0 +1,166 @@
+"""Página Veículos: indicadores da frota, pesquisa por placa, exportação e cadastro"""
+import streamlit as st
+import pandas as pd
+
+from dados import (
+    SENHA_ADMIN, botao_exportacao, cadastro_veiculos, enviar_gravacao, ler_arquivo_importacao, medir,
+    modelo_cadastro_veiculos, obter_indice_placas
+)
+
+def enviar_cadastro(armazenamento, gravar, resumo):
+    """Grava veículos novos e alterados em um único envio (edições e anexos juntos)"""
+    enviar_gravacao(
+        armazenamento, "veiculos", gravar, "mesclar",
+        f"{resumo['novos']} veículo(s) cadastrado(s) e {resumo['alterados']} atualizado(s)!"
+    )
+    st.rerun()
+
+@st.fragment
+def cadastro(armazenamento):
+    """Cadastro e atualização de veículos pela placa, um a um ou por arquivo (protegidos pela senha de administração)"""
+    st.subheader("🛠️ Cadastrar / Atualizar Veículos")
+    senha = st.text_input("🔒 Senha de Administração", type="password", key="senha_veiculos")
+    if senha != SENHA_ADMIN:
+        if senha:
+            st.error("❌ Senha incorreta. Acesso não autorizado.")
+        return
+    
+    st.caption("Placa já cadastrada: os campos preenchidos substituem os atuais e os vazios são mantidos.")
+    aba_individual, aba_arquivo = st.tabs(["✏️ Veículo Individual", "📥 Arquivo de Veículos"])
+    
+    with aba_individual:
+        with st.form("cadastro_veiculo", clear_on_submit=True):
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                placa = st.text_input("🔢 PLACA", placeholder="Ex: ABC1D23")
+                marca = st.text_input("🏭 MARCA")
+            with col2:
+                modelo = st.text_input("🔧 MODELO")
+                tipo = st.text_input("📋 TIPO", placeholder="Ex: URBANO ou LONGO CURSO")
+            with col3:
+                operacao = st.text_input("🏢 OPERAÇÃO")
+                proprietario = st.text_input("👤 PROPRIETÁRIO")
+            submitted = st.form_submit_button("💾 Salvar Veículo", use_container_width=True)
+        
+        if submitted:
+            veiculo = pd.DataFrame([{
+                "PLACA": placa, "MARCA": marca, "MODELO": modelo, "OPERAÇÃO": operacao,
+                "PROPRIETÁRIO": proprietario, "TIPO": tipo
+            }]).apply(lambda coluna: coluna.str.strip())
+            gravar, resumo, erros = cadastro_veiculos(veiculo, obter_indice_placas(armazenamento))
+            if not erros.empty:
+                for erro in erros.itertuples():
+                    st.error(f"❌ {erro.coluna}: {erro.erro}")
+            elif gravar.empty:
+                st.info("Nenhuma alteração: o veículo já está cadastrado com esses dados.")
+            else:
+                enviar_cadastro(armazenamento, gravar, resumo)
+    
+    with aba_arquivo:
+        st.caption("CSV (separado por ; ou ,) ou Excel com uma linha por veículo.")
+        st.download_button("📄 Baixar modelo (CSV)", data=modelo_cadastro_veiculos, file_name="modelo_veiculos.csv",
+                           mime="text/csv", key="modelo_veiculos")
+        arquivo = st.file_uploader("Arquivo de veículos", type=["csv", "xlsx"], key="arquivo_veiculos")
+        if arquivo is None:
+            return
+        
+        with medir("fragmento.veiculos.cadastro"):
+            try:
+                df_arquivo = ler_arquivo_importacao(arquivo)
+            except Exception as e:
+                st.error(f"❌ Não foi possível ler o arquivo: {str(e)}")
+                return
+            gravar, resumo, erros = cadastro_veiculos(df_arquivo, obter_indice_placas(armazenamento))
+        
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("🆕 Novos", resumo["novos"])
+        with col2:
+            st.metric("✏️ Alterados", resumo["alterados"])
+        with col3:
+            st.metric("➖ Sem alteração", resumo["sem_alteracao"])
+        with col4:
+            st.metric("❌ Com erro", erros["linha"].nunique() if erros["linha"].notna().any() else 0)
+        
+        if not erros.empty:
+            st.warning("⚠️ As linhas abaixo serão ignoradas. Corrija o arquivo e envie de novo para incluí-las.")
+            st.dataframe(erros, hide_index=True, use_container_width=True, height=200)
+        
+        if gravar.empty:
+            return
+        
+        with st.expander(f"👀 Pré-visualizar {len(gravar)} veículo(s) a gravar"):
+            st.dataframe(gravar, hide_index=True, use_container_width=True, height=250)
+        
+        if st.button(f"💾 GRAVAR {len(gravar)} VEÍCULO(S)", type="primary", use_container_width=True, key="confirmar_veiculos"):
+            enviar_cadastro(armazenamento, gravar, resumo)
+
+def renderizar(armazenamento, todas_abas, nome_usuario):
+    """Indicadores da frota, pesquisa pelo índice de placas e cadastro"""
+    df_veiculos = todas_abas.get("veiculos", pd.DataFrame())
+    
+    st.markdown('<h1 class="main-header">Consulta de Veículos</h1>', unsafe_allow_html=True)
+    
+    # Indicadores de veículos
+    if not df_veiculos.empty:
+        col1, col2, col3, col4 = st.columns(4)
+        
+        with col1:
+            st.markdown(f"""
+            <div class="card-indicador">
+                <h3>🚗 Total</h3>
+                <h2>{len(df_veiculos)}</h2>
+            </div>
+            """, unsafe_allow_html=True)
+        
+        with col2:
+            urbanos = len(df_veiculos[df_veiculos['TIPO'] == 'URBANO']) if 'TIPO' in df_veiculos.columns else 0
+            st.markdown(f"""
+            <div class="card-indicador">
+                <h3>🏙️ Urbanos</h3>
+                <h2>{urbanos}</h2>
+            </div>
+            """, unsafe_allow_html=True)
+        
+        with col3:
+            longos = len(df_veiculos[df_veiculos['TIPO'] == 'LONGO CURSO']) if 'TIPO' in df_veiculos.columns else 0
+            st.markdown(f"""
+            <div class="card-indicador">
+                <h3>🛣️ Longo Curso</h3>
+                <h2>{longos}</h2>
+            </div>
+            """, unsafe_allow_html=True)
+        
+        with col4:
+            outros = len(df_veiculos[~df_veiculos['TIPO'].isin(['URBANO', 'LONGO CURSO'])]) if 'TIPO' in df_veiculos.columns else 0
+            st.markdown(f"""
+            <div class="card-indicador">
+                <h3>📦 Outros</h3>
+                <h2>{outros}</h2>
+            </div>
+            """, unsafe_allow_html=True)
+    
+    # Campo de pesquisa de placa
+    st.subheader("🔍 Pesquisar Veículo")
+    pesquisa_placa = st.text_input("Digite a placa para pesquisar:", placeholder="Ex: ABC1234", key="pesquisa_placa")
+    
+    # Botão de exportação (arquivo gerado só no clique)
+    if not df_veiculos.empty:
+        botao_exportacao(armazenamento, "veiculos", df_veiculos, ["veiculos"])
+    
+    st.subheader("📋 Veículos Cadastrados")
+    if not df_veiculos.empty:
+        # Aplicar filtro de pesquisa se houver
+        df_display = df_veiculos
+        if pesquisa_placa:
+            df_display = obter_indice_placas(armazenamento).pesquisar(pesquisa_placa)
+        
+        st.dataframe(
+            df_display[['PLACA', 'MARCA', 'MODELO', 'OPERAÇÃO', 'PROPRIETÁRIO', 'TIPO', 'DATA_CADASTRO']],
+            use_container_width=True,
+            height=400
+        )
+    else:
+        st.info("Nenhum veículo cadastrado ainda.")
+    
+    cadastro(armazenamento)
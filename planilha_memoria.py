@@ -0,0 +1,222 @@
+"""Substituto em memória do gspread para uso offline (testes e benchmarks)
+
+Reproduz apenas a parte da API usada pelo sistema: abrir planilha por chave,
+localizar/criar abas, ler valores e registros, limpar, atualizar e anexar
+linhas, e as requisições de spreadsheets.batchUpdate usadas na sincronização
+por diferença (updateCells, deleteDimension, appendCells, appendDimension).
+Cada aba guarda um registro das chamadas feitas, o que permite medir
+quantas requisições cada caminho de gravação faria contra o Google Sheets.
+"""
+from gspread.exceptions import SpreadsheetNotFound, WorksheetNotFound
+from gspread.utils import a1_range_to_grid_range, a1_to_rowcol, numericise_all
+
+class AbaMemoria:
+    """Aba de planilha mantida como lista de linhas de strings"""
+    
+    def __init__(self, titulo, rows=1000, cols=26, valores=None, id=0):
+        self.id = id
+        self.title = titulo
+        self.row_count = rows
+        self.col_count = cols
+        self.valores = [list(map(str, linha)) for linha in (valores or [])]
+        self.chamadas = []
+    
+    def _registrar(self, metodo):
+        self.chamadas.append(metodo)
+    
+    def _garantir_tamanho(self, linhas, colunas):
+        self.row_count = max(self.row_count, linhas)
+        self.col_count = max(self.col_count, colunas)
+    
+    def _escrever(self, linha_inicial, coluna_inicial, valores):
+        for deslocamento, linha in enumerate(valores):
+            indice = linha_inicial - 1 + deslocamento
+            while len(self.valores) <= indice:
+                self.valores.append([])
+            atual = self.valores[indice]
+            fim = coluna_inicial - 1 + len(linha)
+            if len(atual) < fim:
+                atual.extend([""] * (fim - len(atual)))
+            atual[coluna_inicial - 1:fim] = [str(v) for v in linha]
+        self._garantir_tamanho(len(self.valores), max((len(l) for l in self.valores), default=0))
+    
+    def get_all_values(self, **kwargs):
+        self._registrar("get_all_values")
+        largura = max((len(l) for l in self.valores), default=0)
+        return [linha + [""] * (largura - len(linha)) for linha in self.valores]
+    
+    def _recortar(self, range_name, aparar_celulas=False):
+        if not range_name:
+            recorte = [list(linha) for linha in self.valores]
+        else:
+            faixa = a1_range_to_grid_range(range_name)
+            inicio_col = faixa.get("startColumnIndex", 0)
+            fim_col = faixa.get("endColumnIndex")
+            linhas = self.valores[faixa.get("startRowIndex", 0):faixa.get("endRowIndex")]
+            recorte = [linha[inicio_col:fim_col] for linha in linhas]
+        if aparar_celulas:
+            # A API de valores omite as células vazias do final de cada linha
+            for linha in recorte:
+                while linha and linha[-1] == "":
+                    linha.pop()
+        # Assim como a API, omite as linhas vazias do final do intervalo
+        while recorte and not any(recorte[-1]):
+            recorte.pop()
+        return recorte
+    
+    def get_values(self, range_name=None, **kwargs):
+        self._registrar("get_values")
+        return self._recortar(range_name)
+    
+    def batch_get(self, ranges, **kwargs):
+        self._registrar("batch_get")
+        return [self._recortar(faixa) for faixa in ranges]
+    
+    def get_all_records(self, **kwargs):
+        self._registrar("get_all_records")
+        if not self.valores:
+            return []
+        cabecalho = self.valores[0]
+        registros = []
+        for linha in self.valores[1:]:
+            linha = linha + [""] * (len(cabecalho) - len(linha))
+            registros.append(dict(zip(cabecalho, numericise_all(linha[:len(cabecalho)]))))
+        return registros
+    
+    def row_values(self, row, **kwargs):
+        self._registrar("row_values")
+        if row > len(self.valores):
+            return []
+        linha = list(self.valores[row - 1])
+        while linha and linha[-1] == "":
+            linha.pop()
+        return linha
+    
+    def col_values(self, col, **kwargs):
+        self._registrar("col_values")
+        coluna = [linha[col - 1] if len(linha) >= col else "" for linha in self.valores]
+        while coluna and coluna[-1] == "":
+            coluna.pop()
+        return coluna
+    
+    def clear(self):
+        self._registrar("clear")
+        self.valores = []
+    
+    def update(self, values, range_name=None, **kwargs):
+        self._registrar("update")
+        linha, coluna = a1_to_rowcol((range_name or "A1").split(":")[0])
+        self._escrever(linha, coluna, values)
+        return {"updatedRows": len(values)}
+    
+    def append_rows(self, values, value_input_option=None, insert_data_option=None, table_range=None, **kwargs):
+        self._registrar("append_rows")
+        self._escrever(len(self.valores) + 1, 1, values)
+        return {"updates": {"updatedRows": len(values)}}
+    
+    def batch_update(self, data, **kwargs):
+        self._registrar("batch_update")
+        for item in data:
+            linha, coluna = a1_to_rowcol(item["range"].split(":")[0])
+            self._escrever(linha, coluna, item["values"])
+        return {"totalUpdatedRows": len(data)}
+    
+    def delete_rows(self, start_index, end_index=None):
+        self._registrar("delete_rows")
+        del self.valores[start_index - 1:(end_index or start_index)]
+        return {}
+    
+    def add_cols(self, cols):
+        self._registrar("add_cols")
+        self.col_count += cols
+
+def valor_celula(celula):
+    """Texto exibido por uma CellData (números inteiros sem casas decimais, como no Sheets)"""
+    valor = celula.get("userEnteredValue", {})
+    if "numberValue" in valor:
+        numero = valor["numberValue"]
+        return str(int(numero)) if float(numero).is_integer() else str(numero)
+    if "boolValue" in valor:
+        return "TRUE" if valor["boolValue"] else "FALSE"
+    return str(valor.get("stringValue", valor.get("formulaValue", "")))
+
+class PlanilhaMemoria:
+    """Planilha com abas em memória, equivalente a gspread.Spreadsheet"""
+    
+    def __init__(self, chave, abas=None):
+        self.id = chave
+        self.abas = {}
+        self.chamadas = []
+        for titulo, valores in (abas or {}).items():
+            self.abas[titulo] = AbaMemoria(titulo, valores=valores, id=len(self.abas))
+    
+    def worksheet(self, titulo):
+        if titulo not in self.abas:
+            raise WorksheetNotFound(titulo)
+        return self.abas[titulo]
+    
+    def worksheets(self):
+        return list(self.abas.values())
+    
+    def values_batch_get(self, ranges, params=None):
+        self.chamadas.append("values_batch_get")
+        faixas = []
+        for intervalo in ranges:
+            nome, _, a1 = intervalo.partition("!")
+            aba = self.worksheet(nome.strip("'").replace("''", "'"))
+            faixas.append({"range": intervalo, "values": aba._recortar(a1, aparar_celulas=True)})
+        return {"valueRanges": faixas}
+    
+    def add_worksheet(self, title, rows=1000, cols=26, **kwargs):
+        self.abas[title] = AbaMemoria(title, rows=rows, cols=cols, id=len(self.abas))
+        return self.abas[title]
+    
+    def _aba_por_id(self, sheet_id):
+        return next(aba for aba in self.abas.values() if aba.id == sheet_id)
+    
+    def batch_update(self, body):
+        """Aplica as requisições em ordem, como uma única chamada à API"""
+        self.chamadas.append("batch_update")
+        for requisicao in body["requests"]:
+            tipo, dados = next(iter(requisicao.items()))
+            if tipo == "updateCells":
+                inicio = dados["start"]
+                aba = self._aba_por_id(inicio["sheetId"])
+                linhas = [[valor_celula(c) for c in linha.get("values", [])] for linha in dados["rows"]]
+                aba._escrever(inicio.get("rowIndex", 0) + 1, inicio.get("columnIndex", 0) + 1, linhas)
+            elif tipo == "deleteDimension":
+                faixa = dados["range"]
+                aba = self._aba_por_id(faixa["sheetId"])
+                if faixa["dimension"] == "ROWS":
+                    del aba.valores[faixa["startIndex"]:faixa["endIndex"]]
+                else:
+                    for linha in aba.valores:
+                        del linha[faixa["startIndex"]:faixa["endIndex"]]
+            elif tipo == "appendCells":
+                aba = self._aba_por_id(dados["sheetId"])
+                while aba.valores and not any(aba.valores[-1]):
+                    aba.valores.pop()
+                linhas = [[valor_celula(c) for c in linha.get("values", [])] for linha in dados["rows"]]
+                aba._escrever(len(aba.valores) + 1, 1, linhas)
+            elif tipo == "appendDimension":
+                aba = self._aba_por_id(dados["sheetId"])
+                if dados["dimension"] == "ROWS":
+                    aba.row_count += dados["length"]
+                else:
+                    aba.col_count += dados["length"]
+            else:
+                raise NotImplementedError(tipo)
+        return {"replies": [{} for _ in body["requests"]]}
+
+class ClienteMemoria:
+    """Cliente falso que substitui o retorno de gspread.authorize"""
+    
+    def __init__(self, planilhas=None):
+        self.planilhas = {}
+        for chave, abas in (planilhas or {}).items():
+            self.planilhas[chave] = PlanilhaMemoria(chave, abas)
+    
+    def open_by_key(self, chave):
+        if chave not in self.planilhas:
+            raise SpreadsheetNotFound(chave)
+        return self.planilhas[chave]
@@ -0,0 +1,18 @@
+"""Ponto de entrada ASGI do app: `streamlit run servidor.py` ou `uvicorn servidor:app`
+
+Com DeepLearning.py direto, o módulo dados só é importado quando a primeira
+sessão abre a página; por aqui, a carga das abas começa na partida do
+servidor e a primeira sessão já encontra o cache pronto.
+"""
+from contextlib import asynccontextmanager
+
+import streamlit as st
+
+@asynccontextmanager
+async def partida(app):
+    """Aquece o cache das abas assim que o servidor sobe"""
+    from dados import aquecer_cache
+    aquecer_cache()
+    yield
+
+app = st.App("DeepLearning.py", lifespan=partida)
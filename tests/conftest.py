@@ -0,0 +1,89 @@
+"""Fixtures comuns: backends SQLite e Google Sheets (em memória) com dados pequenos"""
+import os
+import sys
+import uuid
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dados
+from planilha_memoria import ClienteMemoria
+
+def operacoes():
+    return pd.DataFrame({
+        "OPERAÇÃO": ["OP A", "OP B"],
+        "OPERAÇÃO TITULAR": ["TITULAR 1", "TITULAR 2"],
+        "MARCA": ["VW", "MB"],
+        "MODELO": ["X", "Y"],
+        "TIPO": ["URBANO", "LONGO CURSO"],
+        "META": [2.5, 3.0],
+        "DATA_CRIACAO": ["01/01/2026 08:00:00"] * 2,
+        "CRIADO_POR": ["admin"] * 2
+    })
+
+def veiculos():
+    return pd.DataFrame({
+        "PLACA": ["ABC1234", "DEF5G67", "GHI8J90"],
+        "MARCA": ["VW", "MB", "VW"],
+        "MODELO": ["X", "Y", "X"],
+        "OPERAÇÃO": ["OP A", "OP B", "OP A"],
+        "PROPRIETÁRIO": ["TRANSMARONI", "AGREGADO", "TRANSMARONI"],
+        "TIPO": ["URBANO", "LONGO CURSO", "URBANO"],
+        "DATA_CADASTRO": ["01/01/2026"] * 3
+    })
+
+def atendimentos(quantidade=3, inicio=0):
+    """Atendimentos com ID_REGISTRO, placas e datas distintas"""
+    indices = range(inicio, inicio + quantidade)
+    return pd.DataFrame({
+        "MOTORISTA": [f"MOTORISTA {i}" for i in indices],
+        "COLABORADOR": ["Lucas"] * quantidade,
+        "DATA_ABORDAGEM": [f"{1 + i % 28:02d}/02/2026" for i in indices],
+        "DATA_LANCAMENTO": [f"{1 + i % 28:02d}/02/2026 10:00:00" for i in indices],
+        "PLACA": [["ABC1234", "DEF5G67", "GHI8J90"][i % 3] for i in indices],
+        "MODELO": ["X"] * quantidade,
+        "REVISAO": ["REVISÃO EM DIA"] * quantidade,
+        "TACOGRAFO": ["PENDENTE"] * quantidade,
+        "OPERACAO": ["OP A"] * quantidade,
+        "DATA_INICIO": ["01/02/2026"] * quantidade,
+        "DATA_FIM": ["08/02/2026"] * quantidade,
+        "META": [2.5] * quantidade,
+        "MEDIA_ATENDIMENTO": [2.0 + i / 10 for i in indices],
+        "OBSERVACAO": [""] * quantidade,
+        "DATA_MODIFICACAO": ["01/03/2026 09:00:00"] * quantidade,
+        "MODIFICADO_POR": ["Lucas"] * quantidade,
+        "ID_REGISTRO": [f"id{i:04d}" for i in indices]
+    })
+
+def valores_aba(df):
+    """Cabeçalho + linhas em texto, como na planilha"""
+    return [list(df.columns)] + df.astype(str).values.tolist()
+
+@pytest.fixture
+def armazenamento_sqlite(tmp_path):
+    armazenamento = dados.ArmazenamentoSQLite(str(tmp_path / "abordagens.db"))
+    for aba_nome, df in [("operacoes", operacoes()), ("veiculos", veiculos()), ("atendimentos", atendimentos())]:
+        armazenamento.substituir_tabela(aba_nome, df)
+    return armazenamento
+
+@pytest.fixture
+def armazenamento_sheets(tmp_path, monkeypatch):
+    # Planilha nova a cada teste: o snapshot local (por planilha) começa vazio
+    monkeypatch.setattr(dados, "DIRETORIO_SNAPSHOT", str(tmp_path / "snapshot"))
+    chave = uuid.uuid4().hex
+    cliente = ClienteMemoria({chave: {
+        "operacoes": valores_aba(operacoes()),
+        "veiculos": valores_aba(veiculos()),
+        "atendimentos": valores_aba(atendimentos())
+    }})
+    return dados.ArmazenamentoGoogleSheets(cliente, chave)
+
+@pytest.fixture(params=["sqlite", "sheets"])
+def armazenamento(request):
+    return request.getfixturevalue(f"armazenamento_{request.param}")
+
+def aba_memoria(armazenamento, aba_nome):
+    """Aba da planilha em memória por trás do backend Sheets"""
+    return armazenamento.client.planilhas[armazenamento.sheet_id].abas[aba_nome]
@@ -0,0 +1,177 @@
+"""Caminhos de gravação dos backends: anexar, excluir, sincronizar por diferença e fila"""
+import time
+
+import pandas as pd
+
+import dados
+from conftest import aba_memoria, atendimentos, veiculos
+
+def test_anexar_mantem_linhas_e_tipos(armazenamento):
+    armazenamento.anexar_linhas("atendimentos", atendimentos(2, inicio=3))
+    
+    df = armazenamento.carregar_tabela("atendimentos")
+    assert df["ID_REGISTRO"].tolist() == [f"id{i:04d}" for i in range(5)]
+    assert pd.api.types.is_datetime64_any_dtype(df["DATA_ABORDAGEM"])
+    assert df["MEDIA_ATENDIMENTO"].tolist() == [2.0, 2.1, 2.2, 2.3, 2.4]
+
+def test_anexar_sheets_nao_regrava_a_aba(armazenamento_sheets):
+    aba = aba_memoria(armazenamento_sheets, "atendimentos")
+    armazenamento_sheets.anexar_linhas("atendimentos", atendimentos(1, inicio=3))
+    
+    assert "append_rows" in aba.chamadas
+    assert "clear" not in aba.chamadas and "update" not in aba.chamadas
+
+def test_excluir_remove_so_a_linha(armazenamento):
+    df = armazenamento.carregar_tabela("atendimentos")
+    armazenamento.excluir_linhas("atendimentos", df.iloc[[1]])
+    
+    assert armazenamento.carregar_tabela("atendimentos")["ID_REGISTRO"].tolist() == ["id0000", "id0002"]
+
+def test_substituir_grava_so_a_diferenca(armazenamento):
+    novo = veiculos()
+    novo.loc[0, "PROPRIETÁRIO"] = "TERCEIRO"
+    novo = pd.concat([novo.drop(index=1), pd.DataFrame([{**novo.iloc[1].to_dict(), "PLACA": "JKL1M23"}])], ignore_index=True)
+    
+    armazenamento.substituir_tabela("veiculos", novo)
+    
+    df = armazenamento.carregar_tabela("veiculos")
+    assert df["PLACA"].tolist() == ["ABC1234", "GHI8J90", "JKL1M23"]
+    assert df["PROPRIETÁRIO"].tolist() == ["TERCEIRO", "TRANSMARONI", "AGREGADO"]
+
+def test_substituir_sheets_em_uma_requisicao(armazenamento_sheets):
+    planilha = armazenamento_sheets.client.planilhas[armazenamento_sheets.sheet_id]
+    aba = aba_memoria(armazenamento_sheets, "veiculos")
+    novo = veiculos()
+    novo.loc[2, "TIPO"] = "LONGO CURSO"
+    
+    armazenamento_sheets.substituir_tabela("veiculos", novo.drop(index=0))
+    
+    # Uma leitura da aba e um único batchUpdate (edição + exclusão); a aba nunca é limpa
+    assert aba.chamadas == ["get_all_values"]
+    assert planilha.chamadas == ["batch_update"]
+    assert [linha[0] for linha in aba.valores[1:]] == ["DEF5G67", "GHI8J90"]
+    assert aba.valores[2][5] == "LONGO CURSO"
+
+def test_diferencas_tabelas_pareia_pela_chave():
+    antigo = dados.aplicar_esquema("veiculos", veiculos())
+    novo = antigo.iloc[[2, 0]].reset_index(drop=True)
+    novo.loc[1, "PROPRIETÁRIO"] = "TERCEIRO"
+    
+    excluir, atualizar, anexar = dados.diferencas_tabelas("veiculos", antigo, novo)
+    
+    assert (excluir, atualizar, anexar) == ([1], [(0, 1)], [])
+
+def test_fila_grava_envios_em_lote(armazenamento, monkeypatch):
+    monkeypatch.setattr(dados, "JANELA_LOTE_GRAVACAO", 0.05)
+    fila = dados.FilaGravacao(armazenamento)
+    fila.enfileirar("atendimentos", atendimentos(1, inicio=3), "anexar")
+    fila.enfileirar("atendimentos", atendimentos(1, inicio=4), "anexar")
+    
+    limite = time.time() + 10
+    while fila.pendentes() and time.time() < limite:
+        time.sleep(0.02)
+    
+    assert fila.pendentes() == 0
+    assert armazenamento.carregar_tabela("atendimentos")["ID_REGISTRO"].tolist()[-2:] == ["id0003", "id0004"]
+
+def gemeos(ids):
+    """Atendimentos com a mesma chave composta (placa, lançamento, colaborador) e IDs diferentes"""
+    return atendimentos(len(ids), inicio=3).assign(
+        PLACA="ABC1234", DATA_LANCAMENTO="05/03/2026 10:00:00", ID_REGISTRO=ids
+    )
+
+def test_diferencas_tabelas_pareia_pelo_id():
+    antigo = dados.aplicar_esquema("atendimentos", gemeos(["a", "b", "c"]))
+    novo = antigo.iloc[[0, 2]].reset_index(drop=True)
+    novo.loc[1, "OBSERVACAO"] = "editado"
+    
+    excluir, atualizar, anexar = dados.diferencas_tabelas("atendimentos", antigo, novo)
+    
+    assert (excluir, atualizar, anexar) == ([1], [(2, 1)], [])
+
+def test_excluir_localiza_pelo_id(armazenamento):
+    armazenamento.anexar_linhas("atendimentos", gemeos(["a", "b"]))
+    df = armazenamento.carregar_tabela("atendimentos")
+    cache = dados.CacheAbas(60)
+    cache.armazenar("atendimentos", df)
+    
+    armazenamento.excluir_linhas("atendimentos", df[df["ID_REGISTRO"] == "b"])
+    cache.remover("atendimentos", df[df["ID_REGISTRO"] == "b"])
+    
+    for restantes in (armazenamento.carregar_tabela("atendimentos"), cache.obter("atendimentos")):
+        assert restantes["ID_REGISTRO"].tolist()[-2:] == ["id0002", "a"]
+
+def test_atualizar_localiza_pelo_id(armazenamento):
+    armazenamento.anexar_linhas("atendimentos", gemeos(["a", "b"]))
+    df = armazenamento.carregar_tabela("atendimentos")
+    
+    armazenamento.atualizar_linhas("atendimentos", df[df["ID_REGISTRO"] == "b"].assign(OBSERVACAO="editado"))
+    
+    df = armazenamento.carregar_tabela("atendimentos").set_index("ID_REGISTRO")
+    assert (df.loc["a", "OBSERVACAO"], df.loc["b", "OBSERVACAO"]) == ("", "editado")
+
+def test_fila_grava_pelo_backend_atual(armazenamento_sqlite):
+    dados.criar_fila_gravacao.clear()
+    fila = dados.obter_fila_gravacao(armazenamento_sqlite)
+    # obter_armazenamento recriou o backend (TTL vencido)
+    novo = dados.ArmazenamentoSQLite(armazenamento_sqlite.caminho)
+    
+    assert dados.obter_fila_gravacao(novo) is fila
+    assert fila.armazenamento is novo
+
+def test_atualizador_recarrega_pelo_backend_atual(armazenamento_sqlite):
+    dados.criar_atualizador.clear()
+    atualizador = dados.obter_atualizador(armazenamento_sqlite)
+    novo = dados.ArmazenamentoSQLite(armazenamento_sqlite.caminho)
+    
+    assert dados.obter_atualizador(novo) is atualizador
+    assert atualizador.armazenamento is novo
+
+def test_aquecer_cache_carrega_em_segundo_plano(armazenamento_sqlite, monkeypatch):
+    monkeypatch.setattr(dados, "BACKEND_ARMAZENAMENTO", "sqlite")
+    monkeypatch.setattr(dados, "CAMINHO_SQLITE", armazenamento_sqlite.caminho)
+    cache = dados.obter_cache_abas(armazenamento_sqlite.identificador)
+    
+    dados.aquecer_cache()
+    limite = time.time() + 10
+    while any(cache.obter(aba_nome) is None for aba_nome in dados.ABAS_SISTEMA) and time.time() < limite:
+        time.sleep(0.02)
+    
+    assert len(cache.obter("atendimentos")) == 3
+
+def test_recarga_mantem_gravacao_concluida_durante_a_leitura(armazenamento, monkeypatch):
+    monkeypatch.setattr(dados, "JANELA_LOTE_GRAVACAO", 0.05)
+    dados.criar_fila_gravacao.clear()
+    fila = dados.obter_fila_gravacao(armazenamento)
+    cache = dados.obter_cache_abas(armazenamento.identificador)
+    ler = armazenamento.carregar_tabelas
+    
+    def leitura_lenta(abas):
+        # Lê antes de a gravação chegar ao backend; a fila esvazia enquanto a leitura "trafega"
+        lidos = ler(abas)
+        limite = time.time() + 10
+        while fila.pendentes() and time.time() < limite:
+            time.sleep(0.02)
+        return lidos
+    monkeypatch.setattr(armazenamento, "carregar_tabelas", leitura_lenta)
+    fila.enfileirar("atendimentos", atendimentos(1, inicio=3), "anexar")
+    
+    dados.recarregar_abas(armazenamento, ["atendimentos"])
+    
+    assert fila.pendentes() == 0
+    assert cache.obter("atendimentos")["ID_REGISTRO"].tolist() == ["id0000", "id0001", "id0002", "id0003"]
+
+def test_excluir_linha_antiga_repetida_remove_uma(armazenamento):
+    # Linhas gravadas antes do ID_REGISTRO, idênticas
+    armazenamento.anexar_linhas("atendimentos", gemeos(["", ""]).assign(MOTORISTA="ANTIGO"))
+    df = armazenamento.carregar_tabela("atendimentos")
+    cache = dados.CacheAbas(60)
+    cache.armazenar("atendimentos", df)
+    
+    selecionada = df[df["MOTORISTA"] == "ANTIGO"].iloc[[1]]
+    armazenamento.excluir_linhas("atendimentos", selecionada)
+    cache.remover("atendimentos", selecionada)
+    
+    for restantes in (armazenamento.carregar_tabela("atendimentos"), cache.obter("atendimentos")):
+        assert restantes["MOTORISTA"].tolist().count("ANTIGO") == 1
+        assert len(restantes) == 4
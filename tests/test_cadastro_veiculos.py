@@ -0,0 +1,63 @@
+"""Veículos: cadastro por arquivo (novos e alterados pela placa, em um único envio) e pesquisa de placas"""
+import pandas as pd
+
+import dados
+from conftest import veiculos
+
+def cadastro(df, frota=None):
+    frota = dados.aplicar_esquema("veiculos", frota if frota is not None else veiculos())
+    return dados.cadastro_veiculos(df, dados.IndicePlacas(frota))
+
+def enviados(*linhas):
+    return pd.DataFrame(linhas, columns=dados.COLUNAS_CADASTRO_VEICULOS).fillna("")
+
+def test_novos_alterados_e_sem_alteracao():
+    gravar, resumo, erros = cadastro(enviados(
+        {"PLACA": "abc-1234", "PROPRIETÁRIO": "TERCEIRO"},
+        {"PLACA": "DEF5G67"},
+        {"PLACA": "JKL1M23", "MARCA": "VW", "MODELO": "Z", "TIPO": "URBANO"}
+    ))
+    
+    assert erros.empty
+    assert resumo == {"novos": 1, "alterados": 1, "sem_alteracao": 1}
+    assert gravar["PLACA"].tolist() == ["ABC1234", "JKL1M23"]
+    # Campos vazios mantêm o cadastro atual
+    assert (gravar.loc[0, "PROPRIETÁRIO"], gravar.loc[0, "MODELO"]) == ("TERCEIRO", "X")
+
+def test_erros_por_linha_e_coluna():
+    gravar, _, erros = cadastro(enviados(
+        {"PLACA": "XYZ", "MARCA": "VW", "MODELO": "Z", "TIPO": "URBANO"},
+        {"PLACA": "JKL1M23", "MARCA": "VW"},
+        {"PLACA": "MNO4P56", "MARCA": "VW", "MODELO": "Z", "TIPO": "URBANO"},
+        {"PLACA": "mno-4p56", "MARCA": "VW", "MODELO": "Z", "TIPO": "URBANO"}
+    ))
+    
+    assert gravar.empty
+    assert set(zip(erros["linha"], erros["coluna"])) == {
+        (2, "PLACA"), (3, "MODELO"), (3, "TIPO"), (4, "PLACA"), (5, "PLACA")
+    }
+
+def test_arquivo_sem_placa_e_recusado():
+    gravar, resumo, erros = cadastro(pd.DataFrame({"MARCA": ["VW"]}))
+    
+    assert gravar.empty and resumo["novos"] == 0
+    assert erros.loc[0, "erro"] == "Colunas ausentes: PLACA"
+
+def test_mesclar_atualiza_e_anexa_pela_placa(armazenamento):
+    gravar, _, _ = cadastro(enviados(
+        {"PLACA": "GHI8J90", "TIPO": "LONGO CURSO"},
+        {"PLACA": "JKL1M23", "MARCA": "VW", "MODELO": "Z", "TIPO": "URBANO"}
+    ))
+    
+    armazenamento.mesclar_linhas("veiculos", gravar)
+    
+    df = armazenamento.carregar_tabela("veiculos")
+    assert df["PLACA"].tolist() == ["ABC1234", "DEF5G67", "GHI8J90", "JKL1M23"]
+    assert df["TIPO"].astype(str).tolist() == ["URBANO", "LONGO CURSO", "LONGO CURSO", "URBANO"]
+
+def test_pesquisa_parcial_de_placa_antiga():
+    frota = dados.aplicar_esquema("veiculos", veiculos().assign(PLACA=["ABC-1234", "DEF5G67", "GHI8J90"]))
+    indice = dados.IndicePlacas(frota)
+    
+    for texto in ["1234", "BC12", "abc-12", "1C34", "ABC1234"]:
+        assert indice.pesquisar(texto)["PLACA"].tolist() == ["ABC-1234"], texto
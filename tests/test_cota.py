@@ -0,0 +1,82 @@
+"""Controle de cota: novas tentativas só quando repetir a chamada não duplica dados"""
+import time
+
+import pytest
+import requests
+from gspread.exceptions import APIError
+
+import dados
+from conftest import atendimentos, valores_aba
+from planilha_memoria import ClienteMemoria
+
+class Resposta:
+    """Resposta HTTP mínima para montar um APIError do gspread"""
+    
+    def __init__(self, codigo):
+        self.codigo = codigo
+        self.text = ""
+    
+    def json(self):
+        return {"error": {"code": self.codigo, "message": "", "status": ""}}
+
+def falhar_uma_vez(objeto, metodo, erro, aplicar):
+    """Troca o método por um que falha na primeira chamada (aplicando-a antes, se aplicar)"""
+    original = getattr(objeto, metodo)
+    falhas = [erro]
+    
+    def substituto(*args, **kwargs):
+        if falhas:
+            if aplicar:
+                original(*args, **kwargs)
+            raise falhas.pop()
+        return original(*args, **kwargs)
+    setattr(objeto, metodo, substituto)
+
+@pytest.fixture
+def planilha(monkeypatch):
+    monkeypatch.setattr(dados, "ESPERA_BASE_API", 0)
+    cliente = ClienteMemoria({"chave": {"dados": [["A", "ID_REGISTRO"], ["1", "x"]]}})
+    aba = cliente.planilhas["chave"].abas["dados"]
+    proxy = dados.ProxyCota(cliente, dados.ControleCota(6000, 100)).open_by_key("chave").worksheet("dados")
+    return aba, proxy
+
+def test_escrita_com_timeout_nao_e_repetida(planilha):
+    aba, proxy = planilha
+    falhar_uma_vez(aba, "append_rows", requests.exceptions.ReadTimeout(), aplicar=True)
+    
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        proxy.append_rows([["2", "y"]])
+    
+    assert aba.valores == [["A", "ID_REGISTRO"], ["1", "x"], ["2", "y"]]
+
+def test_escrita_recusada_por_cota_e_repetida(planilha):
+    aba, proxy = planilha
+    falhar_uma_vez(aba, "append_rows", APIError(Resposta(429)), aplicar=False)
+    
+    proxy.append_rows([["2", "y"]])
+    
+    assert aba.valores == [["A", "ID_REGISTRO"], ["1", "x"], ["2", "y"]]
+
+def test_leitura_com_timeout_e_repetida(planilha):
+    aba, proxy = planilha
+    falhar_uma_vez(aba, "get_all_values", requests.exceptions.ReadTimeout(), aplicar=False)
+    
+    assert proxy.get_all_values() == [["A", "ID_REGISTRO"], ["1", "x"]]
+
+def test_fila_reenvia_sem_duplicar(monkeypatch, tmp_path):
+    monkeypatch.setattr(dados, "DIRETORIO_SNAPSHOT", str(tmp_path))
+    monkeypatch.setattr(dados, "JANELA_LOTE_GRAVACAO", 0.01)
+    monkeypatch.setattr(dados, "ESPERA_BASE_GRAVACAO", 0.01)
+    cliente = ClienteMemoria({"fila": {"atendimentos": valores_aba(atendimentos())}})
+    aba = cliente.planilhas["fila"].abas["atendimentos"]
+    falhar_uma_vez(aba, "append_rows", requests.exceptions.ReadTimeout(), aplicar=True)
+    armazenamento = dados.ArmazenamentoGoogleSheets(dados.ProxyCota(cliente, dados.ControleCota(6000, 100)), "fila")
+    fila = dados.FilaGravacao(armazenamento)
+    
+    ticket = fila.enfileirar("atendimentos", atendimentos(1, inicio=3), "anexar")
+    limite = time.time() + 10
+    while fila.pendentes() and time.time() < limite:
+        time.sleep(0.02)
+    
+    assert fila.estado(ticket)[0] == "concluida"
+    assert [linha[-1] for linha in aba.valores[1:]] == ["id0000", "id0001", "id0002", "id0003"]
@@ -0,0 +1,109 @@
+"""Importação de atendimentos em lote: leitura do arquivo e validação"""
+import io
+
+import pandas as pd
+
+import dados
+from conftest import atendimentos, operacoes, veiculos
+
+class Arquivo(io.BytesIO):
+    """Arquivo enviado pelo st.file_uploader (BytesIO com nome)"""
+    
+    def __init__(self, nome, conteudo):
+        super().__init__(conteudo)
+        self.name = nome
+
+def validar(df, df_atendimentos=None):
+    return dados.validar_importacao(
+        df,
+        dados.IndicePlacas(dados.aplicar_esquema("veiculos", veiculos())),
+        dados.SelecaoOperacoes(dados.aplicar_esquema("operacoes", operacoes())),
+        df_atendimentos if df_atendimentos is not None else pd.DataFrame(),
+        "Lucas"
+    )
+
+def arquivo_csv(*linhas):
+    cabecalho = ";".join(dados.COLUNAS_IMPORTACAO)
+    return Arquivo("atendimentos.csv", "\n".join([cabecalho, *linhas]).encode("utf-8-sig"))
+
+def test_le_csv_com_ponto_e_virgula():
+    df = dados.ler_arquivo_importacao(arquivo_csv("abc-1234; João ;01/02/2026;REVISÃO EM DIA;PENDENTE;OP A;01/02/2026;08/02/2026;2,75;"))
+    
+    assert df.loc[0, "PLACA"] == "abc-1234"
+    assert df.loc[0, "MOTORISTA"] == "João"
+
+def test_linhas_validas_no_formato_dos_registros():
+    df = dados.ler_arquivo_importacao(arquivo_csv("abc-1234;João;01/02/2026;revisão em dia;PENDENTE;OP B;01/02/2026;08/02/2026;2,75;ok"))
+    
+    validas, erros = validar(df)
+    
+    assert erros.empty
+    linha = validas.iloc[0]
+    assert (linha["PLACA"], linha["OPERACAO"], linha["META"], linha["MEDIA_ATENDIMENTO"]) == ("ABC1234", "OP B", 3.0, 2.75)
+    assert (linha["REVISAO"], linha["COLABORADOR"], linha["DATA_ABORDAGEM"]) == ("REVISÃO EM DIA", "Lucas", "01/02/2026")
+
+def test_erros_por_linha_e_coluna():
+    df = dados.ler_arquivo_importacao(arquivo_csv(
+        "ZZZ9999;Ana;31/02/2026;X;PENDENTE;OP Z;01/02/2026;01/01/2026;abc;",
+        "ABC1234;;01/02/2026;PENDENTE;PENDENTE;OP A;01/02/2026;08/02/2026;2;"
+    ))
+    
+    validas, erros = validar(df)
+    
+    assert validas.empty
+    assert set(zip(erros["linha"], erros["coluna"])) == {
+        (2, "PLACA"), (2, "DATA_ABORDAGEM"), (2, "REVISAO"), (2, "OPERACAO"), (2, "DATA_FIM"),
+        (2, "MEDIA_ATENDIMENTO"), (3, "MOTORISTA")
+    }
+
+def test_colunas_ausentes():
+    validas, erros = validar(pd.DataFrame({"PLACA": ["ABC1234"]}))
+    
+    assert validas.empty
+    assert erros.loc[0, "erro"].startswith("Colunas ausentes")
+
+def test_reenvio_do_mesmo_arquivo_e_detectado():
+    linha = "ABC1234;João;01/02/2026;PENDENTE;PENDENTE;OP A;01/02/2026;08/02/2026;2;"
+    validas, _ = validar(dados.ler_arquivo_importacao(arquivo_csv(linha)))
+    ja_gravados = pd.concat([atendimentos(), validas], ignore_index=True)
+    
+    validas, erros = validar(dados.ler_arquivo_importacao(arquivo_csv(linha)), ja_gravados)
+    
+    assert validas.empty
+    assert erros.loc[0, "erro"] == "Linha já importada anteriormente"
+
+def test_importacao_grava_em_um_anexo(armazenamento):
+    df = dados.ler_arquivo_importacao(arquivo_csv(
+        "ABC1234;João;01/02/2026;PENDENTE;PENDENTE;OP A;01/02/2026;08/02/2026;2;",
+        "DEF5G67;Ana;02/02/2026;PENDENTE;PENDENTE;OP B;01/02/2026;08/02/2026;3;"
+    ))
+    validas, _ = validar(df)
+    
+    armazenamento.anexar_linhas("atendimentos", validas)
+    
+    gravados = armazenamento.carregar_tabela("atendimentos")
+    assert len(gravados) == 5
+    assert gravados["ID_REGISTRO"].tail(2).tolist() == validas["ID_REGISTRO"].tolist()
+
+def test_excluir_um_atendimento_importado(armazenamento):
+    # Mesma placa e colaborador em duas linhas do arquivo
+    df = dados.ler_arquivo_importacao(arquivo_csv(
+        "ABC1234;João;01/02/2026;PENDENTE;PENDENTE;OP A;01/02/2026;08/02/2026;2;",
+        "ABC1234;João;02/02/2026;PENDENTE;PENDENTE;OP A;02/02/2026;09/02/2026;3;"
+    ))
+    validas, _ = validar(df)
+    assert validas["DATA_LANCAMENTO"].is_unique
+    armazenamento.anexar_linhas("atendimentos", validas)
+    gravados = armazenamento.carregar_tabela("atendimentos")
+    excluido, mantido = validas["ID_REGISTRO"].tolist()
+    cache = dados.CacheAbas(60)
+    cache.armazenar("atendimentos", gravados)
+    
+    selecionado = gravados[gravados["ID_REGISTRO"] == excluido]
+    armazenamento.excluir_linhas("atendimentos", selecionado)
+    cache.remover("atendimentos", selecionado)
+    
+    for restantes in (armazenamento.carregar_tabela("atendimentos"), cache.obter("atendimentos")):
+        assert len(restantes) == 4
+        assert mantido in restantes["ID_REGISTRO"].tolist()
+        assert excluido not in restantes["ID_REGISTRO"].tolist()
@@ -0,0 +1,102 @@
+"""Leitura do Google Sheets por snapshot local + delta: edições feitas direto na planilha"""
+import dados
+from conftest import aba_memoria, atendimentos, valores_aba
+
+def recarregar(armazenamento):
+    return armazenamento.carregar_tabela("atendimentos")
+
+def test_edicao_manual_sem_mudar_a_marca(armazenamento_sheets):
+    recarregar(armazenamento_sheets)
+    aba = aba_memoria(armazenamento_sheets, "atendimentos")
+    coluna = aba.valores[0].index("OBSERVACAO")
+    aba.valores[2][coluna] = "editado na planilha"
+    
+    df = recarregar(armazenamento_sheets)
+    
+    assert df["OBSERVACAO"].tolist() == ["", "editado na planilha", ""]
+
+def test_edicao_manual_fora_da_janela(armazenamento_sheets, monkeypatch):
+    monkeypatch.setattr(dados, "LINHAS_VERIFICACAO_SINCRONIZACAO", 1)
+    aba = aba_memoria(armazenamento_sheets, "atendimentos")
+    coluna = aba.valores[0].index("OBSERVACAO")
+    recarregar(armazenamento_sheets)
+    aba.valores[3][coluna] = "editado na planilha"
+    
+    # A janela percorre a aba uma linha por sincronização
+    vistos = [recarregar(armazenamento_sheets)["OBSERVACAO"].iloc[2] for _ in range(3)]
+    
+    assert vistos[-1] == "editado na planilha"
+
+def test_exclusao_manual_entre_linhas_com_a_mesma_marca(armazenamento_sheets):
+    recarregar(armazenamento_sheets)
+    aba = aba_memoria(armazenamento_sheets, "atendimentos")
+    del aba.valores[2]
+    
+    df = recarregar(armazenamento_sheets)
+    
+    assert df["ID_REGISTRO"].tolist() == ["id0000", "id0002"]
+
+def test_substituicao_manual_com_a_mesma_marca(armazenamento_sheets):
+    recarregar(armazenamento_sheets)
+    aba = aba_memoria(armazenamento_sheets, "atendimentos")
+    aba.valores[2] = valores_aba(atendimentos(1, inicio=7))[1]
+    
+    df = recarregar(armazenamento_sheets)
+    
+    assert df["ID_REGISTRO"].tolist() == ["id0000", "id0007", "id0002"]
+
+def test_descartar_copia_local_forca_leitura_completa(armazenamento_sheets):
+    recarregar(armazenamento_sheets)
+    snapshot = dados.obter_snapshot(armazenamento_sheets.sheet_id)
+    
+    armazenamento_sheets.descartar_copia_local()
+    
+    for aba_nome in dados.ABAS_SISTEMA:
+        assert snapshot.carregar(aba_nome)[0] is None
+    assert len(recarregar(armazenamento_sheets)) == 3
+
+def intervalos_lidos(armazenamento, monkeypatch):
+    """Registra os intervalos pedidos a cada values.batchGet"""
+    planilha = armazenamento.client.planilhas[armazenamento.sheet_id]
+    lidos = []
+    original = planilha.values_batch_get
+    
+    def registrar(intervalos, params=None):
+        lidos.extend(intervalos)
+        return original(intervalos, params)
+    monkeypatch.setattr(planilha, "values_batch_get", registrar)
+    return lidos
+
+def test_edicao_pelo_sistema_remenda_o_snapshot(armazenamento_sheets, monkeypatch):
+    df = recarregar(armazenamento_sheets)
+    armazenamento_sheets.atualizar_linhas("atendimentos", df.iloc[[1]].assign(OBSERVACAO="editado"))
+    lidos = intervalos_lidos(armazenamento_sheets, monkeypatch)
+    
+    df = recarregar(armazenamento_sheets)
+    
+    assert df["OBSERVACAO"].tolist() == ["", "editado", ""]
+    assert "'atendimentos'" not in lidos
+
+def test_exclusao_pelo_sistema_remenda_o_snapshot(armazenamento_sheets, monkeypatch):
+    df = recarregar(armazenamento_sheets)
+    armazenamento_sheets.excluir_linhas("atendimentos", df.iloc[[0, 2]])
+    lidos = intervalos_lidos(armazenamento_sheets, monkeypatch)
+    
+    df = recarregar(armazenamento_sheets)
+    
+    assert df["ID_REGISTRO"].tolist() == ["id0001"]
+    assert "'atendimentos'" not in lidos
+
+def test_edicao_envia_datas_como_digitadas(armazenamento_sheets, monkeypatch):
+    planilha = armazenamento_sheets.client.planilhas[armazenamento_sheets.sheet_id]
+    enviados = []
+    original = planilha.batch_update
+    monkeypatch.setattr(planilha, "batch_update", lambda corpo: enviados.append(corpo) or original(corpo))
+    df = recarregar(armazenamento_sheets)
+    
+    armazenamento_sheets.atualizar_linhas("atendimentos", df.iloc[[1]])
+    
+    celulas = enviados[0]["requests"][0]["updateCells"]["rows"][0]["values"]
+    cabecalho = list(df.columns)
+    assert celulas[cabecalho.index("DATA_ABORDAGEM")]["userEnteredValue"] == {"formulaValue": "02/02/2026"}
+    assert celulas[cabecalho.index("MOTORISTA")]["userEnteredValue"] == {"stringValue": "MOTORISTA 1"}